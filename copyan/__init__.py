@@ -1,3 +1,24 @@
-from . import jit
-from . import jit_kernels
-from .utils import bench_kineto, calc_diff
+import importlib
+
+# Submodules are loaded lazily, so `import copyan` does not pull in torch, the JIT or profiler machinery
+_submodules = ("distributed", "jit", "jit_kernels", "utils")
+_attributes = {
+    "bench_kineto": "utils",
+    "calc_diff": "utils",
+}
+
+__all__ = [*_submodules, *_attributes.keys()]
+
+
+def __getattr__(name: str):
+    if name in _submodules:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _attributes:
+        value = getattr(importlib.import_module(f".{_attributes[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
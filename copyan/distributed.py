@@ -0,0 +1,84 @@
+import torch
+import torch.distributed as dist
+from typing import Optional, Tuple
+
+# Global scans and reductions of a sequence sharded across ranks, in rank order
+# Each rank runs the local kernels on its shard, and ranks only exchange one small tensor of shard partials
+# NOTES: CPU shards (e.g. with the gloo backend) run the same pipeline with PyTorch ops
+
+
+def local_scan(x: torch.Tensor, out: torch.Tensor) -> None:
+    if x.numel() == 0:
+        return
+    if x.is_cuda:
+        from .jit_kernels import naive_scan
+
+        naive_scan(x, out, stream=torch.cuda.current_stream(x.device))
+    else:
+        torch.cumsum(x, 0, out=out)
+
+
+def local_reduce(x: torch.Tensor, transform: str = None) -> torch.Tensor:
+    # `[sum, max]` of the shard, the max of an empty shard is -inf
+    partials = torch.tensor([0.0, -float("inf")], dtype=torch.float, device=x.device)
+    if x.is_cuda:
+        from .jit_kernels import reduce_sum_max
+
+        y0, y1 = partials[0:1], partials[1:2]
+        reduce_sum_max(x, y0, y1, transform=transform, stream=torch.cuda.current_stream(x.device))
+    elif x.numel() > 0:
+        from .jit_kernels.ops import host_transform_map
+
+        assert transform is None or transform in host_transform_map, (
+            f"Custom transforms only run on CUDA, got `{transform}` for a CPU tensor"
+        )
+        x = host_transform_map[transform or "identity"](x, 0.0)
+        partials[0], partials[1] = x.sum(), x.max()
+    return partials
+
+
+def scan(
+    x: torch.Tensor,
+    out: torch.Tensor = None,
+    group: Optional[dist.ProcessGroup] = None,
+) -> torch.Tensor:
+    # Inclusive prefix sums of the 1-D shard of every rank, as if the shards were concatenated in rank order
+    # Two passes over the shard: the local scan, and a single epilogue adding the offset of the previous ranks
+    assert x.dim() == 1 and x.dtype == torch.float32 and x.is_contiguous()
+    out = torch.empty_like(x) if out is None else out
+    assert out.shape == x.shape and out.dtype == x.dtype and out.is_contiguous()
+
+    world_size = dist.get_world_size(group)
+    rank = dist.get_rank(group)
+
+    local_scan(x, out)
+
+    # The shard total is the last prefix sum, so that shard boundaries agree with the local scans' rounding
+    total = out[-1:].clone() if x.numel() > 0 else torch.zeros(1, dtype=x.dtype, device=x.device)
+    totals = torch.empty(world_size, 1, dtype=x.dtype, device=x.device)
+    dist.all_gather(list(totals.unbind(0)), total, group=group)
+
+    # Ranks fold the totals with the same sequential scan, so the offsets are consistent across ranks
+    if rank > 0:
+        out.add_(torch.cumsum(totals.view(-1), 0)[rank - 1])
+    return out
+
+
+def reduce(
+    x: torch.Tensor,
+    group: Optional[dist.ProcessGroup] = None,
+    transform: str = None,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    # Global sum and max of the shards of every rank, as 1-element tensors on every rank
+    # `transform` is applied to every element first, see `copyan.jit_kernels.reduce.get_transform`
+    # NOTES: sums and maxes travel in a single all-gather, and are folded in rank order, so all ranks get the same bits
+    assert x.dtype == torch.float32
+    partials = local_reduce(x, transform)
+
+    world_size = dist.get_world_size(group)
+    gathered = torch.empty(world_size, 2, dtype=partials.dtype, device=partials.device)
+    dist.all_gather(list(gathered.unbind(0)), partials, group=group)
+
+    y0 = gathered[:, 0].sum().reshape(1)
+    y1 = gathered[:, 1].max().reshape(1)
+    return y0, y1
@@ -0,0 +1,176 @@
+#pragma once
+
+#include "reduce/reduce.cuh"
+
+// Binning functors map a value to its bin, or -1 if it falls outside of all bins
+struct FixedWidthBinning
+{
+    float lo;
+    float hi;
+    uint32_t n_bins;
+
+    static FixedWidthBinning
+    make(float lo, float hi, const float *edges, uint32_t n_bins)
+    {
+        return {lo, hi, n_bins};
+    }
+
+    template <typename T>
+    __device__ __forceinline__ int
+    operator()(const T &value) const
+    {
+        const float x = static_cast<float>(value);
+        // Also drops NaNs, and `hi` falls into the last bin
+        if (!(x >= lo && x <= hi))
+        {
+            return -1;
+        }
+        const int bin = static_cast<int>((x - lo) / (hi - lo) * n_bins);
+        return bin < static_cast<int>(n_bins) ? bin : static_cast<int>(n_bins) - 1;
+    }
+};
+
+struct EdgesBinning
+{
+    const float *edges;
+    uint32_t n_bins;
+
+    static EdgesBinning
+    make(float lo, float hi, const float *edges, uint32_t n_bins)
+    {
+        return {edges, n_bins};
+    }
+
+    template <typename T>
+    __device__ __forceinline__ int
+    operator()(const T &value) const
+    {
+        const float x = static_cast<float>(value);
+        if (!(x >= __ldg(&edges[0]) && x <= __ldg(&edges[n_bins])))
+        {
+            return -1;
+        }
+
+        // The last bin whose left edge is not greater than `x`
+        int lo = 0, hi = static_cast<int>(n_bins) - 1;
+        while (lo < hi)
+        {
+            const int mid = (lo + hi + 1) / 2;
+            if (__ldg(&edges[mid]) <= x)
+            {
+                lo = mid;
+            }
+            else
+            {
+                hi = mid - 1;
+            }
+        }
+        return lo;
+    }
+};
+
+struct IndexBinning
+{
+    uint32_t n_bins;
+
+    static IndexBinning
+    make(float lo, float hi, const float *edges, uint32_t n_bins)
+    {
+        return {n_bins};
+    }
+
+    template <typename T>
+    __device__ __forceinline__ int
+    operator()(const T &value) const
+    {
+        return (value >= 0 && value < static_cast<T>(n_bins)) ? static_cast<int>(value) : -1;
+    }
+};
+
+template <typename T, class Binning, typename T_COUNT, bool HAS_WEIGHTS, int ITEMS_PER_THREAD, int BINS_PER_BLOCK>
+__global__ void
+block_histogram(
+    const T *__restrict__ input,
+    const float *__restrict__ weights,
+    const uint32_t n_elements,
+    const Binning binning,
+    T_COUNT *__restrict__ output)
+{
+    // Every block privatises a slice of `BINS_PER_BLOCK` bins, selected by `blockIdx.y`
+    __shared__ T_COUNT sbins[BINS_PER_BLOCK];
+    const int bin_base = blockIdx.y * BINS_PER_BLOCK;
+
+    for (int b = threadIdx.x; b < BINS_PER_BLOCK; b += blockDim.x)
+    {
+        sbins[b] = T_COUNT(0);
+    }
+    __syncthreads();
+
+    auto accumulate = [&](const T &value, const uint32_t idx)
+    {
+        const int bin = binning(value);
+        if (bin >= bin_base && bin < bin_base + BINS_PER_BLOCK)
+        {
+            if constexpr (HAS_WEIGHTS)
+            {
+                atomicAdd(&sbins[bin - bin_base], weights[idx]);
+            }
+            else
+            {
+                atomicAdd(&sbins[bin - bin_base], T_COUNT(1));
+            }
+        }
+    };
+
+    using Load = VectorLoad<T>;
+    const uint32_t n_vector_loads = n_elements / Load::kElems;
+    const uint32_t base_idx = threadIdx.x + blockIdx.x * blockDim.x * ITEMS_PER_THREAD;
+    for (int item = 0; item < ITEMS_PER_THREAD; ++item)
+    {
+        const uint32_t i = base_idx + item * blockDim.x;
+        if (i < n_vector_loads)
+        {
+            alignas(16) T vals[Load::kElems];
+            Load::load(input, i, vals);
+
+#pragma unroll
+            for (int j = 0; j < Load::kElems; j++)
+            {
+                accumulate(vals[j], i * Load::kElems + j);
+            }
+        }
+    }
+
+    // Elements which do not fill a whole vector
+    if (blockIdx.x == 0)
+    {
+        for (uint32_t i = n_vector_loads * Load::kElems + threadIdx.x; i < n_elements; i += blockDim.x)
+        {
+            accumulate(input[i], i);
+        }
+    }
+
+    __syncthreads();
+
+    for (int b = threadIdx.x; b < BINS_PER_BLOCK && static_cast<uint32_t>(bin_base + b) < binning.n_bins; b += blockDim.x)
+    {
+        if (sbins[b] != T_COUNT(0))
+        {
+            atomicAdd(&output[bin_base + b], sbins[b]);
+        }
+    }
+}
+
+template <typename T, class Binning, typename T_COUNT, bool HAS_WEIGHTS,
+          const int BLOCK_SIZE = 256, const int ITEMS_PER_THREAD = 4, const int BINS_PER_BLOCK = 1024>
+int histogram_c(const T *d_input, const float *d_weights, int n_elements, Binning binning, T_COUNT *d_output, cudaStream_t stream = 0)
+{
+    // NOTES: `d_output` must be zeroed
+    const uint32_t n_vector_loads = n_elements / VectorLoad<T>::kElems;
+    const dim3 blocks(
+        std::max<uint32_t>(1, get_reduce_blocks<BLOCK_SIZE, ITEMS_PER_THREAD>(n_vector_loads)),
+        (binning.n_bins + BINS_PER_BLOCK - 1) / BINS_PER_BLOCK);
+    block_histogram<T, Binning, T_COUNT, HAS_WEIGHTS, ITEMS_PER_THREAD, BINS_PER_BLOCK><<<blocks, BLOCK_SIZE, 0, stream>>>(
+        d_input, d_weights, n_elements, binning, d_output);
+    return static_cast<int>(cudaGetLastError());
+}
@@ -0,0 +1,44 @@
+#pragma once
+
+#include <cstdint>
+
+#ifdef __CUDACC__
+#define COPYAN_HOST_DEVICE __host__ __device__
+#else
+#define COPYAN_HOST_DEVICE
+#endif
+
+constexpr int kMaxDims = 4;
+
+// Shape and strides (in elements) of a tensor argument, passed by value
+// NOTES: must match `copyan.jit.template.Layout`
+struct Layout
+{
+    int ndim;
+    int64_t shape[kMaxDims];
+    int64_t strides[kMaxDims];
+
+    COPYAN_HOST_DEVICE int64_t
+    numel() const
+    {
+        int64_t n = 1;
+        for (int d = 0; d < ndim; ++d)
+        {
+            n *= shape[d];
+        }
+        return n;
+    }
+
+    // Offset of the `index`-th element in row-major logical order
+    COPYAN_HOST_DEVICE int64_t
+    offset(int64_t index) const
+    {
+        int64_t offset = 0;
+        for (int d = ndim - 1; d >= 0; --d)
+        {
+            offset += (index % shape[d]) * strides[d];
+            index /= shape[d];
+        }
+        return offset;
+    }
+};
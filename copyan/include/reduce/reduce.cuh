@@ -1,5 +1,7 @@
 #include <cute/tensor.hpp>
 
+#include "layout/layout.cuh"
+
 using namespace cute;
 
 template <class T>
@@ -27,6 +29,72 @@ struct SumOp
 template <class T>
 struct MaxOp;
 
+// Transforms are applied to every loaded element before the reduction, e.g. a sum of squares for norms
+// Any `__device__` callable works, including extended lambdas
+struct IdentityOp
+{
+    template <class T>
+    __device__ __forceinline__ T
+    operator()(const T &x) const
+    {
+        return x;
+    }
+};
+
+struct SquareOp
+{
+    template <class T>
+    __device__ __forceinline__ T
+    operator()(const T &x) const
+    {
+        return x * x;
+    }
+};
+
+struct AbsOp
+{
+    template <class T>
+    __device__ __forceinline__ T
+    operator()(const T &x) const
+    {
+        return x < T(0) ? -x : x;
+    }
+};
+
+struct ExpShiftOp
+{
+    // `exp(x - shift)`, with the max as the shift for stable softmax denominators
+    float shift;
+
+    template <class T>
+    __device__ __forceinline__ T
+    operator()(const T &x) const
+    {
+        return T(__expf(static_cast<float>(x) - shift));
+    }
+};
+
+// `Atomic` folds block results straight into a pre-initialised output,
+// `Tree` writes them to a workspace which a second pass reduces in a fixed order (deterministic, no pre-initialisation)
+enum class ReduceMode
+{
+    Atomic,
+    Tree
+};
+
+// 16-byte vectorised loads, `vals` must be 16-byte aligned
+template <typename T>
+struct VectorLoad
+{
+    static constexpr int kElems = 16 / sizeof(T);
+
+    __device__ __forceinline__ static void
+    load(const T *__restrict__ input, const uint32_t i, T (&vals)[kElems])
+    {
+        *reinterpret_cast<int4 *>(&vals[0]) = reinterpret_cast<const int4 *>(input)[i];
+    }
+};
+
 template <class T, class ReduceOp>
 __device__ __forceinline__ T
 warp_reduce(T val, ReduceOp op)
@@ -39,14 +107,43 @@ warp_reduce(T val, ReduceOp op)
     return val;
 }
 
-template <typename T, typename T_OUT, class ReduceOp, int ITEMS_PER_THREAD = 1>
+// Reduction across the block, the result is only valid in thread 0
+template <class T, class ReduceOp>
+__device__ __forceinline__ T
+block_fold(T val, ReduceOp reduce_op)
+{
+    // 最大线程数为 1024 index对应warp id 非lane id
+    static __shared__ T sdata[32];
+
+    int lane = threadIdx.x % warpSize;
+    int wid = threadIdx.x / warpSize;
+
+    val = warp_reduce(val, reduce_op);
+
+    if (lane == 0)
+    {
+        sdata[wid] = val;
+    }
+
+    __syncthreads();
+
+    if (wid == 0)
+    {
+        val = (threadIdx.x < blockDim.x / warpSize) ? sdata[lane] : reduce_op.identity();
+        val = warp_reduce(val, reduce_op);
+    }
+    return val;
+}
+
+template <typename T, typename T_OUT, class ReduceOp, int ITEMS_PER_THREAD = 1, ReduceMode MODE = ReduceMode::Atomic, class TransformOp = IdentityOp>
 __global__ void
 block_reduce(
     const uint32_t n_vector_loads,
     const ReduceOp reduce_op,
     const T *__restrict__ input,
     T_OUT *__restrict__ output,
-    const uint32_t blocks_per_reduction)
+    const uint32_t blocks_per_reduction,
+    const TransformOp transform = TransformOp())
 {
     const uint32_t reduction_idx = blockIdx.x / blocks_per_reduction;
     const uint32_t sub_blocks_idx = blockIdx.x % blocks_per_reduction;
@@ -54,12 +151,6 @@ block_reduce(
     const uint32_t base_idx = threadIdx.x + sub_blocks_idx * blockDim.x * ITEMS_PER_THREAD;
     const uint32_t block_offset = reduction_idx * n_vector_loads;
 
-    // 最大线程数为 1024 index对应warp id 非lane id
-    static __shared__ T_OUT sdata[32];
-
-    int lane = threadIdx.x % warpSize;
-    int wid = threadIdx.x / warpSize;
-
     using T_DECAYED = std::decay_t<T>;
 
     T_OUT val = reduce_op.identity();
@@ -72,9 +163,9 @@ block_reduce(
             if (i < n_vector_loads)
             {
                 float4 vals = reinterpret_cast<const float4 *>(input)[i + block_offset];
-                T_OUT local_val = reduce_op(vals.x, vals.y);
-                local_val = reduce_op(local_val, vals.z);
-                local_val = reduce_op(local_val, vals.w);
+                T_OUT local_val = reduce_op(transform(vals.x), transform(vals.y));
+                local_val = reduce_op(local_val, transform(vals.z));
+                local_val = reduce_op(local_val, transform(vals.w));
                 val = reduce_op(val, local_val);
             }
         }
@@ -86,15 +177,15 @@ block_reduce(
             const uint32_t i = base_idx + item * blockDim.x;
             if (i < n_vector_loads)
             {
-                ::half vals[8];
-                *(int4 *)&vals[0] = *((int4 *)input + i + block_offset);
+                alignas(16) ::half vals[8];
+                VectorLoad<::half>::load(reinterpret_cast<const ::half *>(input), i + block_offset, vals);
 
-                T_OUT local_val = vals[0];
+                T_OUT local_val = transform(vals[0]);
 
 #pragma unroll
                 for (int j = 1; j < 8; j++)
                 {
-                    local_val = reduce_op(local_val, vals[j]);
+                    local_val = reduce_op(local_val, transform(vals[j]));
                 }
                 val = reduce_op(val, local_val);
             }
@@ -105,30 +196,68 @@ block_reduce(
         assert(false);
     }
 
-    val = warp_reduce(val, reduce_op);
+    val = block_fold(val, reduce_op);
 
-    if (lane == 0)
+    if (threadIdx.x == 0)
     {
-        sdata[wid] = val;
+        if constexpr (MODE == ReduceMode::Atomic)
+        {
+            reduce_op.atomic_op(&output[reduction_idx], val);
+        }
+        else
+        {
+            output[blockIdx.x] = val;
+        }
     }
+}
 
-    __syncthreads();
+template <typename T_OUT, class ReduceOp>
+__global__ void
+reduce_partials(
+    const T_OUT *__restrict__ partials,
+    const ReduceOp reduce_op,
+    T_OUT *__restrict__ output,
+    const uint32_t blocks_per_reduction)
+{
+    // One block per reduction, every thread folds a fixed strided subset in order
+    const T_OUT *block_partials = partials + blockIdx.x * blocks_per_reduction;
 
-    if (wid == 0)
+    T_OUT val = reduce_op.identity();
+    for (uint32_t i = threadIdx.x; i < blocks_per_reduction; i += blockDim.x)
     {
-        val = (threadIdx.x < blockDim.x / warpSize) ? sdata[lane] : reduce_op.identity();
-        val = warp_reduce(val, reduce_op);
+        val = reduce_op(val, block_partials[i]);
+    }
 
-        if (lane == 0)
-        {
-            reduce_op.atomic_op(&output[reduction_idx], val);
-        }
+    val = block_fold(val, reduce_op);
+
+    if (threadIdx.x == 0)
+    {
+        output[blockIdx.x] = val;
     }
 }
 
-template <typename T, const int BLOCK_SIZE = 1024, const int ITEMS_PER_THREAD = 16>
-void reduce_sum_c(T *d_input, T *d_output, int n_elements, cudaStream_t stream = 0)
+template <const int BLOCK_SIZE = 1024, const int ITEMS_PER_THREAD = 16>
+constexpr uint32_t
+get_reduce_blocks(uint32_t n_vector_loads)
 {
+    uint32_t blocks = (n_vector_loads + BLOCK_SIZE - 1) / BLOCK_SIZE;
+    return (blocks + ITEMS_PER_THREAD - 1) / ITEMS_PER_THREAD;
+}
+
+template <typename T, class ReduceOp, const int BLOCK_SIZE, const int ITEMS_PER_THREAD, ReduceMode MODE, class TransformOp>
+int reduce_c(T *d_input, T *d_output, int n_elements, T *d_workspace, int workspace_size, cudaStream_t stream, const TransformOp transform)
+{
+    // Empty inputs leave `Atomic` outputs as they are, `Tree` mode writes the identity
+    if (n_elements == 0)
+    {
+        if constexpr (MODE == ReduceMode::Tree)
+        {
+            reduce_partials<T, ReduceOp><<<1, 1024, 0, stream>>>(d_workspace, ReduceOp(), d_output, 0);
+            return static_cast<int>(cudaGetLastError());
+        }
+        return 0;
+    }
+
     const uint32_t threads = BLOCK_SIZE;
 
     const uint32_t N_ELEMS_PER_LOAD = 16 / sizeof(T);
@@ -137,25 +266,126 @@ void reduce_sum_c(T *d_input, T *d_output, int n_elements, cudaStream_t stream =
 
     n_elements /= N_ELEMS_PER_LOAD;
 
-    uint32_t blocks = (n_elements + threads - 1) / threads;
-    blocks = (blocks + ITEMS_PER_THREAD - 1) / ITEMS_PER_THREAD;
-    block_reduce<T, T, SumOp<T>, ITEMS_PER_THREAD><<<blocks, threads, 0, stream>>>(n_elements, SumOp<T>(), d_input, d_output, blocks);
+    uint32_t blocks = get_reduce_blocks<BLOCK_SIZE, ITEMS_PER_THREAD>(n_elements);
+    if constexpr (MODE == ReduceMode::Atomic)
+    {
+        block_reduce<T, T, ReduceOp, ITEMS_PER_THREAD, MODE, TransformOp><<<blocks, threads, 0, stream>>>(n_elements, ReduceOp(), d_input, d_output, blocks, transform);
+    }
+    else
+    {
+        // The workspace holds one partial per block
+        if (d_workspace == nullptr || workspace_size < static_cast<int>(blocks))
+        {
+            return 1;
+        }
+        block_reduce<T, T, ReduceOp, ITEMS_PER_THREAD, MODE, TransformOp><<<blocks, threads, 0, stream>>>(n_elements, ReduceOp(), d_input, d_workspace, blocks, transform);
+        reduce_partials<T, ReduceOp><<<1, 1024, 0, stream>>>(d_workspace, ReduceOp(), d_output, blocks);
+    }
+    return static_cast<int>(cudaGetLastError());
 }
 
-template <typename T, const int BLOCK_SIZE = 1024, const int ITEMS_PER_THREAD = 16>
-void reduce_max_c(T *d_input, T *d_output, int n_elements, cudaStream_t stream = 0)
+template <typename T, const int BLOCK_SIZE = 1024, const int ITEMS_PER_THREAD = 16, ReduceMode MODE = ReduceMode::Atomic, class TransformOp = IdentityOp>
+int reduce_sum_c(T *d_input, T *d_output, int n_elements, T *d_workspace = nullptr, int workspace_size = 0, cudaStream_t stream = 0, const TransformOp transform = TransformOp())
 {
-    const uint32_t threads = BLOCK_SIZE;
+    return reduce_c<T, SumOp<T>, BLOCK_SIZE, ITEMS_PER_THREAD, MODE, TransformOp>(d_input, d_output, n_elements, d_workspace, workspace_size, stream, transform);
+}
 
-    const uint32_t N_ELEMS_PER_LOAD = 16 / sizeof(T);
+template <typename T, const int BLOCK_SIZE = 1024, const int ITEMS_PER_THREAD = 16, ReduceMode MODE = ReduceMode::Atomic, class TransformOp = IdentityOp>
+int reduce_max_c(T *d_input, T *d_output, int n_elements, T *d_workspace = nullptr, int workspace_size = 0, cudaStream_t stream = 0, const TransformOp transform = TransformOp())
+{
+    return reduce_c<T, MaxOp<T>, BLOCK_SIZE, ITEMS_PER_THREAD, MODE, TransformOp>(d_input, d_output, n_elements, d_workspace, workspace_size, stream, transform);
+}
 
-    assert(n_elements % N_ELEMS_PER_LOAD == 0);
+// Any layout of up to `kMaxDims` dims, walked in logical order with consecutive threads on consecutive elements
+// NOTES: the host coalesces the layout first, so that the last dim is the one with the smallest stride
+template <typename T, class ReduceOp, int BLOCK_SIZE, int ITEMS_PER_THREAD, ReduceMode MODE = ReduceMode::Atomic, class TransformOp = IdentityOp>
+__global__ void
+strided_block_reduce(
+    const int64_t n_elements,
+    const Layout layout,
+    const ReduceOp reduce_op,
+    const T *__restrict__ input,
+    T *__restrict__ output,
+    const TransformOp transform = TransformOp())
+{
+    const int64_t tile_base = static_cast<int64_t>(blockIdx.x) * BLOCK_SIZE * ITEMS_PER_THREAD;
 
-    n_elements /= N_ELEMS_PER_LOAD;
+    T val = reduce_op.identity();
+    for (int item = 0; item < ITEMS_PER_THREAD; ++item)
+    {
+        const int64_t i = tile_base + item * BLOCK_SIZE + threadIdx.x;
+        if (i < n_elements)
+        {
+            val = reduce_op(val, transform(input[layout.offset(i)]));
+        }
+    }
+
+    val = block_fold(val, reduce_op);
+
+    if (threadIdx.x == 0)
+    {
+        if constexpr (MODE == ReduceMode::Atomic)
+        {
+            reduce_op.atomic_op(output, val);
+        }
+        else
+        {
+            output[blockIdx.x] = val;
+        }
+    }
+}
+
+// Tiles of `4 * ITEMS_PER_THREAD` elements per thread, so that the workspace bound of `reduce_c` holds
+template <const int BLOCK_SIZE, const int ITEMS_PER_THREAD>
+constexpr uint32_t
+get_strided_reduce_blocks(int64_t n_elements)
+{
+    return get_reduce_blocks<BLOCK_SIZE, ITEMS_PER_THREAD>(static_cast<uint32_t>((n_elements + 3) / 4));
+}
 
-    uint32_t blocks = (n_elements + threads - 1) / threads;
-    blocks = (blocks + ITEMS_PER_THREAD - 1) / ITEMS_PER_THREAD;
-    block_reduce<T, T, MaxOp<T>, ITEMS_PER_THREAD><<<blocks, threads, 0, stream>>>(n_elements, MaxOp<T>(), d_input, d_output, blocks);
+template <typename T, class ReduceOp, const int BLOCK_SIZE, const int ITEMS_PER_THREAD, ReduceMode MODE, class TransformOp>
+int strided_reduce_c(const T *d_input, const Layout layout, T *d_output, T *d_workspace, int workspace_size, cudaStream_t stream, const TransformOp transform)
+{
+    const int64_t n_elements = layout.numel();
+    // Empty inputs leave `Atomic` outputs as they are, `Tree` mode writes the identity
+    if (n_elements == 0)
+    {
+        if constexpr (MODE == ReduceMode::Tree)
+        {
+            reduce_partials<T, ReduceOp><<<1, 1024, 0, stream>>>(d_workspace, ReduceOp(), d_output, 0);
+            return static_cast<int>(cudaGetLastError());
+        }
+        return 0;
+    }
+
+    constexpr int ITEMS = 4 * ITEMS_PER_THREAD;
+    const uint32_t blocks = get_strided_reduce_blocks<BLOCK_SIZE, ITEMS_PER_THREAD>(n_elements);
+    if constexpr (MODE == ReduceMode::Atomic)
+    {
+        strided_block_reduce<T, ReduceOp, BLOCK_SIZE, ITEMS, MODE, TransformOp><<<blocks, BLOCK_SIZE, 0, stream>>>(n_elements, layout, ReduceOp(), d_input, d_output, transform);
+    }
+    else
+    {
+        if (d_workspace == nullptr || workspace_size < static_cast<int>(blocks))
+        {
+            return 1;
+        }
+        strided_block_reduce<T, ReduceOp, BLOCK_SIZE, ITEMS, MODE, TransformOp><<<blocks, BLOCK_SIZE, 0, stream>>>(n_elements, layout, ReduceOp(), d_input, d_workspace, transform);
+        reduce_partials<T, ReduceOp><<<1, 1024, 0, stream>>>(d_workspace, ReduceOp(), d_output, blocks);
+    }
+    return static_cast<int>(cudaGetLastError());
+}
+
+template <typename T, const int BLOCK_SIZE = 1024, const int ITEMS_PER_THREAD = 16, ReduceMode MODE = ReduceMode::Atomic, class TransformOp = IdentityOp>
+int strided_reduce_sum_c(const T *d_input, const Layout layout, T *d_output, T *d_workspace = nullptr, int workspace_size = 0, cudaStream_t stream = 0, const TransformOp transform = TransformOp())
+{
+    return strided_reduce_c<T, SumOp<T>, BLOCK_SIZE, ITEMS_PER_THREAD, MODE, TransformOp>(d_input, layout, d_output, d_workspace, workspace_size, stream, transform);
+}
+
+template <typename T, const int BLOCK_SIZE = 1024, const int ITEMS_PER_THREAD = 16, ReduceMode MODE = ReduceMode::Atomic, class TransformOp = IdentityOp>
+int strided_reduce_max_c(const T *d_input, const Layout layout, T *d_output, T *d_workspace = nullptr, int workspace_size = 0, cudaStream_t stream = 0, const TransformOp transform = TransformOp())
+{
+    return strided_reduce_c<T, MaxOp<T>, BLOCK_SIZE, ITEMS_PER_THREAD, MODE, TransformOp>(d_input, layout, d_output, d_workspace, workspace_size, stream, transform);
 }
 
 template <>
@@ -170,7 +400,7 @@ struct MaxOp<float>
     __device__ __forceinline__ float
     identity() const
     {
-        return -1e20f;
+        return -INFINITY;
     }
 
     __device__ __forceinline__ void
@@ -200,7 +430,8 @@ struct MaxOp<half>
     __device__ __forceinline__ half
     identity() const
     {
-        return __float2half(-1e4f);
+        // -inf
+        return __ushort_as_half(0xFC00);
     }
 
     __device__ __forceinline__ void
@@ -0,0 +1,80 @@
+#pragma once
+
+#include "scan/device_scan.cuh"
+
+// The exclusive scan of the mask gives the output positions of the selected items
+// `PARTITION` also writes the other items, stably, after the selected ones
+// With `INDICES`, the input indices are written instead of the input values
+template <typename T, bool PARTITION, bool INDICES>
+__global__ void
+compact_scatter(
+    const T *__restrict__ input,
+    const bool *__restrict__ mask,
+    const uint32_t *__restrict__ positions,
+    const uint32_t n,
+    T *__restrict__ output,
+    int *__restrict__ count)
+{
+    const uint32_t n_selected = positions[n - 1] + (mask[n - 1] ? 1 : 0);
+
+    const uint32_t i = blockIdx.x * blockDim.x + threadIdx.x;
+    if (i < n)
+    {
+        T value;
+        if constexpr (INDICES)
+        {
+            value = static_cast<T>(i);
+        }
+        else
+        {
+            value = input[i];
+        }
+
+        if (mask[i])
+        {
+            output[positions[i]] = value;
+        }
+        else if constexpr (PARTITION)
+        {
+            output[n_selected + i - positions[i]] = value;
+        }
+    }
+
+    if (i == 0)
+    {
+        *count = static_cast<int>(n_selected);
+    }
+}
+
+template <const int BLOCK_SIZE, const int ITEMS_PER_THREAD>
+constexpr uint32_t
+get_compact_workspace_size(uint32_t n)
+{
+    return n + get_scan_tiles<BLOCK_SIZE, ITEMS_PER_THREAD>(n);
+}
+
+template <typename T, bool PARTITION, bool INDICES, const int BLOCK_SIZE = 256, const int ITEMS_PER_THREAD = 8>
+int compact_c(const T *d_input, const bool *d_mask, int n, T *d_output, int *d_count, uint32_t *d_workspace, int workspace_size, cudaStream_t stream = 0)
+{
+    if (n == 0)
+    {
+        cudaMemsetAsync(d_count, 0, sizeof(int), stream);
+        return static_cast<int>(cudaGetLastError());
+    }
+
+    // The workspace holds the positions, followed by the scan tile sums
+    if (d_workspace == nullptr || workspace_size < static_cast<int>(get_compact_workspace_size<BLOCK_SIZE, ITEMS_PER_THREAD>(n)))
+    {
+        return 1;
+    }
+
+    int return_code = device_exclusive_scan_c<bool, BLOCK_SIZE, ITEMS_PER_THREAD>(d_mask, d_workspace, n, d_workspace + n, workspace_size - n, stream);
+    if (return_code != 0)
+    {
+        return return_code;
+    }
+
+    compact_scatter<T, PARTITION, INDICES><<<(n + BLOCK_SIZE - 1) / BLOCK_SIZE, BLOCK_SIZE, 0, stream>>>(
+        d_input, d_mask, d_workspace, n, d_output, d_count);
+    return static_cast<int>(cudaGetLastError());
+}
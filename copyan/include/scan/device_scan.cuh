@@ -0,0 +1,187 @@
+#pragma once
+
+#include <cstdint>
+
+// Exclusive scan of one value per thread across the block, `total` receives the block sum
+template <int BLOCK_SIZE, typename T = uint32_t>
+__device__ __forceinline__ T
+block_exclusive_scan(const T val, T &total)
+{
+    static_assert(BLOCK_SIZE % 32 == 0 && BLOCK_SIZE <= 1024);
+
+    static __shared__ T warp_sums[32];
+    static __shared__ T block_total;
+
+    const int lane = threadIdx.x % 32;
+    const int wid = threadIdx.x / 32;
+
+    T inclusive = val;
+#pragma unroll
+    for (int offset = 1; offset < 32; offset *= 2)
+    {
+        const T other = __shfl_up_sync(0xffffffff, inclusive, offset);
+        if (lane >= offset)
+        {
+            inclusive += other;
+        }
+    }
+    if (lane == 31)
+    {
+        warp_sums[wid] = inclusive;
+    }
+    __syncthreads();
+
+    if (wid == 0)
+    {
+        const T warp_sum = lane < BLOCK_SIZE / 32 ? warp_sums[lane] : T(0);
+        T warp_inclusive = warp_sum;
+#pragma unroll
+        for (int offset = 1; offset < 32; offset *= 2)
+        {
+            const T other = __shfl_up_sync(0xffffffff, warp_inclusive, offset);
+            if (lane >= offset)
+            {
+                warp_inclusive += other;
+            }
+        }
+        if (lane < BLOCK_SIZE / 32)
+        {
+            warp_sums[lane] = warp_inclusive - warp_sum;
+        }
+        if (lane == 31)
+        {
+            block_total = warp_inclusive;
+        }
+    }
+    __syncthreads();
+
+    const T exclusive = warp_sums[wid] + inclusive - val;
+    total = block_total;
+    // The shared buffers may be reused right after
+    __syncthreads();
+    return exclusive;
+}
+
+template <const int BLOCK_SIZE, const int ITEMS_PER_THREAD>
+constexpr uint32_t
+get_scan_tiles(uint32_t n)
+{
+    return (n + BLOCK_SIZE * ITEMS_PER_THREAD - 1) / (BLOCK_SIZE * ITEMS_PER_THREAD);
+}
+
+// Pass 1: every tile is scanned locally, and its sum is written to `tile_sums`
+template <typename T_IN, int BLOCK_SIZE, int ITEMS_PER_THREAD>
+__global__ void
+scan_tiles(
+    const T_IN *__restrict__ input,
+    uint32_t *__restrict__ output,
+    const uint32_t n,
+    uint32_t *__restrict__ tile_sums)
+{
+    // Coalesced loads into shared memory, then every thread scans `ITEMS_PER_THREAD` consecutive items
+    __shared__ uint32_t tile[BLOCK_SIZE * ITEMS_PER_THREAD];
+    const uint32_t tile_base = blockIdx.x * BLOCK_SIZE * ITEMS_PER_THREAD;
+
+#pragma unroll
+    for (int item = 0; item < ITEMS_PER_THREAD; ++item)
+    {
+        const uint32_t i = item * BLOCK_SIZE + threadIdx.x;
+        tile[i] = tile_base + i < n ? static_cast<uint32_t>(input[tile_base + i]) : 0;
+    }
+    __syncthreads();
+
+    uint32_t thread_sum = 0;
+#pragma unroll
+    for (int item = 0; item < ITEMS_PER_THREAD; ++item)
+    {
+        thread_sum += tile[threadIdx.x * ITEMS_PER_THREAD + item];
+    }
+
+    uint32_t tile_sum;
+    uint32_t prefix = block_exclusive_scan<BLOCK_SIZE>(thread_sum, tile_sum);
+
+#pragma unroll
+    for (int item = 0; item < ITEMS_PER_THREAD; ++item)
+    {
+        const uint32_t val = tile[threadIdx.x * ITEMS_PER_THREAD + item];
+        tile[threadIdx.x * ITEMS_PER_THREAD + item] = prefix;
+        prefix += val;
+    }
+    __syncthreads();
+
+#pragma unroll
+    for (int item = 0; item < ITEMS_PER_THREAD; ++item)
+    {
+        const uint32_t i = item * BLOCK_SIZE + threadIdx.x;
+        if (tile_base + i < n)
+        {
+            output[tile_base + i] = tile[i];
+        }
+    }
+
+    if (threadIdx.x == 0)
+    {
+        tile_sums[blockIdx.x] = tile_sum;
+    }
+}
+
+// Pass 2: a single block scans the tile sums in place, carrying across chunks
+template <int BLOCK_SIZE>
+__global__ void
+scan_tile_sums(uint32_t *__restrict__ tile_sums, const uint32_t n_tiles)
+{
+    uint32_t carry = 0;
+    for (uint32_t base = 0; base < n_tiles; base += BLOCK_SIZE)
+    {
+        const uint32_t i = base + threadIdx.x;
+        const uint32_t val = i < n_tiles ? tile_sums[i] : 0;
+
+        uint32_t total;
+        const uint32_t prefix = block_exclusive_scan<BLOCK_SIZE>(val, total);
+        if (i < n_tiles)
+        {
+            tile_sums[i] = carry + prefix;
+        }
+        carry += total;
+    }
+}
+
+// Pass 3: add the scanned tile sums back
+template <int BLOCK_SIZE, int ITEMS_PER_THREAD>
+__global__ void
+add_tile_offsets(uint32_t *__restrict__ output, const uint32_t n, const uint32_t *__restrict__ tile_sums)
+{
+    const uint32_t offset = tile_sums[blockIdx.x];
+    const uint32_t tile_base = blockIdx.x * BLOCK_SIZE * ITEMS_PER_THREAD;
+
+#pragma unroll
+    for (int item = 0; item < ITEMS_PER_THREAD; ++item)
+    {
+        const uint32_t i = tile_base + item * BLOCK_SIZE + threadIdx.x;
+        if (i < n)
+        {
+            output[i] += offset;
+        }
+    }
+}
+
+// Exclusive prefix sum of `d_input` (cast to `uint32_t`), the workspace holds one sum per tile
+template <typename T_IN, const int BLOCK_SIZE = 256, const int ITEMS_PER_THREAD = 8>
+int device_exclusive_scan_c(const T_IN *d_input, uint32_t *d_output, int n, uint32_t *d_workspace, int workspace_size, cudaStream_t stream = 0)
+{
+    if (n == 0)
+    {
+        return 0;
+    }
+
+    const uint32_t n_tiles = get_scan_tiles<BLOCK_SIZE, ITEMS_PER_THREAD>(n);
+    if (d_workspace == nullptr || workspace_size < static_cast<int>(n_tiles))
+    {
+        return 1;
+    }
+
+    scan_tiles<T_IN, BLOCK_SIZE, ITEMS_PER_THREAD><<<n_tiles, BLOCK_SIZE, 0, stream>>>(d_input, d_output, n, d_workspace);
+    scan_tile_sums<BLOCK_SIZE><<<1, BLOCK_SIZE, 0, stream>>>(d_workspace, n_tiles);
+    add_tile_offsets<BLOCK_SIZE, ITEMS_PER_THREAD><<<n_tiles, BLOCK_SIZE, 0, stream>>>(d_output, n, d_workspace);
+    return static_cast<int>(cudaGetLastError());
+}
@@ -139,16 +139,17 @@ scan_phase3(float *Y, unsigned int N, float *block_sums)
 }
 
 template <int BLOCK_SIZE = 1024>
-void naive_scan_c(float *X, float *Y, unsigned int N)
+void naive_scan_c(float *X, float *Y, unsigned int N, cudaStream_t stream = 0)
 {
     int num_blocks = (N + BLOCK_SIZE - 1) / BLOCK_SIZE;
     num_blocks = (num_blocks + CFACTOR - 1) / CFACTOR;
 
+    // Stream-ordered allocation, so that no device-wide synchronization is implied
     float *block_sums;
-    cudaMalloc(&block_sums, num_blocks * sizeof(float));
+    cudaMallocAsync(&block_sums, num_blocks * sizeof(float), stream);
 
-    scan_phase1<<<num_blocks, BLOCK_SIZE / 2>>>(X, Y, N, block_sums);
-    scan_phase2<<<1, BLOCK_SIZE / 2>>>(num_blocks, block_sums);
-    scan_phase3<<<num_blocks, BLOCK_SIZE>>>(Y, N, block_sums);
-    cudaFree(block_sums);
+    scan_phase1<<<num_blocks, BLOCK_SIZE / 2, 0, stream>>>(X, Y, N, block_sums);
+    scan_phase2<<<1, BLOCK_SIZE / 2, 0, stream>>>(num_blocks, block_sums);
+    scan_phase3<<<num_blocks, BLOCK_SIZE, 0, stream>>>(Y, N, block_sums);
+    cudaFreeAsync(block_sums, stream);
 }
\ No newline at end of file
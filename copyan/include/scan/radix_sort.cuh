@@ -0,0 +1,222 @@
+#pragma once
+
+#include "scan/device_scan.cuh"
+
+// Order-preserving maps of the keys to unsigned integers
+template <typename T>
+struct RadixTraits;
+
+template <>
+struct RadixTraits<float>
+{
+    __device__ __forceinline__ static uint32_t
+    to_bits(const float key)
+    {
+        // Negative floats are flipped entirely, positive ones only get their sign bit set
+        const uint32_t bits = __float_as_uint(key);
+        return bits ^ ((bits >> 31) ? 0xffffffffu : 0x80000000u);
+    }
+};
+
+template <>
+struct RadixTraits<int>
+{
+    __device__ __forceinline__ static uint32_t
+    to_bits(const int key)
+    {
+        return static_cast<uint32_t>(key) ^ 0x80000000u;
+    }
+};
+
+template <typename T, bool DESCENDING, int DIGIT_BITS>
+__device__ __forceinline__ uint32_t
+get_digit(const T &key, const int shift)
+{
+    uint32_t bits = RadixTraits<T>::to_bits(key);
+    if constexpr (DESCENDING)
+    {
+        bits = ~bits;
+    }
+    return (bits >> shift) & ((1u << DIGIT_BITS) - 1);
+}
+
+// Digit counts of every tile, stored digit-major so that their exclusive scan gives stable global offsets
+template <typename T, bool DESCENDING, int BLOCK_SIZE, int ITEMS_PER_THREAD, int DIGIT_BITS>
+__global__ void
+radix_histogram(
+    const T *__restrict__ keys,
+    const uint32_t n,
+    const int shift,
+    uint32_t *__restrict__ counts,
+    const uint32_t n_tiles)
+{
+    constexpr int RADIX = 1 << DIGIT_BITS;
+    __shared__ uint32_t hist[RADIX];
+
+    for (int d = threadIdx.x; d < RADIX; d += BLOCK_SIZE)
+    {
+        hist[d] = 0;
+    }
+    __syncthreads();
+
+    const uint32_t tile_base = blockIdx.x * BLOCK_SIZE * ITEMS_PER_THREAD;
+#pragma unroll
+    for (int item = 0; item < ITEMS_PER_THREAD; ++item)
+    {
+        const uint32_t i = tile_base + item * BLOCK_SIZE + threadIdx.x;
+        if (i < n)
+        {
+            atomicAdd(&hist[get_digit<T, DESCENDING, DIGIT_BITS>(keys[i], shift)], 1);
+        }
+    }
+    __syncthreads();
+
+    for (int d = threadIdx.x; d < RADIX; d += BLOCK_SIZE)
+    {
+        counts[d * n_tiles + blockIdx.x] = hist[d];
+    }
+}
+
+template <typename T, bool DESCENDING, bool HAS_VALUES, int BLOCK_SIZE, int ITEMS_PER_THREAD, int DIGIT_BITS>
+__global__ void
+radix_scatter(
+    const T *__restrict__ keys_in,
+    const int *__restrict__ values_in,
+    const uint32_t n,
+    const int shift,
+    const uint32_t *__restrict__ offsets,
+    const uint32_t n_tiles,
+    T *__restrict__ keys_out,
+    int *__restrict__ values_out)
+{
+    constexpr int RADIX = 1 << DIGIT_BITS;
+    // Per-thread digit counters, digit-major: their exclusive scan orders items by (digit, thread, item),
+    // which is the input order within a digit as every thread owns consecutive items
+    __shared__ uint32_t counters[RADIX * BLOCK_SIZE];
+    __shared__ uint32_t digit_starts[RADIX];
+    __shared__ uint32_t global_offsets[RADIX];
+
+    for (int d = 0; d < RADIX; ++d)
+    {
+        counters[d * BLOCK_SIZE + threadIdx.x] = 0;
+    }
+
+    // NOTES: loads are not coalesced, but every warp reuses the same cache lines across items
+    const uint32_t thread_base = (blockIdx.x * BLOCK_SIZE + threadIdx.x) * ITEMS_PER_THREAD;
+    T keys[ITEMS_PER_THREAD];
+    uint32_t digits[ITEMS_PER_THREAD];
+#pragma unroll
+    for (int item = 0; item < ITEMS_PER_THREAD; ++item)
+    {
+        const uint32_t i = thread_base + item;
+        digits[item] = RADIX;
+        if (i < n)
+        {
+            keys[item] = keys_in[i];
+            digits[item] = get_digit<T, DESCENDING, DIGIT_BITS>(keys[item], shift);
+            counters[digits[item] * BLOCK_SIZE + threadIdx.x] += 1;
+        }
+    }
+    __syncthreads();
+
+    // Every thread scans `RADIX` consecutive counters of the flattened array
+    uint32_t thread_sum = 0;
+    for (int j = 0; j < RADIX; ++j)
+    {
+        thread_sum += counters[threadIdx.x * RADIX + j];
+    }
+
+    uint32_t tile_sum;
+    uint32_t prefix = block_exclusive_scan<BLOCK_SIZE>(thread_sum, tile_sum);
+    for (int j = 0; j < RADIX; ++j)
+    {
+        const uint32_t val = counters[threadIdx.x * RADIX + j];
+        counters[threadIdx.x * RADIX + j] = prefix;
+        prefix += val;
+    }
+    __syncthreads();
+
+    for (int d = threadIdx.x; d < RADIX; d += BLOCK_SIZE)
+    {
+        digit_starts[d] = counters[d * BLOCK_SIZE];
+        global_offsets[d] = offsets[d * n_tiles + blockIdx.x];
+    }
+    __syncthreads();
+
+#pragma unroll
+    for (int item = 0; item < ITEMS_PER_THREAD; ++item)
+    {
+        const uint32_t d = digits[item];
+        if (d < RADIX)
+        {
+            const uint32_t rank = counters[d * BLOCK_SIZE + threadIdx.x]++;
+            const uint32_t position = global_offsets[d] + rank - digit_starts[d];
+            keys_out[position] = keys[item];
+            if constexpr (HAS_VALUES)
+            {
+                values_out[position] = values_in[thread_base + item];
+            }
+        }
+    }
+}
+
+template <const int BLOCK_SIZE, const int ITEMS_PER_THREAD, const int DIGIT_BITS>
+constexpr uint32_t
+get_radix_sort_workspace_size(uint32_t n)
+{
+    // Alternate keys and values, then the digit counts, their offsets and the scan tile sums
+    const uint32_t n_counts = (1u << DIGIT_BITS) * get_scan_tiles<BLOCK_SIZE, ITEMS_PER_THREAD>(n);
+    return 2 * n + 2 * n_counts + get_scan_tiles<BLOCK_SIZE, ITEMS_PER_THREAD>(n_counts);
+}
+
+// Stable LSD radix sort, the inputs are left untouched
+template <typename T, bool DESCENDING, bool HAS_VALUES,
+          const int BLOCK_SIZE = 256, const int ITEMS_PER_THREAD = 8, const int DIGIT_BITS = 4>
+int radix_sort_c(const T *d_keys, const int *d_values, int n, T *d_keys_out, int *d_values_out,
+                 uint32_t *d_workspace, int workspace_size, cudaStream_t stream = 0)
+{
+    if (n == 0)
+    {
+        return 0;
+    }
+    if (d_workspace == nullptr || workspace_size < static_cast<int>(get_radix_sort_workspace_size<BLOCK_SIZE, ITEMS_PER_THREAD, DIGIT_BITS>(n)))
+    {
+        return 1;
+    }
+
+    const uint32_t n_tiles = get_scan_tiles<BLOCK_SIZE, ITEMS_PER_THREAD>(n);
+    const uint32_t n_counts = (1u << DIGIT_BITS) * n_tiles;
+    T *keys_alt = reinterpret_cast<T *>(d_workspace);
+    int *values_alt = reinterpret_cast<int *>(d_workspace + n);
+    uint32_t *counts = d_workspace + 2 * n;
+    uint32_t *offsets = counts + n_counts;
+    uint32_t *scan_workspace = offsets + n_counts;
+    const int scan_workspace_size = workspace_size - static_cast<int>(2 * n + 2 * n_counts);
+
+    // The last pass must land in the outputs
+    constexpr int n_passes = (32 + DIGIT_BITS - 1) / DIGIT_BITS;
+    const T *keys_in = d_keys;
+    const int *values_in = d_values;
+    for (int pass = 0; pass < n_passes; ++pass)
+    {
+        const bool to_output = (n_passes - 1 - pass) % 2 == 0;
+        T *keys_out = to_output ? d_keys_out : keys_alt;
+        int *values_out = to_output ? d_values_out : values_alt;
+        const int shift = pass * DIGIT_BITS;
+
+        radix_histogram<T, DESCENDING, BLOCK_SIZE, ITEMS_PER_THREAD, DIGIT_BITS><<<n_tiles, BLOCK_SIZE, 0, stream>>>(
+            keys_in, n, shift, counts, n_tiles);
+        int return_code = device_exclusive_scan_c<uint32_t, BLOCK_SIZE, ITEMS_PER_THREAD>(
+            counts, offsets, n_counts, scan_workspace, scan_workspace_size, stream);
+        if (return_code != 0)
+        {
+            return return_code;
+        }
+        radix_scatter<T, DESCENDING, HAS_VALUES, BLOCK_SIZE, ITEMS_PER_THREAD, DIGIT_BITS><<<n_tiles, BLOCK_SIZE, 0, stream>>>(
+            keys_in, values_in, n, shift, offsets, n_tiles, keys_out, values_out);
+
+        keys_in = keys_out;
+        values_in = values_out;
+    }
+    return static_cast<int>(cudaGetLastError());
+}
@@ -0,0 +1,66 @@
+#pragma once
+
+#include "layout/layout.cuh"
+#include "scan/device_scan.cuh"
+
+// Inclusive scans along the last dim of `x_layout`, one block per row of the leading dims
+// Each block walks its row in tiles with a running carry, reading and writing through the strides
+template <int BLOCK_SIZE, int ITEMS_PER_THREAD>
+__global__ void
+strided_scan_rows(
+    const float *__restrict__ input,
+    const Layout x_layout,
+    float *__restrict__ output,
+    const Layout y_layout)
+{
+    const int last = x_layout.ndim - 1;
+    const int64_t n = x_layout.shape[last];
+    const int64_t x_stride = x_layout.strides[last];
+    const int64_t y_stride = y_layout.strides[last];
+    const int64_t x_base = x_layout.offset(static_cast<int64_t>(blockIdx.x) * n);
+    const int64_t y_base = y_layout.offset(static_cast<int64_t>(blockIdx.x) * n);
+
+    float carry = 0.0f;
+    for (int64_t tile_base = 0; tile_base < n; tile_base += BLOCK_SIZE * ITEMS_PER_THREAD)
+    {
+        // Consecutive items per thread, so that a serial scan of them composes with the block scan
+        float vals[ITEMS_PER_THREAD];
+        float thread_sum = 0.0f;
+#pragma unroll
+        for (int item = 0; item < ITEMS_PER_THREAD; ++item)
+        {
+            const int64_t i = tile_base + threadIdx.x * ITEMS_PER_THREAD + item;
+            vals[item] = i < n ? input[x_base + i * x_stride] : 0.0f;
+            thread_sum += vals[item];
+        }
+
+        float tile_sum;
+        float prefix = carry + block_exclusive_scan<BLOCK_SIZE, float>(thread_sum, tile_sum);
+
+#pragma unroll
+        for (int item = 0; item < ITEMS_PER_THREAD; ++item)
+        {
+            const int64_t i = tile_base + threadIdx.x * ITEMS_PER_THREAD + item;
+            prefix += vals[item];
+            if (i < n)
+            {
+                output[y_base + i * y_stride] = prefix;
+            }
+        }
+        carry += tile_sum;
+    }
+}
+
+template <int BLOCK_SIZE = 256, int ITEMS_PER_THREAD = 4>
+int strided_scan_c(const float *X, const Layout x_layout, float *Y, const Layout y_layout, cudaStream_t stream = 0)
+{
+    const int64_t n = x_layout.numel();
+    if (n == 0)
+    {
+        return 0;
+    }
+
+    const int64_t rows = n / x_layout.shape[x_layout.ndim - 1];
+    strided_scan_rows<BLOCK_SIZE, ITEMS_PER_THREAD><<<static_cast<uint32_t>(rows), BLOCK_SIZE, 0, stream>>>(X, x_layout, Y, y_layout);
+    return static_cast<int>(cudaGetLastError());
+}
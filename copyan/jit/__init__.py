@@ -1,3 +1,6 @@
-from .compiler import get_nvcc_compiler, build
-from .template import generate, cpp_format
-from .runtime import Runtime
+from . import config, tracing
+from .compiler import get_nvcc_compiler, build, runtime_cache
+from .template import generate, cpp_format, Layout
+from .runtime import Runtime, PreparedRuntime
+from .bundle import BundleRuntime, read_bundle, write_bundle
+from .cache import SharedCache, get_shared_cache
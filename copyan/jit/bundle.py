@@ -0,0 +1,148 @@
+import ctypes
+import json
+import os
+import platform
+import tempfile
+import torch
+import zipfile
+from typing import Any, Dict, Optional, Tuple
+
+from .compiler import get_copyan_version, get_target_arch
+from .runtime import LIB_NAME, Runtime
+# NOTES: `Layout` is needed to evaluate `kernel.args`
+from .template import typename_map, Layout
+
+IS_WINDOWS = platform.system() == "Windows"
+
+# Bump when the bundle layout changes
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_FILES = ("kernel.cu", "kernel.args", LIB_NAME)
+OPTIONAL_BUNDLE_FILES = ("kernel.meta.json",)
+
+
+def load_library_from_memory(name: str, data: bytes) -> Tuple[ctypes.CDLL, Optional[int]]:
+    # Prefer an anonymous memory file, so nothing is extracted to disk
+    if hasattr(os, "memfd_create"):
+        fd = os.memfd_create(name, os.MFD_CLOEXEC)
+        try:
+            view = memoryview(data)
+            while len(view) > 0:
+                view = view[os.write(fd, view) :]
+            # NOTES: the loader matches libraries by path, so the descriptor must stay open to keep the path unique
+            return ctypes.CDLL(f"/proc/self/fd/{fd}"), fd
+        except OSError:
+            os.close(fd)
+            raise
+
+    # Fallback to an unlinked temporary file
+    with tempfile.NamedTemporaryFile(
+        prefix=f"{name}.", suffix=os.path.splitext(LIB_NAME)[1], delete=False
+    ) as f:
+        f.write(data)
+    lib = ctypes.CDLL(f.name)
+    if not IS_WINDOWS:
+        os.unlink(f.name)
+    return lib, None
+
+
+class BundleRuntime(Runtime):
+    def __init__(self, bundle_path: str, kernel_name: str) -> None:
+        # NOTES: `Runtime.__init__` is skipped, as there is no cache directory behind
+        self.path = f"{bundle_path}::{kernel_name}"
+        self.bundle_path = bundle_path
+        self.kernel_name = kernel_name
+        self.trace_name = kernel_name
+        self.lib = None
+        self.args = None
+        self.meta = None
+        self.pins = 0
+        self.captured = False
+        self.fd = None
+        self.lib_size = 0
+
+    def read(self, file_name: str) -> bytes:
+        with zipfile.ZipFile(self.bundle_path, "r") as bundle:
+            return bundle.read(f"kernels/{self.kernel_name}/{file_name}")
+
+    def load(self) -> None:
+        if self.lib is None or self.args is None:
+            data = self.read(LIB_NAME)
+            self.lib, self.fd = load_library_from_memory(self.kernel_name, data)
+            self.lib_size = len(data)
+            self.args = eval(self.read("kernel.args").decode("utf-8"))
+
+    def get_lib_size(self) -> int:
+        return self.lib_size
+
+    def unload(self, synchronize: bool = False) -> bool:
+        if not super().unload(synchronize):
+            return False
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        return True
+
+
+def write_bundle(
+    path: str, kernels: Dict[str, Runtime], tuned: list, arch: str
+) -> None:
+    # `kernels` maps kernel names to runtimes, `tuned` holds the JSON-able tuner records
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "copyan_version": get_copyan_version(),
+        "platform": platform.system(),
+        "arch": arch,
+        "torch_cuda_version": torch.version.cuda,
+        "kernels": {},
+        "tuned": tuned,
+    }
+
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as bundle:
+        for kernel_name, runtime in kernels.items():
+            files = list(BUNDLE_FILES)
+            for file_name in OPTIONAL_BUNDLE_FILES:
+                try:
+                    runtime.read(file_name)
+                    files.append(file_name)
+                except (OSError, KeyError):
+                    pass
+            for file_name in files:
+                bundle.writestr(
+                    f"kernels/{kernel_name}/{file_name}", runtime.read(file_name)
+                )
+            arg_defs = eval(runtime.read("kernel.args").decode("utf-8"))
+            manifest["kernels"][kernel_name] = {
+                "arg_defs": [[name, typename_map[dtype]] for name, dtype in arg_defs],
+                "files": files,
+            }
+        bundle.writestr("manifest.json", json.dumps(manifest, indent=2))
+
+    os.replace(tmp_path, path)
+
+
+def read_bundle(path: str) -> Tuple[Dict[str, Any], Dict[str, BundleRuntime]]:
+    path = os.path.abspath(path)
+    with zipfile.ZipFile(path, "r") as bundle:
+        manifest = json.loads(bundle.read("manifest.json"))
+
+    if manifest["format_version"] != BUNDLE_FORMAT_VERSION:
+        raise RuntimeError(
+            f"Unsupported bundle format version {manifest['format_version']} in {path}, "
+            f"expected {BUNDLE_FORMAT_VERSION}"
+        )
+    if manifest["platform"] != platform.system():
+        raise RuntimeError(
+            f"Bundle {path} is built for {manifest['platform']}, not {platform.system()}"
+        )
+    if torch.cuda.is_available():
+        if manifest["arch"] != get_target_arch():
+            raise RuntimeError(
+                f"Bundle {path} is built for sm_{manifest['arch']}, not sm_{get_target_arch()}"
+            )
+
+    runtimes = {
+        kernel_name: BundleRuntime(path, kernel_name)
+        for kernel_name in manifest["kernels"]
+    }
+    return manifest, runtimes
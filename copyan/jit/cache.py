@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from typing import Optional
+
+from . import config
+from .runtime import LIB_NAME
+
+# The library goes last, as its presence marks a complete local entry
+CACHE_FILES = ("kernel.cu", "kernel.args", "kernel.meta.json", LIB_NAME)
+REQUIRED_CACHE_FILES = ("kernel.cu", "kernel.args", LIB_NAME)
+DIGEST_FILE = "digest.json"
+
+
+def sha256_file(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+class SharedCache:
+    # A second tier behind the local cache, e.g. an NFS or object-store mount shared by many nodes
+    # Entries are `<root>/<kernel name>/`, addressed by the same signature hash as the local ones,
+    # with a `digest.json` holding the SHA-256 of every file
+    def __init__(self, root: str, policy: str = "read-write") -> None:
+        assert policy in config.SHARED_CACHE_POLICIES, f"Unknown shared cache policy {policy}"
+        self.root = root
+        self.policy = policy
+
+    def can_read(self) -> bool:
+        return self.policy in ("read-only", "read-write")
+
+    def can_write(self) -> bool:
+        return self.policy in ("read-write", "publish-only")
+
+    def fetch(self, kernel_name: str, local_path: str) -> bool:
+        # Read through into the local cache, returns whether a verified entry was found
+        if not self.can_read():
+            return False
+
+        entry = os.path.join(self.root, kernel_name)
+        try:
+            with open(os.path.join(entry, DIGEST_FILE), "r") as f:
+                digests = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if not all(name in digests for name in REQUIRED_CACHE_FILES) or not all(
+            name in CACHE_FILES for name in digests
+        ):
+            return False
+
+        # Every file is copied and verified before any of them becomes visible locally
+        staged = {}
+        try:
+            os.makedirs(local_path, exist_ok=True)
+            for file_name in CACHE_FILES:
+                if file_name not in digests:
+                    continue
+                tmp_path = os.path.join(local_path, f"{file_name}.shared.{uuid.uuid4()}")
+                staged[file_name] = tmp_path
+                shutil.copyfile(os.path.join(entry, file_name), tmp_path)
+                if sha256_file(tmp_path) != digests[file_name]:
+                    if config.JIT_DEBUG:
+                        print(f"Corrupted shared cache entry {entry}: digest mismatch for {file_name}")
+                    return False
+            for file_name in CACHE_FILES:
+                if file_name in staged:
+                    os.replace(staged.pop(file_name), os.path.join(local_path, file_name))
+        except OSError:
+            return False
+        finally:
+            for tmp_path in staged.values():
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+
+        if config.JIT_DEBUG:
+            print(f"Fetched JIT runtime {kernel_name} from shared cache {self.root}")
+        return True
+
+    def publish(self, kernel_name: str, local_path: str) -> bool:
+        # Returns whether this call published the entry, losing a race to another node is not an error
+        if not self.can_write():
+            return False
+
+        entry = os.path.join(self.root, kernel_name)
+        if os.path.exists(os.path.join(entry, DIGEST_FILE)):
+            return False
+
+        tmp_entry = os.path.join(self.root, f"tmp.{kernel_name}.{uuid.uuid4()}")
+        try:
+            os.makedirs(tmp_entry)
+            digests = {}
+            for file_name in CACHE_FILES:
+                path = os.path.join(local_path, file_name)
+                if os.path.exists(path):
+                    # Digests come from the local files, so that copy corruptions are caught on fetch
+                    digests[file_name] = sha256_file(path)
+                    shutil.copyfile(path, os.path.join(tmp_entry, file_name))
+            with open(os.path.join(tmp_entry, DIGEST_FILE), "w") as f:
+                json.dump(digests, f, indent=2)
+
+            # Directory renames are atomic, and fail if the entry was published meanwhile
+            os.rename(tmp_entry, entry)
+        except OSError:
+            return False
+        finally:
+            if os.path.exists(tmp_entry):
+                shutil.rmtree(tmp_entry, ignore_errors=True)
+
+        if config.JIT_DEBUG:
+            print(f"Published JIT runtime {kernel_name} to shared cache {self.root}")
+        return True
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    if not config.SHARED_CACHE_DIR:
+        return None
+    return SharedCache(config.SHARED_CACHE_DIR, config.SHARED_CACHE_POLICY)
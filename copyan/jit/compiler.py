@@ -1,5 +1,6 @@
 import hashlib
 import functools
+import json
 import os
 import re
 import subprocess
@@ -7,10 +8,13 @@ import uuid
 import platform
 import shutil
 import torch
-from typing import Tuple
-from torch.utils.cpp_extension import CUDA_HOME
+from typing import Iterator, Optional, Tuple
 
-from .runtime import Runtime, RuntimeCache
+from . import config
+from .cache import get_shared_cache
+from .ptxas import filter_ptxas_info, parse_ptxas_log
+from .daemon import request_compile
+from .runtime import LIB_NAME, Runtime, RuntimeCache
 from .template import typename_map
 
 runtime_cache = RuntimeCache()
@@ -50,48 +54,77 @@ def get_copyan_version() -> str:
     return md5.hexdigest()[0:12]
 
 
-@functools.lru_cache(maxsize=None)
-def get_nvcc_compiler() -> Tuple[str, str]:
-    paths = []
+def get_toolchain_probe_path() -> str:
+    return os.path.join(get_default_user_dir(), "toolchain.json")
+
+
+def probe_nvcc_version(path: str) -> Optional[str]:
+    # `nvcc --version` results are persisted across processes, keyed by compiler path and mtime
+    mtime = os.stat(path).st_mtime_ns
+    probe_path = get_toolchain_probe_path()
+    try:
+        with open(probe_path, "r") as f:
+            probes = json.load(f)
+    except (OSError, ValueError):
+        probes = {}
+    probe = probes.get(path)
+    if probe is not None and probe["mtime"] == mtime:
+        return probe["version"]
+
+    output = subprocess.check_output(
+        [path, "--version"],
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+    match = re.search(r"release (\d+\.\d+)", output)
+    version = match.group(1) if match else None
+    if version is not None:
+        probes[path] = {"mtime": mtime, "version": version}
+        try:
+            put(probe_path, json.dumps(probes, indent=2))
+        except OSError:
+            # Read-only cache directories only lose the persistence
+            pass
+    return version
+
+
+def get_nvcc_candidates() -> Iterator[str]:
     if os.getenv("COPYAN_NVCC_COMPILER"):
-        paths.append(os.getenv("COPYAN_NVCC_COMPILER"))
+        yield os.getenv("COPYAN_NVCC_COMPILER")
+
+    # NOTES: `torch.utils.cpp_extension` is slow to import, only do it if the user's choice is not usable
+    from torch.utils.cpp_extension import CUDA_HOME
 
     # Windows-specific path
     if IS_WINDOWS:
         if CUDA_HOME:
-            paths.append(os.path.join(CUDA_HOME, "bin", "nvcc.exe"))
+            yield os.path.join(CUDA_HOME, "bin", "nvcc.exe")
         # Check common install paths on Windows
         program_files = os.environ.get("ProgramFiles", "C:\\Program Files")
         for cuda_version in ["v12.3", "v12.4", "v12.5", "v12.6", "v12.7", "v12.8"]:
-            paths.append(
-                os.path.join(
-                    program_files,
-                    "NVIDIA GPU Computing Toolkit",
-                    "CUDA",
-                    cuda_version,
-                    "bin",
-                    "nvcc.exe",
-                )
+            yield os.path.join(
+                program_files,
+                "NVIDIA GPU Computing Toolkit",
+                "CUDA",
+                cuda_version,
+                "bin",
+                "nvcc.exe",
             )
     else:
         # Linux path
         if CUDA_HOME:
-            paths.append(os.path.join(CUDA_HOME, "bin", "nvcc"))
+            yield os.path.join(CUDA_HOME, "bin", "nvcc")
+
 
+@functools.lru_cache(maxsize=None)
+def get_nvcc_compiler() -> Tuple[str, str]:
     # Try to find the first available NVCC compiler
     least_version_required = "12.3"
-    version_pattern = re.compile(r"release (\d+\.\d+)")
-    for path in paths:
+    for path in get_nvcc_candidates():
         if os.path.exists(path):
             try:
-                output = subprocess.check_output(
-                    [path, "--version"],
-                    stderr=subprocess.STDOUT,
-                    universal_newlines=True,
-                )
-                match = version_pattern.search(output)
-                if match:
-                    version = match.group(1)
+                version = probe_nvcc_version(path)
+                if version is not None:
                     if version >= least_version_required:
                         return path, version
                     else:
@@ -143,6 +176,19 @@ def make_tmp_dir():
     return tmp_dir
 
 
+@functools.lru_cache(maxsize=None)
+def get_target_arch() -> str:
+    major, minor = torch.cuda.get_device_capability()
+    arch_code = f"{major}{minor}"
+    supported_arch_codes = ("120",)
+
+    if arch_code in supported_arch_codes:
+        print(f"Detected local GPU sm_{arch_code}")
+        return arch_code
+    print(f"Warning: Unsupported GPU sm_{arch_code}. Falling back to sm_89.")
+    return "89"
+
+
 def put(path, data, is_binary=False):
     # Create a temporary file
     tmp_file_path = os.path.join(
@@ -167,9 +213,71 @@ def put(path, data, is_binary=False):
         os.unlink(tmp_file_path)
 
 
-def build(name: str, arg_defs: tuple, code: str) -> Runtime:
-    # Get the extension based on platform
-    lib_ext = ".dll" if IS_WINDOWS else ".so"
+def compile_runtime(
+    path: str, nvcc: str, flags: list, include_dirs: list, arch_code: str
+) -> Tuple[int, str]:
+    # Compile the `kernel.cu` of a cache entry into its library, returns the exit code and the compiler output
+    # NOTES: also run by the compile daemon workers, see `daemon.py`
+    src_path = os.path.join(path, "kernel.cu")
+    lib_path = os.path.join(path, LIB_NAME)
+    tmp_lib_path = os.path.join(
+        make_tmp_dir(), f"nvcc.tmp.{str(uuid.uuid4())}.{hash_to_hex(lib_path)}{os.path.splitext(LIB_NAME)[1]}"
+    )
+
+    command = [
+        nvcc,
+        src_path,
+        "-o",
+        tmp_lib_path,
+        *flags,
+        *[f"-I{d}" for d in include_dirs],
+    ]
+
+    if config.JIT_DEBUG:
+        print(f"Compiling JIT runtime {path} with command {command}")
+
+    result = subprocess.run(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+    if result.returncode != 0:
+        if os.path.exists(tmp_lib_path):
+            os.unlink(tmp_lib_path)
+        return result.returncode, result.stdout
+
+    # Keep the resource usages next to the kernel, for the tuner to prune candidates
+    meta = {"arch": arch_code, "resources": parse_ptxas_log(result.stdout)}
+    put(os.path.join(path, "kernel.meta.json"), json.dumps(meta, indent=2))
+
+    # Atomic replace lib file if possible
+    try:
+        if IS_WINDOWS and os.path.exists(lib_path):
+            # On Windows, need to remove the existing file first
+            os.unlink(lib_path)
+        os.replace(tmp_lib_path, lib_path)
+    except OSError:
+        # Fallback if atomic replace fails
+        shutil.copy2(tmp_lib_path, lib_path)
+        os.unlink(tmp_lib_path)
+    return result.returncode, result.stdout
+
+
+def get_compile_daemon_socket() -> Optional[str]:
+    # An explicit socket, or the default one when a daemon is running, see `python -m copyan.jit.daemon`
+    if IS_WINDOWS or config.COMPILE_DAEMON_SOCKET == "off":
+        return None
+    path = config.COMPILE_DAEMON_SOCKET or get_default_compile_daemon_socket()
+    return path if os.path.exists(path) else None
+
+
+def get_default_compile_daemon_socket() -> str:
+    return os.path.join(get_default_user_dir(), "compile.sock")
+
+
+def build(name: str, arg_defs: tuple, code: str, priority: str = "interactive") -> Runtime:
+    # `priority` orders requests in the compile daemon: `interactive`, `tuning` or `precompile`
     # Base compiler flags
     common_flags = [
         "-std=c++20",
@@ -178,28 +286,16 @@ def build(name: str, arg_defs: tuple, code: str) -> Runtime:
         "--expt-extended-lambda",
     ]
 
-    major, minor = torch.cuda.get_device_capability()
-    arch_code = f"{major}{minor}"
-    # Define a mapping from arch_code to the gencode flag
-    arch_map = {
-        "120": "-gencode=arch=compute_120,code=sm_120",
-    }
-
-    if arch_code in arch_map:
-        print(
-            f"Detected local GPU sm_{arch_code}, adding gencode flag: {arch_map[arch_code]}"
-        )
-        common_flags.append(arch_map[arch_code])
-    else:
-        print(f"Warning: Unsupported GPU sm_{arch_code}. Falling back to sm_89.")
-        common_flags.append("-gencode=arch=compute_89,code=sm_89")
+    arch_code = get_target_arch()
+    common_flags.append(f"-gencode=arch=compute_{arch_code},code=sm_{arch_code}")
 
     # Platform-specific flags
     if IS_WINDOWS:
         nvcc_flags = [
             *common_flags,
             "-shared",
-            "--ptxas-options=--register-usage-level=10",
+            # NOTES: the resource report is always collected, see `config.PTXAS_VERBOSE` for printing it
+            "--ptxas-options=--register-usage-level=10,--verbose",
             "--diag-suppress=177,174,940",
         ]
         # Windows MSVC options differ from gcc/clang
@@ -210,8 +306,7 @@ def build(name: str, arg_defs: tuple, code: str) -> Runtime:
         nvcc_flags = [
             *common_flags,
             "-shared",
-            "--ptxas-options=--register-usage-level=10"
-            + (",--verbose" if "YAN_PTXAS_VERBOSE" in os.environ else ""),
+            "--ptxas-options=--register-usage-level=10,--verbose",
             "--diag-suppress=177,174,940",
         ]
         cxx_flags = ["-fPIC", "-O3", "-Wno-deprecated-declarations", "-Wno-abi"]
@@ -225,10 +320,17 @@ def build(name: str, arg_defs: tuple, code: str) -> Runtime:
     # Check runtime cache or file system hit
     global runtime_cache
     if runtime_cache[path] is not None:
-        if os.getenv("COPYAN_JIT_DEBUG", None):
+        if config.JIT_DEBUG:
             print(f"Using cached JIT runtime {name} during build")
         return runtime_cache[path]
 
+    # Read through the shared cache tier, if any
+    shared_cache = get_shared_cache()
+    if shared_cache is not None and shared_cache.fetch(kernel_name, path):
+        runtime = runtime_cache[path]
+        if runtime is not None:
+            return runtime
+
     # Write the code
     os.makedirs(path, exist_ok=True)
     args_path = os.path.join(path, "kernel.args")
@@ -241,41 +343,42 @@ def build(name: str, arg_defs: tuple, code: str) -> Runtime:
     )
     put(src_path, code)
 
-    # Compile into a temporary lib file
-    lib_path = os.path.join(path, f"kernel{lib_ext}")
-    tmp_lib_path = os.path.join(
-        make_tmp_dir(), f"nvcc.tmp.{str(uuid.uuid4())}.{hash_to_hex(lib_path)}{lib_ext}"
-    )
-
-    # Compile
-    command = [
-        get_nvcc_compiler()[0],
-        src_path,
-        "-o",
-        tmp_lib_path,
-        *flags,
-        *[f"-I{d}" for d in include_dirs],
-    ]
-
-    if os.getenv("COPYAN_JIT_DEBUG", None):
-        print(f"Compiling JIT runtime {name} with command {command}")
-
-    try:
-        subprocess.check_call(command)
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"Failed to compile {src_path}: {e}")
-
-    # Atomic replace lib file if possible
-    try:
-        if IS_WINDOWS and os.path.exists(lib_path):
-            # On Windows, need to remove the existing file first
-            os.unlink(lib_path)
-        os.replace(tmp_lib_path, lib_path)
-    except OSError:
-        # Fallback if atomic replace fails
-        shutil.copy2(tmp_lib_path, lib_path)
-        os.unlink(tmp_lib_path)
+    # Compile through the local daemon if one is running, or in this process
+    nvcc = get_nvcc_compiler()[0]
+    reply = None
+    daemon_socket = get_compile_daemon_socket()
+    if daemon_socket is not None:
+        reply = request_compile(
+            daemon_socket,
+            {
+                "op": "compile",
+                "kernel_name": kernel_name,
+                "path": path,
+                "nvcc": nvcc,
+                "flags": flags,
+                "include_dirs": include_dirs,
+                "arch": arch_code,
+                "priority": priority,
+            },
+            timeout=config.COMPILE_DAEMON_TIMEOUT,
+        )
+        if reply is None and config.JIT_DEBUG:
+            print(f"Compile daemon {daemon_socket} is unreachable or timed out, compiling JIT runtime {name} locally")
+    if reply is None:
+        returncode, stdout = compile_runtime(path, nvcc, flags, include_dirs, arch_code)
+    else:
+        returncode, stdout = reply["returncode"], reply["output"]
+
+    output = stdout if config.PTXAS_VERBOSE else filter_ptxas_info(stdout)
+    if output:
+        print(output, end="")
+    if returncode != 0:
+        raise RuntimeError(
+            f"Failed to compile {src_path}: exit code {returncode}"
+        )
 
     # Put cache and return
     runtime_cache[path] = Runtime(path)
+    if shared_cache is not None:
+        shared_cache.publish(kernel_name, path)
     return runtime_cache[path]
@@ -0,0 +1,76 @@
+import os
+
+# Debug flags are read once at import time, call `configure` to change them afterwards
+JIT_DEBUG = False
+PRINT_AUTOTUNE = False
+PTXAS_VERBOSE = False
+
+# Optional second cache tier shared across nodes, an empty directory disables it
+SHARED_CACHE_DIR = ""
+SHARED_CACHE_POLICIES = ("read-only", "read-write", "publish-only")
+SHARED_CACHE_POLICY = "read-write"
+
+# Loaded runtimes kept by the in-memory cache, least recently used unpinned ones are unloaded past it, 0 disables the bound
+RUNTIME_CACHE_SIZE = 256
+
+# Unix socket of the local compile daemon, empty for the default one when it is running, `off` to always compile in-process
+COMPILE_DAEMON_SOCKET = ""
+
+# Seconds to wait for a compile daemon reply, past which the kernel is compiled in-process
+COMPILE_DAEMON_TIMEOUT = 600.0
+
+# Append every tuning measurement to this JSON lines file, see `copyan.jit_kernels.cost_model`
+TUNING_LOG = ""
+
+
+def configure(
+    jit_debug: bool = None,
+    print_autotune: bool = None,
+    ptxas_verbose: bool = None,
+    shared_cache_dir: str = None,
+    shared_cache_policy: str = None,
+    tuning_log: str = None,
+    runtime_cache_size: int = None,
+    compile_daemon_socket: str = None,
+    compile_daemon_timeout: float = None,
+) -> None:
+    global JIT_DEBUG, PRINT_AUTOTUNE, PTXAS_VERBOSE, SHARED_CACHE_DIR, SHARED_CACHE_POLICY, TUNING_LOG
+    global RUNTIME_CACHE_SIZE, COMPILE_DAEMON_SOCKET, COMPILE_DAEMON_TIMEOUT
+    if jit_debug is not None:
+        JIT_DEBUG = jit_debug
+    if print_autotune is not None:
+        PRINT_AUTOTUNE = print_autotune
+    if ptxas_verbose is not None:
+        PTXAS_VERBOSE = ptxas_verbose
+    if shared_cache_dir is not None:
+        SHARED_CACHE_DIR = shared_cache_dir
+    if shared_cache_policy is not None:
+        assert shared_cache_policy in SHARED_CACHE_POLICIES, (
+            f"Unknown shared cache policy {shared_cache_policy}, expected one of {SHARED_CACHE_POLICIES}"
+        )
+        SHARED_CACHE_POLICY = shared_cache_policy
+    if tuning_log is not None:
+        TUNING_LOG = tuning_log
+    if runtime_cache_size is not None:
+        RUNTIME_CACHE_SIZE = runtime_cache_size
+    if compile_daemon_socket is not None:
+        COMPILE_DAEMON_SOCKET = compile_daemon_socket
+    if compile_daemon_timeout is not None:
+        COMPILE_DAEMON_TIMEOUT = compile_daemon_timeout
+
+
+def reload_from_env() -> None:
+    configure(
+        jit_debug=bool(os.getenv("COPYAN_JIT_DEBUG", None)),
+        print_autotune=bool(os.getenv("COPYAN_PRINT_AUTOTUNE", None)),
+        ptxas_verbose="YAN_PTXAS_VERBOSE" in os.environ,
+        shared_cache_dir=os.getenv("COPYAN_SHARED_CACHE_DIR", ""),
+        shared_cache_policy=os.getenv("COPYAN_SHARED_CACHE_POLICY", "read-write"),
+        tuning_log=os.getenv("COPYAN_TUNING_LOG", ""),
+        runtime_cache_size=int(os.getenv("COPYAN_RUNTIME_CACHE_SIZE", "256")),
+        compile_daemon_socket=os.getenv("COPYAN_COMPILE_DAEMON_SOCKET", ""),
+        compile_daemon_timeout=float(os.getenv("COPYAN_COMPILE_DAEMON_TIMEOUT", "600")),
+    )
+
+
+reload_from_env()
@@ -0,0 +1,278 @@
+import argparse
+import collections
+import itertools
+import json
+import os
+import queue
+import shutil
+import socket
+import socketserver
+import threading
+import uuid
+from typing import Any, Dict, List, Optional
+
+from . import config
+from .runtime import LIB_NAME
+
+# A long-lived compile service on a Unix socket, shared by every process of a host
+# Requests and replies are single JSON lines, identical kernels are compiled once, and
+# interactive requests go before tuning sweeps, which go before precompile jobs
+# NOTES: clients send the full compiler command, so the socket is only accessible by its owner
+PRIORITIES = {"interactive": 0, "tuning": 1, "precompile": 2}
+
+# Completed kernels remembered for requests into other cache directories
+MAX_COMPLETED = 4096
+
+
+def request_compile(socket_path: str, request: Dict[str, Any], timeout: float = None) -> Optional[Dict[str, Any]]:
+    # Returns the reply, or `None` when the daemon is unreachable, so that the caller compiles by itself
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            data = b""
+            while not data.endswith(b"\n"):
+                chunk = sock.recv(1 << 16)
+                if not chunk:
+                    return None
+                data += chunk
+        return json.loads(data)
+    except (OSError, ValueError):
+        return None
+
+
+def install(source: str, target: str) -> None:
+    # Copy a compiled entry into another cache directory, the library goes last as it marks a complete entry
+    os.makedirs(target, exist_ok=True)
+    for file_name in ("kernel.meta.json", LIB_NAME):
+        source_path = os.path.join(source, file_name)
+        if not os.path.exists(source_path):
+            continue
+        tmp_path = os.path.join(target, f"{file_name}.daemon.{uuid.uuid4()}")
+        shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, os.path.join(target, file_name))
+
+
+class CompileJob:
+    def __init__(self, request: Dict[str, Any]) -> None:
+        self.key = request["kernel_name"]
+        self.request = request
+        self.priority = PRIORITIES[request.get("priority", "interactive")]
+        self.paths = [request["path"]]
+        self.started = False
+        self.done = threading.Event()
+        self.reply = None
+        # Messages of the paths the result could not be installed into
+        self.install_errors: Dict[str, str] = {}
+
+
+class CompileHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        daemon = self.server.daemon
+        if request.get("op") == "status":
+            reply = daemon.get_status()
+        else:
+            reply = daemon.submit(request)
+        self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class CompileDaemon:
+    def __init__(self, socket_path: str, workers: int = None) -> None:
+        self.socket_path = socket_path
+        self.num_workers = min(4, os.cpu_count() or 1) if workers is None else workers
+        assert self.num_workers > 0
+
+        self.queue = queue.PriorityQueue()
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        self.jobs: Dict[str, CompileJob] = {}
+        self.completed = collections.OrderedDict()
+        self.stats = {"requests": 0, "compiles": 0, "deduped": 0, "failures": 0}
+        self.running = 0
+        self.server = None
+        self.workers: List[threading.Thread] = []
+        self.threads: List[threading.Thread] = []
+
+    def submit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        # Blocks until the kernel is compiled into the requested cache directory
+        key, path = request["kernel_name"], request["path"]
+        priority = PRIORITIES[request.get("priority", "interactive")]
+        with self.lock:
+            self.stats["requests"] += 1
+            source = self.completed.get(key)
+            job = self.jobs.get(key)
+            if job is not None:
+                self.stats["deduped"] += 1
+                if path not in job.paths:
+                    job.paths.append(path)
+                # Requeue with the better priority, the stale entry is skipped
+                if not job.started and priority < job.priority:
+                    job.priority = priority
+                    self.queue.put((priority, next(self.sequence), job))
+            elif source is not None and os.path.exists(os.path.join(source, LIB_NAME)):
+                self.stats["deduped"] += 1
+            else:
+                job = CompileJob(request)
+                self.jobs[key] = job
+                self.queue.put((job.priority, next(self.sequence), job))
+
+        if job is None:
+            if source != path:
+                try:
+                    install(source, path)
+                except OSError as e:
+                    return {"returncode": -1, "output": f"Compile daemon failed to install into {path}: {e}\n"}
+            return {"returncode": 0, "output": ""}
+        job.done.wait()
+        error = job.install_errors.get(path)
+        return job.reply if error is None else {"returncode": -1, "output": error}
+
+    def run(self, job: CompileJob) -> Dict[str, Any]:
+        from .cache import get_shared_cache
+        from .compiler import compile_runtime
+
+        request = job.request
+        try:
+            returncode, output = compile_runtime(
+                job.paths[0], request["nvcc"], request["flags"], request["include_dirs"], request["arch"]
+            )
+        except Exception as e:
+            returncode, output = -1, f"Compile daemon error: {e}\n"
+
+        if returncode == 0:
+            shared_cache = get_shared_cache()
+            if shared_cache is not None:
+                shared_cache.publish(job.key, job.paths[0])
+        return {"returncode": returncode, "output": output}
+
+    def work(self) -> None:
+        while True:
+            _, _, job = self.queue.get()
+            if job is None:
+                return
+            with self.lock:
+                if job.started:
+                    continue
+                job.started = True
+                self.running += 1
+
+            # Clients are always answered, and the worker survives any failure of a job
+            reply = {"returncode": -1, "output": "Compile daemon error\n"}
+            try:
+                reply = self.run(job)
+            except Exception as e:
+                reply = {"returncode": -1, "output": f"Compile daemon error: {e}\n"}
+            finally:
+                self.retire(job, reply)
+
+    def retire(self, job: CompileJob, reply: Dict[str, Any]) -> None:
+        try:
+            # Paths attached while compiling are only read once the job is retired
+            with self.lock:
+                self.running -= 1
+                self.jobs.pop(job.key, None)
+                if reply["returncode"] == 0:
+                    self.stats["compiles"] += 1
+                    self.completed[job.key] = job.paths[0]
+                    while len(self.completed) > MAX_COMPLETED:
+                        self.completed.popitem(last=False)
+                else:
+                    self.stats["failures"] += 1
+                paths = list(job.paths)
+
+            # A failed install only fails the client of that path
+            if reply["returncode"] == 0:
+                for path in paths[1:]:
+                    try:
+                        install(paths[0], path)
+                    except OSError as e:
+                        job.install_errors[path] = f"Compile daemon failed to install into {path}: {e}\n"
+        finally:
+            job.reply = reply
+            job.done.set()
+
+    def get_status(self) -> Dict[str, Any]:
+        with self.lock:
+            queued = sum(not job.started for job in self.jobs.values())
+            workers = sum(thread.is_alive() for thread in self.workers)
+            return {**self.stats, "queued": queued, "running": self.running, "workers": workers}
+
+    def start(self) -> None:
+        # Serve from background threads, see `serve_forever` for the blocking version
+        # A stale socket from a dead daemon is replaced, a live one is an error
+        if os.path.exists(self.socket_path):
+            if request_compile(self.socket_path, {"op": "status"}, timeout=1.0) is not None:
+                raise RuntimeError(f"A compile daemon is already serving {self.socket_path}")
+            os.unlink(self.socket_path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+
+        old_umask = os.umask(0o077)
+        try:
+            self.server = CompileServer(self.socket_path, CompileHandler)
+        finally:
+            os.umask(old_umask)
+        self.server.daemon = self
+
+        self.workers = [threading.Thread(target=self.work, daemon=True) for _ in range(self.num_workers)]
+        self.threads = [*self.workers, threading.Thread(target=self.server.serve_forever, daemon=True)]
+        for thread in self.threads:
+            thread.start()
+
+    def shutdown(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        for _ in range(self.num_workers):
+            self.queue.put((float("inf"), next(self.sequence), None))
+        for thread in self.threads:
+            thread.join()
+        self.workers, self.threads = [], []
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def serve_forever(self) -> None:
+        self.start()
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+
+def main(argv: List[str] = None) -> None:
+    from .compiler import get_default_compile_daemon_socket
+
+    parser = argparse.ArgumentParser(
+        prog="python -m copyan.jit.daemon",
+        description="Serve JIT builds of every local process from a bounded worker pool",
+    )
+    parser.add_argument(
+        "--socket",
+        default=None,
+        help="Unix socket path, defaults to the one `build` looks for",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent compiler processes")
+    args = parser.parse_args(argv)
+
+    socket_path = args.socket
+    if socket_path is None and config.COMPILE_DAEMON_SOCKET not in ("", "off"):
+        socket_path = config.COMPILE_DAEMON_SOCKET
+    socket_path = socket_path or get_default_compile_daemon_socket()
+    daemon = CompileDaemon(socket_path, args.workers)
+    print(f"Serving JIT builds on {socket_path} with {daemon.num_workers} workers")
+    daemon.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import ctypes
+import sys
+import torch
+from typing import Any, NamedTuple, Optional, Tuple
+
+# Zero-copy marshaling of foreign arrays (e.g. CuPy, NumPy, JAX), read straight from their protocol
+# NOTES: pointers stay valid while the exporting object is alive, which callers hold during launches
+
+# `__array_interface__`/`__cuda_array_interface__` type strings, with any byte order marker stripped
+typestr_map = {
+    "b1": torch.bool,
+    "i1": torch.int8,
+    "u1": torch.uint8,
+    "i2": torch.int16,
+    "i4": torch.int32,
+    "u4": torch.uint32,
+    "i8": torch.int64,
+    "f2": torch.float16,
+    "f4": torch.float32,
+    "f8": torch.float64,
+}
+
+# DLPack `(type code, bits)`, with codes `kDLInt`, `kDLUInt`, `kDLFloat`, `kDLBfloat` and `kDLBool`
+dlpack_dtype_map = {
+    (6, 8): torch.bool,
+    (0, 8): torch.int8,
+    (1, 8): torch.uint8,
+    (0, 16): torch.int16,
+    (0, 32): torch.int32,
+    (1, 32): torch.uint32,
+    (0, 64): torch.int64,
+    (2, 16): torch.float16,
+    (2, 32): torch.float32,
+    (2, 64): torch.float64,
+    (4, 16): torch.bfloat16,
+}
+
+# `kDLCPU`, `kDLCUDA`, `kDLCUDAHost` and `kDLCUDAManaged`
+dlpack_device_map = {1: "cpu", 2: "cuda", 3: "cpu", 13: "cuda"}
+
+# Byte order markers read without any swap
+native_byte_orders = ("|", "=", "<" if sys.byteorder == "little" else ">")
+
+
+class DLDevice(ctypes.Structure):
+    _fields_ = [("device_type", ctypes.c_int32), ("device_id", ctypes.c_int32)]
+
+
+class DLDataType(ctypes.Structure):
+    _fields_ = [("code", ctypes.c_uint8), ("bits", ctypes.c_uint8), ("lanes", ctypes.c_uint16)]
+
+
+class DLTensor(ctypes.Structure):
+    _fields_ = [
+        ("data", ctypes.c_void_p),
+        ("device", DLDevice),
+        ("ndim", ctypes.c_int32),
+        ("dtype", DLDataType),
+        ("shape", ctypes.POINTER(ctypes.c_int64)),
+        ("strides", ctypes.POINTER(ctypes.c_int64)),
+        ("byte_offset", ctypes.c_uint64),
+    ]
+
+
+class DLManagedTensor(ctypes.Structure):
+    # NOTES: only read, the capsule keeps ownership and calls the deleter when collected
+    _fields_ = [
+        ("dl_tensor", DLTensor),
+        ("manager_ctx", ctypes.c_void_p),
+        ("deleter", ctypes.c_void_p),
+    ]
+
+
+PyCapsule_GetPointer = ctypes.pythonapi.PyCapsule_GetPointer
+PyCapsule_GetPointer.restype = ctypes.c_void_p
+PyCapsule_GetPointer.argtypes = [ctypes.py_object, ctypes.c_char_p]
+
+
+class ArrayInfo(NamedTuple):
+    ptr: int
+    dtype: torch.dtype
+    shape: Tuple[int, ...]
+    # In elements, `None` for C-contiguous
+    strides: Optional[Tuple[int, ...]]
+    device: str
+    # The `__cuda_array_interface__` stream with pending writes, which launches must wait for
+    producer_stream: Optional[int] = None
+
+    def is_contiguous(self) -> bool:
+        if self.strides is None:
+            return True
+        expected = 1
+        for size, stride in reversed(tuple(zip(self.shape, self.strides))):
+            if size != 1 and stride != expected:
+                return False
+            expected *= size
+        return True
+
+
+def is_array_like(value: Any) -> bool:
+    return (
+        hasattr(value, "__cuda_array_interface__")
+        or hasattr(value, "__array_interface__")
+        or hasattr(value, "__dlpack__")
+    )
+
+
+def from_interface(interface: dict, device: str) -> ArrayInfo:
+    data = interface["data"]
+    assert isinstance(data, tuple), "Array interfaces exporting a buffer object are not supported"
+    typestr = interface["typestr"]
+    assert typestr[0] in native_byte_orders, f"Non-native byte order `{typestr}` is not supported"
+    dtype = typestr_map.get(typestr[1:])
+    assert dtype is not None, f"Unsupported array interface type `{typestr}`"
+
+    shape = tuple(interface["shape"])
+    strides = interface.get("strides")
+    if strides is not None:
+        itemsize = int(typestr[2:])
+        strides = tuple(stride // itemsize for stride in strides)
+    # NOTES: version 3 exports set `stream` (or `None` for no synchronization), earlier ones never do
+    producer_stream = interface.get("stream") if device == "cuda" else None
+    return ArrayInfo(data[0] or 0, dtype, shape, strides, device, producer_stream)
+
+
+def get_dlpack_stream(value: Any, stream: Optional[torch.cuda.Stream]) -> Optional[int]:
+    # The launch stream handed to CUDA producers, which order their pending writes before it
+    # NOTES: the protocol reserves 0, the legacy default stream is 1
+    if not hasattr(value, "__dlpack_device__"):
+        return None
+    if dlpack_device_map.get(value.__dlpack_device__()[0]) != "cuda":
+        return None
+    return (0 if stream is None else stream.cuda_stream) or 1
+
+
+def from_dlpack(value: Any, stream: Optional[torch.cuda.Stream] = None) -> ArrayInfo:
+    dlpack_stream = get_dlpack_stream(value, stream)
+    capsule = value.__dlpack__() if dlpack_stream is None else value.__dlpack__(stream=dlpack_stream)
+    tensor = DLManagedTensor.from_address(PyCapsule_GetPointer(capsule, b"dltensor")).dl_tensor
+    dtype = dlpack_dtype_map.get((tensor.dtype.code, tensor.dtype.bits))
+    assert dtype is not None and tensor.dtype.lanes == 1, (
+        f"Unsupported DLPack type code {tensor.dtype.code} with {tensor.dtype.bits} bits and {tensor.dtype.lanes} lanes"
+    )
+    device = dlpack_device_map.get(tensor.device.device_type)
+    assert device is not None, f"Unsupported DLPack device type {tensor.device.device_type}"
+
+    shape = tuple(tensor.shape[i] for i in range(tensor.ndim))
+    strides = tuple(tensor.strides[i] for i in range(tensor.ndim)) if tensor.strides else None
+    return ArrayInfo((tensor.data or 0) + tensor.byte_offset, dtype, shape, strides, device)
+
+
+def get_array_info(value: Any, stream: Optional[torch.cuda.Stream] = None) -> ArrayInfo:
+    # Plain dictionaries are the cheapest, DLPack capsules are parsed last
+    # `stream` is the launch stream, `None` for the default one
+    if hasattr(value, "__cuda_array_interface__"):
+        return from_interface(value.__cuda_array_interface__, "cuda")
+    if hasattr(value, "__array_interface__"):
+        return from_interface(value.__array_interface__, "cpu")
+    if hasattr(value, "__dlpack__"):
+        return from_dlpack(value, stream)
+    raise TypeError(f"`{type(value)}` exposes no array protocol")
+
+
+def wait_producer_stream(producer_stream: int, stream: Optional[torch.cuda.Stream]) -> None:
+    # Order a launch after the pending writes of a `__cuda_array_interface__` producer
+    # NOTES: handles 1 and 2 are the legacy and per-thread default streams, 0 and 1 are the same one
+    consumer = torch.cuda.default_stream() if stream is None else stream
+    if (producer_stream or 1) == (consumer.cuda_stream or 1):
+        return
+    event = torch.cuda.Event()
+    event.record(torch.cuda.ExternalStream(producer_stream))
+    consumer.wait_event(event)
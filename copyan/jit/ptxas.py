@@ -0,0 +1,74 @@
+import re
+from typing import Any, Dict
+
+entry_pattern = re.compile(r"Compiling entry function '([^']+)' for '(\w+)'")
+properties_pattern = re.compile(r"Function properties for (\S+)")
+frame_pattern = re.compile(
+    r"(\d+) bytes stack frame, (\d+) bytes spill stores, (\d+) bytes spill loads"
+)
+usage_patterns = {
+    "registers": re.compile(r"Used (\d+) registers"),
+    "barriers": re.compile(r"used (\d+) barriers"),
+    "smem": re.compile(r"(\d+) bytes smem"),
+    "cmem": re.compile(r"(\d+) bytes cmem\[0\]"),
+}
+
+
+def empty_resources() -> Dict[str, Any]:
+    return {
+        "arch": None,
+        "registers": 0,
+        "barriers": 0,
+        "smem": 0,
+        "cmem": 0,
+        "stack": 0,
+        "spill_stores": 0,
+        "spill_loads": 0,
+    }
+
+
+def parse_ptxas_log(log: str) -> Dict[str, Dict[str, Any]]:
+    # Parse `ptxas --verbose` output into per-kernel resource usages, keyed by the mangled kernel names
+    kernels, frames = {}, {}
+    current_entry, current_properties = None, None
+    for line in log.splitlines():
+        match = entry_pattern.search(line)
+        if match:
+            current_entry = match.group(1)
+            kernels[current_entry] = empty_resources()
+            kernels[current_entry]["arch"] = match.group(2)
+            continue
+
+        match = properties_pattern.search(line)
+        if match:
+            current_properties = match.group(1)
+            continue
+
+        match = frame_pattern.search(line)
+        if match and current_properties is not None:
+            frames[current_properties] = tuple(int(value) for value in match.groups())
+            current_properties = None
+            continue
+
+        if current_entry is not None and usage_patterns["registers"].search(line):
+            for key, pattern in usage_patterns.items():
+                match = pattern.search(line)
+                if match:
+                    kernels[current_entry][key] = int(match.group(1))
+
+    # Function properties may be printed before or after the usage line
+    for name, (stack, spill_stores, spill_loads) in frames.items():
+        if name in kernels:
+            kernels[name]["stack"] = stack
+            kernels[name]["spill_stores"] = spill_stores
+            kernels[name]["spill_loads"] = spill_loads
+    return kernels
+
+
+def filter_ptxas_info(log: str) -> str:
+    # Drop the resource report, keeping warnings and errors
+    return "".join(
+        line
+        for line in log.splitlines(keepends=True)
+        if not line.startswith("ptxas info") and not frame_pattern.search(line)
+    )
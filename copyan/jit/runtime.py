@@ -1,19 +1,40 @@
+import _ctypes
+import collections
 import ctypes
+import json
 import os
 import platform
 import torch
-from typing import Optional
+from typing import Any, Dict, Optional
 
-from .template import map_ctype
+from . import config, tracing
+# NOTES: `Layout` is needed to evaluate `kernel.args`
+from .interop import get_array_info, is_array_like, wait_producer_stream
+from .template import get_ctype_converter, map_ctype, Layout
 
 IS_WINDOWS = platform.system() == "Windows"
+LIB_NAME = "kernel.dll" if IS_WINDOWS else "kernel.so"
+
+
+def close_library(lib: ctypes.CDLL) -> None:
+    if IS_WINDOWS:
+        _ctypes.FreeLibrary(lib._handle)
+    else:
+        _ctypes.dlclose(lib._handle)
 
 
 class Runtime:
     def __init__(self, path: str) -> None:
         self.path = path
+        self.kernel_name = os.path.basename(os.path.normpath(path))
+        # Tagged with the op name and tuned keys by the tuner, see `tracing`
+        self.trace_name = self.kernel_name
         self.lib = None
         self.args = None
+        self.meta = None
+        # Pinned runtimes are never unloaded, e.g. those behind a `PreparedRuntime` or captured into CUDA graphs
+        self.pins = 0
+        self.captured = False
         assert self.is_path_valid(self.path)
 
     @staticmethod
@@ -22,15 +43,28 @@ class Runtime:
             return False
 
         # Check for required files with platform-specific library extension
-        lib_ext = "kernel.dll" if IS_WINDOWS else "kernel.so"
-        files = ["kernel.cu", "kernel.args", lib_ext]
+        files = ["kernel.cu", "kernel.args", LIB_NAME]
         return all(os.path.exists(os.path.join(path, file)) for file in files)
 
-    def __call__(self, *args) -> int:
+    def read(self, file_name: str) -> bytes:
+        with open(os.path.join(self.path, file_name), "rb") as f:
+            return f.read()
+
+    def get_meta(self) -> dict:
+        # Build metadata, e.g. per-kernel resource usages, empty for entries built without it
+        if self.meta is None:
+            try:
+                self.meta = json.loads(self.read("kernel.meta.json"))
+            except (OSError, KeyError, ValueError):
+                self.meta = {}
+        return self.meta
+
+    def get_resources(self) -> dict:
+        return self.get_meta().get("resources", {})
+
+    def load(self) -> None:
         if self.lib is None or self.args is None:
-            lib_name = os.path.join(
-                self.path, "kernel.dll" if IS_WINDOWS else "kernel.so"
-            )
+            lib_name = os.path.join(self.path, LIB_NAME)
 
             if IS_WINDOWS:
                 # Temporarily change directory to handle DLL dependencies
@@ -46,6 +80,58 @@ class Runtime:
             with open(os.path.join(self.path, "kernel.args"), "r") as f:
                 self.args = eval(f.read())
 
+    def is_loaded(self) -> bool:
+        return self.lib is not None
+
+    def get_lib_size(self) -> int:
+        try:
+            return os.path.getsize(os.path.join(self.path, LIB_NAME))
+        except OSError:
+            return 0
+
+    def pin(self) -> None:
+        self.pins += 1
+
+    def unpin(self) -> None:
+        assert self.pins > 0
+        self.pins -= 1
+
+    def pin_if_capturing(self) -> None:
+        # Graphs replay the captured kernels for as long as they live, so their library is pinned for good
+        if not self.captured and torch.cuda.is_initialized() and torch.cuda.is_current_stream_capturing():
+            self.captured = True
+            self.pin()
+
+    def unload(self, synchronize: bool = False) -> bool:
+        # Close the library, it is loaded again by the next call
+        # Returns whether it was unloaded, pinned runtimes are kept
+        # With `synchronize`, the library's kernels which may still be in flight are waited for
+        if self.pins > 0 or self.lib is None:
+            return False
+        if synchronize and torch.cuda.is_initialized():
+            torch.cuda.synchronize()
+        lib, self.lib = self.lib, None
+        close_library(lib)
+        return True
+
+    def get_stream(self, args: tuple) -> Optional[torch.cuda.Stream]:
+        # The launch stream, `None` for the default one
+        for arg, (_, dtype) in zip(args, self.args):
+            if dtype is torch.cuda.Stream:
+                return arg
+        return None
+
+    def get_device_type(self, args: tuple) -> Optional[str]:
+        # Where pointer arguments must live: on the device for NVCC builds, otherwise next to the tensor arguments
+        if "arch" in self.get_meta():
+            return "cuda"
+        for arg in args:
+            if isinstance(arg, torch.Tensor):
+                return arg.device.type
+        return None
+
+    def __call__(self, *args) -> int:
+        self.load()
         assert len(args) == len(self.args), (
             f"Expected {len(self.args)} arguments, got {len(args)}"
         )
@@ -56,30 +142,140 @@ class Runtime:
                 assert arg.dtype == dtype, (
                     f"Expected tensor dtype `{dtype}` for `{name}`, got `{arg.dtype}`"
                 )
+                # Plain pointers carry no strides, strided kernels take a `Layout` argument
+                assert arg.is_contiguous(), (
+                    f"Expected a contiguous tensor for `{name}`, got strides {arg.stride()} for shape {tuple(arg.shape)}"
+                )
+            elif arg is None:
+                assert dtype is torch.cuda.Stream, f"Only streams may be `None`, got `{name}`"
+            elif isinstance(dtype, torch.dtype) and is_array_like(arg):
+                # Read once, DLPack exports a new capsule per call
+                stream = self.get_stream(args)
+                info = get_array_info(arg, stream)
+                assert info.dtype == dtype, (
+                    f"Expected array dtype `{dtype}` for `{name}`, got `{info.dtype}`"
+                )
+                assert info.is_contiguous(), (
+                    f"Expected a contiguous array for `{name}`, got strides {info.strides} for shape {info.shape}"
+                )
+                device_type = self.get_device_type(args)
+                assert device_type is None or info.device == device_type, (
+                    f"Expected a {device_type} array for `{name}`, got a {info.device} one"
+                )
+                if info.producer_stream is not None:
+                    wait_producer_stream(info.producer_stream, stream)
+                cargs.append(ctypes.c_void_p(info.ptr))
+                continue
             else:
                 assert isinstance(arg, dtype), (
                     f"Expected built-in type `{dtype}` for `{name}`, got `{type(arg)}`"
                 )
             cargs.append(map_ctype(arg))
 
+        self.pin_if_capturing()
         return_code = ctypes.c_int(0)
-        self.lib.launch(*cargs, ctypes.byref(return_code))
+        if tracing.ENABLED:
+            tracing.launch(self.trace_name, self.lib.launch, *cargs, ctypes.byref(return_code))
+        else:
+            self.lib.launch(*cargs, ctypes.byref(return_code))
+        return return_code.value
+
+
+class PreparedRuntime:
+    # A launcher with argument marshaling resolved once, for hot paths
+    # NOTES: arguments are not validated, the caller must guarantee their types and devices,
+    # and order the pending writes of foreign arrays before the launch
+    def __init__(self, runtime: Runtime) -> None:
+        runtime.load()
+        # The raw function pointer must outlive this launcher
+        runtime.pin()
+        self.runtime = runtime
+        self.launch = runtime.lib.launch
+        self.converters = tuple(get_ctype_converter(dtype) for _, dtype in runtime.args)
+
+    def __del__(self) -> None:
+        if hasattr(self, "launch"):
+            self.runtime.unpin()
+
+    def __call__(self, *args) -> int:
+        return_code = ctypes.c_int(0)
+        cargs = [convert(arg) for convert, arg in zip(self.converters, args)]
+        self.runtime.pin_if_capturing()
+        if tracing.ENABLED:
+            tracing.launch(
+                self.runtime.trace_name, self.launch, *cargs, ctypes.byref(return_code)
+            )
+        else:
+            self.launch(*cargs, ctypes.byref(return_code))
         return return_code.value
 
 
 class RuntimeCache:
+    # Least recently used entries are evicted and unloaded past `config.RUNTIME_CACHE_SIZE`, unless pinned
     def __init__(self) -> None:
-        self.cache = {}
+        self.cache = collections.OrderedDict()
+        self.evictions = 0
+        self.releases = 0
 
     def __getitem__(self, path: str) -> Optional[Runtime]:
         if path in self.cache:
+            self.cache.move_to_end(path)
             return self.cache[path]
 
         if os.path.exists(path) and Runtime.is_path_valid(path):
             runtime = Runtime(path)
-            self.cache[path] = runtime
+            self[path] = runtime
             return runtime
         return None
 
     def __setitem__(self, path, runtime) -> None:
         self.cache[path] = runtime
+        self.cache.move_to_end(path)
+        self.evict()
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.cache
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def evict(self) -> None:
+        capacity = config.RUNTIME_CACHE_SIZE
+        if capacity <= 0:
+            return
+        # Libraries launched during a capture are pinned at launch, see `Runtime.pin_if_capturing`
+        # NOTES: unloading a module in the middle of a capture would invalidate it
+        if torch.cuda.is_initialized() and torch.cuda.is_current_stream_capturing():
+            return
+        # The most recent entry is never evicted, it is about to be used
+        for path in list(self.cache.keys())[:-1]:
+            if len(self.cache) <= capacity:
+                break
+            runtime = self.cache[path]
+            if runtime.pins > 0:
+                continue
+            del self.cache[path]
+            # NOTES: no device-wide sync on the hot path, the least recently used kernels are long done
+            runtime.unload()
+            self.evictions += 1
+
+    def release(self, runtime: Runtime) -> bool:
+        # Drop and unload a runtime which is not needed anymore, e.g. a tuning loser
+        # Returns whether it was unloaded, pinned runtimes are kept
+        if runtime.pins > 0:
+            return False
+        if self.cache.get(runtime.path) is runtime:
+            del self.cache[runtime.path]
+        self.releases += 1
+        return runtime.unload(synchronize=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        loaded = [runtime for runtime in self.cache.values() if runtime.is_loaded()]
+        return {
+            "entries": len(self.cache),
+            "loaded": len(loaded),
+            "loaded_bytes": sum(runtime.get_lib_size() for runtime in loaded),
+            "pinned": sum(runtime.pins > 0 for runtime in self.cache.values()),
+            "evictions": self.evictions,
+            "releases": self.releases,
+        }
@@ -1,22 +1,113 @@
 import copy
 import ctypes
+import math
 import os
 import platform
 import torch
 
-from typing import Any, Iterable, Dict, Tuple
+from typing import Any, Callable, Iterable, Dict, Tuple
+
+from . import config
+from .interop import get_array_info, is_array_like
 
 IS_WINDOWS = platform.system() == "Windows"
 
+MAX_DIMS = 4
+
+
+class Layout(ctypes.Structure):
+    # Shape and strides (in elements) of a tensor argument, passed by value
+    # NOTES: must match `Layout` in `layout/layout.cuh`
+    _fields_ = [
+        ("ndim", ctypes.c_int),
+        ("shape", ctypes.c_int64 * MAX_DIMS),
+        ("strides", ctypes.c_int64 * MAX_DIMS),
+    ]
+
+    @staticmethod
+    def of(tensor: Any, coalesce: bool = False, writable: bool = False) -> "Layout":
+        # With `coalesce`, dims are reordered by stride and merged, which only suits order-free kernels (e.g. reductions)
+        # With `writable`, layouts where several elements share a memory location are rejected
+        if isinstance(tensor, torch.Tensor):
+            shape, strides = list(tensor.shape), list(tensor.stride())
+        else:
+            # Foreign arrays, e.g. CuPy or NumPy ones
+            info = get_array_info(tensor)
+            shape, strides = list(info.shape), info.strides
+            if strides is None:
+                strides = [math.prod(shape[d + 1 :]) for d in range(len(shape))]
+            strides = list(strides)
+        if coalesce:
+            shape, strides = coalesce_dims(shape, strides)
+        if len(shape) == 0:
+            shape, strides = [1], [1]
+        assert len(shape) <= MAX_DIMS, (
+            f"Unsupported layout with {len(shape)} dims (shape {tuple(shape)}, strides {tuple(strides)}), "
+            f"at most {MAX_DIMS} are supported"
+        )
+        assert not writable or not has_overlap(shape, strides), (
+            f"Unsupported output layout with overlapping elements (shape {tuple(shape)}, strides {tuple(strides)})"
+        )
+
+        layout = Layout()
+        layout.ndim = len(shape)
+        for d, (size, stride) in enumerate(zip(shape, strides)):
+            layout.shape[d], layout.strides[d] = size, stride
+        return layout
+
+    def __repr__(self) -> str:
+        shape = tuple(self.shape[: self.ndim])
+        strides = tuple(self.strides[: self.ndim])
+        return f"Layout(shape={shape}, strides={strides})"
+
+
+def coalesce_dims(shape: list, strides: list) -> Tuple[list, list]:
+    # Sort by decreasing stride, then merge dims which are contiguous with the next one
+    # Broadcast dims go first, so that the innermost one still walks memory
+    dims = sorted(
+        ((size, stride) for size, stride in zip(shape, strides) if size != 1),
+        key=lambda dim: (dim[1] != 0, -dim[1]),
+    )
+    if any(size == 0 for size, _ in dims):
+        return [0], [1]
+    merged = []
+    for size, stride in dims:
+        if len(merged) > 0 and merged[-1][1] == stride * size:
+            merged[-1] = (merged[-1][0] * size, stride)
+        else:
+            merged.append((size, stride))
+    return [size for size, _ in merged], [stride for _, stride in merged]
+
+
+def has_overlap(shape: list, strides: list) -> bool:
+    # Sufficient for non-negative strides: every dim must step over all the smaller ones
+    extent = 1
+    for size, stride in sorted(
+        ((size, stride) for size, stride in zip(shape, strides) if size > 1),
+        key=lambda dim: dim[1],
+    ):
+        if stride < extent:
+            return True
+        extent = stride * size
+    return False
+
 # Name map for Python `eval`
 typename_map: Dict[Any, str] = {
     **{t: t.__name__ for t in (bool, int, float)},
+    torch.bool: "torch.bool",
     torch.int: "torch.int",
     torch.float: "torch.float",
     torch.float16: "torch.half",
     torch.bfloat16: "torch.bfloat16",
     torch.float8_e4m3fn: "torch.float8_e4m3fn",
+    torch.int8: "torch.int8",
+    torch.uint8: "torch.uint8",
+    torch.int16: "torch.int16",
+    torch.uint32: "torch.uint32",
+    torch.int64: "torch.int64",
+    torch.float64: "torch.float64",
     torch.cuda.Stream: "torch.cuda.Stream",
+    Layout: "Layout",
 }
 
 # `ctype` map for Python casting
@@ -25,14 +116,22 @@ ctype_map: Dict[Any, Any] = {
     **{
         t: ctypes.c_void_p
         for t in (
+            torch.bool,
             torch.int,
             torch.float,
             torch.half,
             torch.bfloat16,
             torch.float8_e4m3fn,
+            torch.int8,
+            torch.uint8,
+            torch.int16,
+            torch.uint32,
+            torch.int64,
+            torch.float64,
             torch.cuda.Stream,
         )
     },
+    Layout: Layout,
 }
 
 # Type map for both Python API and source code usages
@@ -40,24 +139,60 @@ genc_map = {
     bool: ("bool", "bool"),
     int: ("int", "int"),
     float: ("float", "float"),
+    torch.bool: ("void*", "bool*"),
     torch.int: ("void*", "int*"),
     torch.float: ("void*", "float*"),
     torch.half: ("void*", "__half*"),
     torch.bfloat16: ("void*", "__nv_bfloat16*"),
     torch.float8_e4m3fn: ("void*", "__nv_fp8_e4m3*"),
+    torch.int8: ("void*", "int8_t*"),
+    torch.uint8: ("void*", "uint8_t*"),
+    torch.int16: ("void*", "int16_t*"),
+    torch.uint32: ("void*", "uint32_t*"),
+    torch.int64: ("void*", "int64_t*"),
+    torch.float64: ("void*", "double*"),
     torch.cuda.Stream: ("void*", "cudaStream_t"),
+    Layout: ("Layout", "Layout"),
 }
 
 
 def map_ctype(value: Any) -> Any:
-    ctype = ctype_map[value.dtype if isinstance(value, torch.Tensor) else type(value)]
+    # NOTES: a `None` stream is the default stream
+    if value is None:
+        return ctypes.c_void_p(None)
+    if isinstance(value, Layout):
+        return value
     if isinstance(value, torch.Tensor):
-        return ctype(value.data_ptr())
+        return ctypes.c_void_p(value.data_ptr())
+    if is_array_like(value):
+        # e.g. CuPy or NumPy arrays, without any copy
+        return ctypes.c_void_p(get_array_info(value).ptr)
+    ctype = ctype_map[type(value)]
     if isinstance(value, torch.cuda.Stream):
         return ctype(value.cuda_stream)
     return ctype(value)
 
 
+def get_ctype_converter(dtype: Any) -> Callable[[Any], Any]:
+    # Resolve `map_ctype` for a fixed argument type ahead of time
+    ctype = ctype_map[dtype]
+    if dtype is Layout:
+        return lambda value: value
+    if dtype is torch.cuda.Stream:
+        return lambda value: ctype(None if value is None else value.cuda_stream)
+    if isinstance(dtype, torch.dtype):
+
+        def convert(value: Any) -> Any:
+            # Tensors first, foreign arrays only pay for the failed lookup
+            try:
+                return ctype(value.data_ptr())
+            except AttributeError:
+                return ctype(get_array_info(value).ptr)
+
+        return convert
+    return ctype
+
+
 def cpp_format(template: str, keys: Dict[str, Any]) -> str:
     # We don't use `str.format` because it's not safe for C++ {} braces
     new_template = copy.deepcopy(template)
@@ -92,7 +227,7 @@ def generate(includes: Iterable[str], arg_defs: Iterable[Tuple], body: str) -> s
         "<cuda_runtime.h>",
         "<iostream>",
     ]
-    preload_package_includes = ['"cutlass/cutlass.h"']
+    preload_package_includes = ['"cutlass/cutlass.h"', '"layout/layout.cuh"']
 
     assert isinstance(includes, list) or isinstance(includes, tuple)
     sys_includes = sorted(
@@ -145,7 +280,7 @@ def generate(includes: Iterable[str], arg_defs: Iterable[Tuple], body: str) -> s
     code += "}\n\n"
 
     # Debug print
-    if os.getenv("COPYAN_JIT_DEBUG", None):
+    if config.JIT_DEBUG:
         print(f"Generated code:\n{code}")
 
     return code
@@ -0,0 +1,116 @@
+import os
+import time
+import torch
+from typing import Any, Callable, Dict, List
+
+# Launch instrumentation, off by default: disabled launches only check `ENABLED`
+ENABLED = False
+COUNTERS = False
+NVTX = False
+RECORD_FUNCTION = False
+
+# Host latencies are bucketed by powers of two nanoseconds
+NUM_BUCKETS = 40
+
+
+class LaunchStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ns = 0
+        self.buckets = [0] * NUM_BUCKETS
+
+    def record(self, elapsed_ns: int) -> None:
+        # NOTES: updates are not atomic across threads, counts may be slightly off under concurrent launches
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self.buckets[min(elapsed_ns.bit_length(), NUM_BUCKETS - 1)] += 1
+
+    def mean_us(self) -> float:
+        return self.total_ns / max(self.count, 1) / 1e3
+
+    def percentile_us(self, q: float) -> float:
+        # Upper bound of the bucket holding the `q`-th percentile
+        threshold = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count > 0 and seen >= threshold:
+                return (1 << index) / 1e3
+        return 0.0
+
+    def histogram(self) -> List[tuple]:
+        # `(upper bound in us, count)` of the non-empty buckets
+        return [((1 << i) / 1e3, count) for i, count in enumerate(self.buckets) if count > 0]
+
+    def __repr__(self) -> str:
+        return (
+            f"LaunchStats(count={self.count}, mean={self.mean_us():.2f} us, "
+            f"p50<={self.percentile_us(50):.2f} us, p99<={self.percentile_us(99):.2f} us)"
+        )
+
+
+stats: Dict[str, LaunchStats] = {}
+
+
+def enable(counters: bool = True, nvtx: bool = False, record_function: bool = True) -> None:
+    global ENABLED, COUNTERS, NVTX, RECORD_FUNCTION
+    COUNTERS, NVTX, RECORD_FUNCTION = counters, nvtx, record_function
+    ENABLED = counters or nvtx or record_function
+
+
+def disable() -> None:
+    enable(counters=False, nvtx=False, record_function=False)
+
+
+def reload_from_env() -> None:
+    # e.g. `COPYAN_TRACE=counters,nvtx`, or `COPYAN_TRACE=1` for counters and profiler ranges
+    options = set(filter(None, os.getenv("COPYAN_TRACE", "").split(",")))
+    if options - {"0"}:
+        everything = "1" in options
+        enable(
+            counters=everything or "counters" in options,
+            nvtx="nvtx" in options,
+            record_function=everything or "record_function" in options,
+        )
+    else:
+        disable()
+
+
+def get_stats() -> Dict[str, LaunchStats]:
+    return stats
+
+
+def reset() -> None:
+    stats.clear()
+
+
+def get_trace_name(name: str, keys: Dict[str, Any], tuned_keys: Dict[str, Any]) -> str:
+    items = [f"{key}={value}" for key, value in {**keys, **tuned_keys}.items()]
+    return f"{name}[{', '.join(items)}]"
+
+
+def launch(trace_name: str, fn: Callable[..., Any], *args) -> Any:
+    record_function = None
+    if RECORD_FUNCTION:
+        record_function = torch.profiler.record_function(trace_name)
+        record_function.__enter__()
+    if NVTX:
+        torch.cuda.nvtx.range_push(trace_name)
+
+    start = time.perf_counter_ns()
+    try:
+        return fn(*args)
+    finally:
+        elapsed_ns = time.perf_counter_ns() - start
+        if NVTX:
+            torch.cuda.nvtx.range_pop()
+        if record_function is not None:
+            record_function.__exit__(None, None, None)
+        if COUNTERS:
+            launch_stats = stats.get(trace_name)
+            if launch_stats is None:
+                launch_stats = stats[trace_name] = LaunchStats()
+            launch_stats.record(elapsed_ns)
+
+
+reload_from_env()
@@ -1,2 +1,34 @@
 from .reduce import reduce_sum_max, accuracy_test as reduce_sum_max_accuracy_test
-from .scan import naive_scan, accuracy_test as naive_scan_accuracy_test
\ No newline at end of file
+from .scan import naive_scan, accuracy_test as naive_scan_accuracy_test
+from .histogram import (
+    bincount,
+    bincount_reference,
+    histogram,
+    histogram_reference,
+    accuracy_test as histogram_accuracy_test,
+)
+from .compact import (
+    compact,
+    compact_reference,
+    nonzero,
+    nonzero_reference,
+    partition,
+    partition_reference,
+    accuracy_test as compact_accuracy_test,
+)
+from .radix_sort import (
+    radix_sort,
+    radix_sort_reference,
+    accuracy_test as radix_sort_accuracy_test,
+)
+from .streaming import (
+    iter_scan,
+    stream_reduce_sum_max,
+    stream_scan,
+    accuracy_test as streaming_accuracy_test,
+)
+from .ops import naive_scan_op, reduce_sum_max_op
+from .tuner import jit_tuner
+from .space import Space, smem_limit, warp_multiple
+from .search import CoordinateDescent, Exhaustive, RandomSearch
+from .cost_model import CostModel
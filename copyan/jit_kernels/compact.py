@@ -0,0 +1,143 @@
+import torch
+from typing import Tuple, Union
+
+from .search import SearchStrategy
+from .space import as_space, Space, smem_limit
+from .tuner import jit_tuner
+
+includes = ('"scan/compact.cuh"',)
+template = """
+// Templated args from Python JIT call
+__return_code = compact_c<{T}, {PARTITION}, {INDICES}, {BLOCK_SIZE}, {ITEMS_PER_THREAD}>(X, MASK, N, Y, COUNT, reinterpret_cast<uint32_t *>(W), W_SIZE);
+"""
+
+default_space = Space(
+    BLOCK_SIZE=(256, 512),
+    ITEMS_PER_THREAD=(4, 8, 16),
+).where(smem_limit("BLOCK_SIZE * ITEMS_PER_THREAD * 4"))
+
+typename_map = {torch.float: "float", torch.int: "int"}
+
+
+def get_workspace_size(N: int, space: Union[Space, tuple] = None) -> int:
+    # `int32` elements: the scanned mask, followed by one sum per scan tile
+    # NOTES: constraints are ignored, the smallest tile gives an upper bound for any config of the space
+    axes = as_space(default_space if space is None else space).axes
+    min_tile = min(axes.get("BLOCK_SIZE", (256,))) * min(axes.get("ITEMS_PER_THREAD", (8,)))
+    return N + (N + min_tile - 1) // min_tile
+
+
+def launch(
+    x: torch.Tensor,
+    mask: torch.Tensor,
+    out: torch.Tensor,
+    partition: bool,
+    indices: bool,
+    space: Union[Space, tuple],
+    strategy: SearchStrategy,
+) -> int:
+    N = mask.numel()
+    assert mask.dtype == torch.bool and mask.is_contiguous()
+    assert x.is_contiguous() and out.is_contiguous() and out.dtype == x.dtype
+    assert indices or x.numel() == N
+    assert out.numel() >= N
+
+    count = torch.empty(1, dtype=torch.int, device=mask.device)
+    workspace = torch.empty(get_workspace_size(N, space), dtype=torch.int, device=mask.device)
+    args = (x, mask, N, out, count, workspace, workspace.numel())
+    runtime = jit_tuner.compile_and_tune(
+        name="compact",
+        keys={
+            "T": typename_map[x.dtype],
+            "PARTITION": "true" if partition else "false",
+            "INDICES": "true" if indices else "false",
+            # Tune once per power-of-two bucket of sizes
+            "N_BUCKET": 1 << max(N - 1, 0).bit_length(),
+        },
+        space=default_space if space is None else space,
+        includes=includes,
+        arg_defs=(
+            ("X", x.dtype),
+            ("MASK", torch.bool),
+            ("N", int),
+            ("Y", x.dtype),
+            ("COUNT", torch.int),
+            ("W", torch.int),
+            ("W_SIZE", int),
+        ),
+        template=template,
+        args=args,
+        strategy=strategy,
+    )
+    assert runtime(*args) == 0
+    # NOTES: synchronizes with the device, like `torch.nonzero`
+    return count.item()
+
+
+def compact(
+    x: torch.Tensor,
+    mask: torch.Tensor,
+    out: torch.Tensor = None,
+    space: Union[Space, tuple] = None,
+    strategy: SearchStrategy = None,
+) -> torch.Tensor:
+    # Stable `x[mask]` for 1-D inputs
+    out = torch.empty_like(x) if out is None else out
+    return out[: launch(x, mask, out, False, False, space, strategy)]
+
+
+def partition(
+    x: torch.Tensor,
+    mask: torch.Tensor,
+    out: torch.Tensor = None,
+    space: Union[Space, tuple] = None,
+    strategy: SearchStrategy = None,
+) -> Tuple[torch.Tensor, int]:
+    # Selected items first, then the others, both in their input order
+    # Returns the partitioned tensor and the number of selected items
+    out = torch.empty_like(x) if out is None else out
+    return out, launch(x, mask, out, True, False, space, strategy)
+
+
+def nonzero(
+    mask: torch.Tensor,
+    out: torch.Tensor = None,
+    space: Union[Space, tuple] = None,
+    strategy: SearchStrategy = None,
+) -> torch.Tensor:
+    # `int32` indices of the set items of a 1-D mask
+    if out is None:
+        out = torch.empty(mask.numel(), dtype=torch.int, device=mask.device)
+    return out[: launch(out, mask, out, False, True, space, strategy)]
+
+
+def compact_reference(x: torch.Tensor, mask: torch.Tensor) -> torch.Tensor:
+    return x.cpu()[mask.cpu()]
+
+
+def partition_reference(x: torch.Tensor, mask: torch.Tensor) -> Tuple[torch.Tensor, int]:
+    x, mask = x.cpu(), mask.cpu()
+    return torch.cat((x[mask], x[~mask])), int(mask.sum().item())
+
+
+def nonzero_reference(mask: torch.Tensor) -> torch.Tensor:
+    return mask.cpu().nonzero().view(-1).to(torch.int)
+
+
+def accuracy_test():
+    torch.manual_seed(44)
+    for N in (1, 1000, 1024 * 4096 + 7):
+        x = torch.randn(N, dtype=torch.float, device="cuda")
+        mask = x > 0.5
+
+        assert torch.equal(compact(x, mask).cpu(), compact_reference(x, mask))
+        assert torch.equal(nonzero(mask).cpu(), nonzero_reference(mask))
+        out, count = partition(x.int(), mask)
+        out_ref, count_ref = partition_reference(x.int(), mask)
+        assert count == count_ref and torch.equal(out.cpu(), out_ref)
+
+    print("Test passed!")
+
+
+if __name__ == "__main__":
+    accuracy_test()
@@ -0,0 +1,336 @@
+import argparse
+import functools
+import json
+import math
+import os
+import sys
+import torch
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..jit import config
+
+# Tuning measurements are appended as JSON lines, one per benchmarked candidate:
+# `{"name", "keys", "tuned_keys", "N", "dtype", "device", "time"}`
+# A ridge regression per kernel name predicts `log(time)` from those, so that candidates can be ranked without running them
+
+
+@functools.lru_cache(maxsize=None)
+def get_device_info() -> Dict[str, Any]:
+    if not torch.cuda.is_available():
+        return {"device": "cpu", "cc": 0, "num_sms": 0}
+    props = torch.cuda.get_device_properties(torch.cuda.current_device())
+    return {
+        "device": props.name,
+        "cc": props.major * 10 + props.minor,
+        "num_sms": props.multi_processor_count,
+    }
+
+
+def get_dtype(args: tuple) -> Optional[str]:
+    # The first tensor argument stands for the problem dtype
+    for arg in args:
+        if isinstance(arg, torch.Tensor):
+            return str(arg.dtype).replace("torch.", "")
+    return None
+
+
+def log_measurement(
+    name: str,
+    keys: Dict[str, Any],
+    tuned_keys: Dict[str, Any],
+    N: Optional[int],
+    dtype: Optional[str],
+    time: float,
+    path: str = None,
+) -> None:
+    path = config.TUNING_LOG if path is None else path
+    if not path:
+        return
+    record = {
+        "name": name,
+        "keys": keys,
+        "tuned_keys": tuned_keys,
+        "N": N,
+        "dtype": dtype,
+        "device": get_device_info(),
+        "time": time,
+    }
+    # NOTES: a single small append is atomic, so several processes may share a log
+    with open(path, "a") as f:
+        f.write(json.dumps(record, sort_keys=True, default=str) + "\n")
+
+
+def read_logs(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    records = []
+    for path in paths:
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A partial last line from an interrupted writer
+                    continue
+    return records
+
+
+def get_inputs(record: Dict[str, Any]) -> Dict[str, Any]:
+    # Everything a prediction may depend on, flattened
+    return {
+        **record["keys"],
+        **record["tuned_keys"],
+        **record["device"],
+        "N": record["N"],
+        "dtype": record["dtype"],
+    }
+
+
+def get_matrix(index: Dict[str, int], features: List[Dict[str, float]]) -> torch.Tensor:
+    # NOTES: features without a column are dropped, e.g. values never seen while fitting
+    x = torch.zeros(len(features), len(index), dtype=torch.float64)
+    for row, values in enumerate(features):
+        for name, value in values.items():
+            column = index.get(name)
+            if column is not None:
+                x[row, column] = value
+    return x
+
+
+def get_features(inputs: Dict[str, Any]) -> Dict[str, float]:
+    # A degree-2 polynomial of the numbers in `log2` (e.g. tile sizes against `N`), and one-hot values of the others,
+    # which also interact with the problem size since the best config usually moves with it
+    numbers, features = {}, {}
+    for key, value in inputs.items():
+        if value is None:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            numbers[key] = math.log2(max(value, 0) + 1)
+        else:
+            features[f"{key}={value}"] = 1.0
+
+    log_n = numbers.get("N", 0.0)
+    for key in list(features):
+        features[f"{key}*log2:N"] = log_n
+    names = sorted(numbers)
+    for i, a in enumerate(names):
+        features[f"log2:{a}"] = numbers[a]
+        for b in names[i:]:
+            features[f"log2:{a}*log2:{b}"] = numbers[a] * numbers[b]
+    return features
+
+
+class RidgeModel:
+    # Standardised linear regression with an L2 penalty, solved in closed form
+    def __init__(
+        self,
+        feature_names: List[str],
+        weights: List[float],
+        means: List[float],
+        stds: List[float],
+        bias: float,
+    ) -> None:
+        self.feature_names = feature_names
+        self.index = {name: i for i, name in enumerate(feature_names)}
+        self.weights = torch.tensor(weights, dtype=torch.float64)
+        self.means = torch.tensor(means, dtype=torch.float64)
+        self.stds = torch.tensor(stds, dtype=torch.float64)
+        self.bias = bias
+
+    @staticmethod
+    def fit(features: List[Dict[str, float]], targets: List[float], alpha: float) -> "RidgeModel":
+        feature_names = sorted({name for values in features for name in values})
+        x = get_matrix({name: i for i, name in enumerate(feature_names)}, features)
+        y = torch.tensor(targets, dtype=torch.float64)
+
+        means = x.mean(dim=0)
+        stds = x.std(dim=0, unbiased=False)
+        stds = torch.where(stds > 1e-12, stds, torch.ones_like(stds))
+        x = (x - means) / stds
+        bias = y.mean()
+
+        gram = x.T @ x + alpha * torch.eye(x.shape[1], dtype=torch.float64)
+        weights = torch.linalg.solve(gram, x.T @ (y - bias))
+        return RidgeModel(feature_names, weights.tolist(), means.tolist(), stds.tolist(), bias.item())
+
+    def predict(self, features: List[Dict[str, float]]) -> torch.Tensor:
+        x = (get_matrix(self.index, features) - self.means) / self.stds
+        return x @ self.weights + self.bias
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "feature_names": self.feature_names,
+            "weights": self.weights.tolist(),
+            "means": self.means.tolist(),
+            "stds": self.stds.tolist(),
+            "bias": self.bias,
+        }
+
+    @staticmethod
+    def from_dict(state: Dict[str, Any]) -> "RidgeModel":
+        return RidgeModel(**state)
+
+
+class CostModel:
+    # One `RidgeModel` per kernel name, predicting `log(time)`
+    def __init__(self, models: Dict[str, RidgeModel] = None) -> None:
+        self.models = {} if models is None else models
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.models
+
+    @staticmethod
+    def fit(records: List[Dict[str, Any]], alpha: float = 1.0) -> "CostModel":
+        by_name = {}
+        for record in records:
+            if record.get("time") is not None and record["time"] > 0:
+                by_name.setdefault(record["name"], []).append(record)
+
+        models = {}
+        for name, named_records in by_name.items():
+            features = [get_features(get_inputs(record)) for record in named_records]
+            targets = [math.log(record["time"]) for record in named_records]
+            models[name] = RidgeModel.fit(features, targets, alpha)
+        return CostModel(models)
+
+    def predict(
+        self,
+        name: str,
+        keys: Dict[str, Any],
+        candidates: List[Dict[str, Any]],
+        N: Optional[int],
+        dtype: Optional[str],
+        device: Dict[str, Any] = None,
+    ) -> torch.Tensor:
+        device = get_device_info() if device is None else device
+        features = [
+            get_features(
+                get_inputs(
+                    {"keys": keys, "tuned_keys": tuned_keys, "device": device, "N": N, "dtype": dtype}
+                )
+            )
+            for tuned_keys in candidates
+        ]
+        return self.models[name].predict(features)
+
+    def rank(
+        self,
+        name: str,
+        keys: Dict[str, Any],
+        candidates: List[Dict[str, Any]],
+        N: Optional[int],
+        dtype: Optional[str],
+        device: Dict[str, Any] = None,
+    ) -> List[Dict[str, Any]]:
+        # Fastest predicted first, ties keep the space order
+        predicted = self.predict(name, keys, candidates, N, dtype, device).tolist()
+        order = sorted(range(len(candidates)), key=lambda i: (predicted[i], i))
+        return [candidates[i] for i in order]
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump({name: model.to_dict() for name, model in self.models.items()}, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path: str) -> "CostModel":
+        with open(path, "r") as f:
+            state = json.load(f)
+        return CostModel({name: RidgeModel.from_dict(model) for name, model in state.items()})
+
+
+def get_session_key(record: Dict[str, Any]) -> tuple:
+    # Measurements of the same tuning problem, which only differ by their tuned keys
+    return (
+        record["name"],
+        json.dumps(record["keys"], sort_keys=True),
+        record["N"],
+        record["dtype"],
+        json.dumps(record["device"], sort_keys=True),
+    )
+
+
+def split_sessions(records: List[Dict[str, Any]], every: int) -> tuple:
+    # Every `every`-th tuning session (in log order) is held out, so that reported metrics are out-of-sample
+    # NOTES: whole sessions are held out, a model which saw some candidates of a session would rank it too well
+    order = {}
+    for record in records:
+        order.setdefault(get_session_key(record), len(order))
+    train, held_out = [], []
+    for record in records:
+        index = order[get_session_key(record)]
+        (held_out if every > 0 and index % every == every - 1 else train).append(record)
+    return train, held_out
+
+
+def evaluate(model: CostModel, records: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    # Per kernel name: how often the predicted best is the measured best, and the mean slowdown of the predicted best
+    sessions = {}
+    for record in records:
+        if record.get("time") is not None and record["name"] in model:
+            sessions.setdefault(get_session_key(record), []).append(record)
+
+    results = {}
+    for (name, *_), session in sessions.items():
+        candidates = [record["tuned_keys"] for record in session]
+        first = session[0]
+        predicted = model.predict(name, first["keys"], candidates, first["N"], first["dtype"], first["device"])
+        times = torch.tensor([record["time"] for record in session], dtype=torch.float64)
+        picked = times[predicted.argmin()]
+
+        result = results.setdefault(name, {"sessions": 0, "top1": 0.0, "slowdown": 0.0})
+        result["sessions"] += 1
+        result["top1"] += float(picked == times.min())
+        result["slowdown"] += (picked / times.min()).item()
+
+    for result in results.values():
+        result["top1"] /= result["sessions"]
+        result["slowdown"] /= result["sessions"]
+    return results
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m copyan.jit_kernels.cost_model",
+        description="Retrain the tuning cost model from accumulated tuning logs",
+    )
+    parser.add_argument("logs", nargs="+", help="JSON lines tuning logs, e.g. from `COPYAN_TUNING_LOG`")
+    parser.add_argument("-o", "--output", required=True, help="Path of the model to write")
+    parser.add_argument("--alpha", type=float, default=1.0, help="L2 penalty")
+    parser.add_argument(
+        "--holdout-every",
+        type=int,
+        default=5,
+        help="Report metrics on every k-th tuning session, left out of a separate fit (0 reports in-sample metrics)",
+    )
+    args = parser.parse_args(argv)
+
+    records = read_logs(args.logs)
+    model = CostModel.fit(records, alpha=args.alpha)
+    if len(model.models) == 0:
+        print("No measurements found", file=sys.stderr)
+        return 1
+    model.save(args.output)
+
+    # The saved model uses every measurement, the metrics come from a fit without the held-out sessions
+    if args.holdout_every > 0:
+        train, held_out = split_sessions(records, args.holdout_every)
+        results = evaluate(CostModel.fit(train, alpha=args.alpha), held_out)
+        label = "held-out"
+    else:
+        results = evaluate(model, records)
+        label = "in-sample"
+    if len(results) == 0:
+        print("Too few tuning sessions to hold any out, no metrics reported")
+    for name, result in sorted(results.items()):
+        print(
+            f"{name}: {result['sessions']} {label} sessions, predicted best is the measured best in "
+            f"{result['top1'] * 100:.0f}%, mean slowdown {result['slowdown']:.3f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
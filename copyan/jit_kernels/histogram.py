@@ -0,0 +1,234 @@
+import torch
+from typing import Tuple, Union
+
+from ..jit import Runtime
+from .search import SearchStrategy
+from .space import Space, smem_limit
+from .tuner import jit_tuner
+
+includes = ('"histogram/histogram.cuh"',)
+template = """
+// Templated args from Python JIT call
+const auto binning = {BINNING}::make(LO, HI, EDGES, N_BINS);
+__return_code = histogram_c<{T}, {BINNING}, {T_COUNT}, {HAS_WEIGHTS}, {BLOCK_SIZE}, {ITEMS_PER_THREAD}, {BINS_PER_BLOCK}>(X, W, N, binning, Y);
+"""
+
+# Bins are privatised in shared memory, a slice of `BINS_PER_BLOCK` bins per block
+default_space = Space(
+    BLOCK_SIZE=(256,),
+    ITEMS_PER_THREAD=(4,),
+    BINS_PER_BLOCK=(256, 1024, 4096),
+).where(
+    lambda names: names["BINS_PER_BLOCK"] == 256
+    or names["BINS_PER_BLOCK"] < 2 * names["N_BINS"],
+    smem_limit("BINS_PER_BLOCK * 4"),
+)
+
+binning_map = {
+    "fixed": "FixedWidthBinning",
+    "edges": "EdgesBinning",
+    "index": "IndexBinning",
+}
+
+
+def get_runtime(
+    binning: str,
+    args: tuple,
+    space: Union[Space, tuple] = None,
+    strategy: SearchStrategy = None,
+) -> Runtime:
+    x, weights, _, _, _, _, n_bins, y = args
+    keys = {
+        "BINNING": binning_map[binning],
+        "T": {torch.float: "float", torch.int: "int"}[x.dtype],
+        "T_COUNT": {torch.float: "float", torch.int: "int"}[y.dtype],
+        "HAS_WEIGHTS": "true" if weights.numel() > 0 else "false",
+        # Tune once per power-of-two bucket of bin counts
+        "N_BINS_BUCKET": 1 << max(n_bins - 1, 0).bit_length(),
+    }
+    return jit_tuner.compile_and_tune(
+        name="histogram",
+        keys=keys,
+        space=default_space if space is None else space,
+        includes=includes,
+        arg_defs=(
+            ("X", x.dtype),
+            ("W", torch.float),
+            ("N", int),
+            ("LO", float),
+            ("HI", float),
+            ("EDGES", torch.float),
+            ("N_BINS", int),
+            ("Y", y.dtype),
+        ),
+        template=template,
+        args=args,
+        strategy=strategy,
+    )
+
+
+def launch(
+    binning: str,
+    x: torch.Tensor,
+    weights: torch.Tensor,
+    lo: float,
+    hi: float,
+    edges: torch.Tensor,
+    n_bins: int,
+    out: torch.Tensor,
+    space: Union[Space, tuple],
+    strategy: SearchStrategy,
+) -> torch.Tensor:
+    assert x.is_contiguous() and x.data_ptr() % 16 == 0
+    assert out.is_contiguous() and out.numel() == n_bins
+    if weights is None:
+        weights = torch.empty(0, dtype=torch.float, device=x.device)
+    else:
+        assert weights.dtype == torch.float and weights.is_contiguous()
+        assert weights.shape == x.shape
+    if edges is None:
+        edges = torch.empty(0, dtype=torch.float, device=x.device)
+
+    args = (x, weights, x.numel(), float(lo), float(hi), edges, n_bins, out)
+    runtime = get_runtime(binning, args, space, strategy)
+
+    # Tuning accumulates into `out`, only zero it right before the real launch
+    out.zero_()
+    assert runtime(*args) == 0
+    return out
+
+
+def histogram(
+    x: torch.Tensor,
+    bins: int = None,
+    range: Tuple[float, float] = None,
+    edges: torch.Tensor = None,
+    weights: torch.Tensor = None,
+    out: torch.Tensor = None,
+    space: Union[Space, tuple] = None,
+    strategy: SearchStrategy = None,
+) -> torch.Tensor:
+    # Either `bins` fixed-width bins over `range` (like `torch.histc`, defaults to the data range), or explicit `edges`
+    # Values outside of the bins are ignored, the right-most edge belongs to the last bin
+    # Returns `int32` counts, or `float32` sums of `weights`
+    assert x.dtype == torch.float
+    if edges is not None:
+        assert bins is None and range is None
+        assert edges.dtype == torch.float and edges.is_contiguous() and edges.numel() >= 2
+        binning, n_bins, lo, hi = "edges", edges.numel() - 1, 0, 0
+    else:
+        assert bins is not None and bins > 0
+        if range is None:
+            range = (x.min().item(), x.max().item())
+        lo, hi = range
+        if lo == hi:
+            lo, hi = lo - 1, hi + 1
+        assert lo < hi
+        binning, n_bins = "fixed", bins
+
+    if out is None:
+        out = torch.empty(
+            n_bins,
+            dtype=torch.int if weights is None else torch.float,
+            device=x.device,
+        )
+    if weights is not None:
+        weights = weights.view(-1)
+    return launch(
+        binning, x.view(-1), weights, lo, hi, edges, n_bins, out, space, strategy
+    )
+
+
+def bincount(
+    x: torch.Tensor,
+    weights: torch.Tensor = None,
+    minlength: int = 0,
+    space: Union[Space, tuple] = None,
+    strategy: SearchStrategy = None,
+) -> torch.Tensor:
+    # Like `torch.bincount`, but with `int32` inputs and counts
+    assert x.dtype == torch.int and x.dim() == 1
+    n_bins = max(minlength, x.max().item() + 1 if x.numel() > 0 else 0, 1)
+    out = torch.empty(
+        n_bins,
+        dtype=torch.int if weights is None else torch.float,
+        device=x.device,
+    )
+    return launch("index", x, weights, 0, 0, None, n_bins, out, space, strategy)
+
+
+def histogram_reference(
+    x: torch.Tensor,
+    bins: int = None,
+    range: Tuple[float, float] = None,
+    edges: torch.Tensor = None,
+    weights: torch.Tensor = None,
+) -> torch.Tensor:
+    # Host reference with the exact binning arithmetic of the kernels
+    x = x.detach().cpu().view(-1).float()
+    if edges is not None:
+        edges = edges.detach().cpu().float()
+        n_bins = edges.numel() - 1
+        mask = (x >= edges[0]) & (x <= edges[-1])
+        bin_ids = torch.searchsorted(edges, x, right=True) - 1
+    else:
+        if range is None:
+            range = (x.min().item(), x.max().item())
+        lo, hi = range
+        if lo == hi:
+            lo, hi = lo - 1, hi + 1
+        n_bins = bins
+        lo_t = torch.tensor(lo, dtype=torch.float)
+        hi_t = torch.tensor(hi, dtype=torch.float)
+        mask = (x >= lo_t) & (x <= hi_t)
+        bin_ids = ((x - lo_t) / (hi_t - lo_t) * n_bins).to(torch.int64)
+    bin_ids = bin_ids.clamp(0, n_bins - 1)[mask]
+
+    if weights is None:
+        return torch.bincount(bin_ids, minlength=n_bins).to(torch.int)
+    weights = weights.detach().cpu().view(-1).float()[mask]
+    return torch.zeros(n_bins, dtype=torch.float).index_add_(0, bin_ids, weights)
+
+
+def bincount_reference(
+    x: torch.Tensor, weights: torch.Tensor = None, minlength: int = 0
+) -> torch.Tensor:
+    x = x.detach().cpu().long()
+    n_bins = max(minlength, x.max().item() + 1 if x.numel() > 0 else 0, 1)
+    if weights is None:
+        return torch.bincount(x, minlength=n_bins).to(torch.int)
+    weights = weights.detach().cpu().float()
+    return torch.bincount(x, weights=weights, minlength=n_bins).float()
+
+
+def accuracy_test():
+    torch.manual_seed(43)
+    N = 1024 * 4096 + 3
+    x = torch.randn(N, dtype=torch.float, device="cuda")
+    w = torch.rand(N, dtype=torch.float, device="cuda")
+
+    for bins in (64, 1000, 5000):
+        assert torch.equal(
+            histogram(x, bins, (-3, 3)).cpu(), histogram_reference(x, bins, (-3, 3))
+        )
+    edges = torch.tensor([-4, -1, -0.5, 0, 0.25, 2, 4], dtype=torch.float, device="cuda")
+    assert torch.equal(
+        histogram(x, edges=edges).cpu(), histogram_reference(x, edges=edges)
+    )
+
+    weighted = histogram(x, 100, (-3, 3), weights=w).cpu()
+    weighted_ref = histogram_reference(x, 100, (-3, 3), weights=w)
+    assert torch.allclose(weighted, weighted_ref, rtol=1e-4)
+
+    tokens = torch.randint(0, 32000, (N,), dtype=torch.int, device="cuda")
+    assert torch.equal(bincount(tokens).cpu(), bincount_reference(tokens))
+    assert torch.equal(
+        bincount(tokens, minlength=40000).cpu(),
+        bincount_reference(tokens, minlength=40000),
+    )
+
+    print("Test passed!")
+
+
+if __name__ == "__main__":
+    accuracy_test()
@@ -0,0 +1,81 @@
+import torch
+from typing import Tuple
+
+from .reduce import reduce_sum_max
+from .scan import naive_scan
+
+# `torch.ops.copyan.*`: functional versions of the kernels, which `torch.compile` traces through without graph breaks
+# NOTES: kernels run on the current stream, which is also the capturing one inside CUDA graphs
+
+# Builtin transforms on the host, custom C++ expressions only run on the device
+host_transform_map = {
+    "identity": lambda x, shift: x,
+    "square": lambda x, shift: x * x,
+    "abs": lambda x, shift: x.abs(),
+    "exp": lambda x, shift: torch.exp(x - shift),
+}
+
+
+@torch.library.custom_op("copyan::reduce_sum_max", mutates_args=(), device_types="cuda")
+def reduce_sum_max_op(
+    x: torch.Tensor,
+    deterministic: bool = False,
+    transform: str = "identity",
+    shift: float = 0.0,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    y0 = torch.zeros(1, dtype=x.dtype, device=x.device)
+    y1 = torch.full((1,), -float("inf"), dtype=x.dtype, device=x.device)
+    stream = torch.cuda.current_stream(x.device)
+    reduce_sum_max(
+        x, y0, y1, deterministic=deterministic, transform=transform, shift=shift, stream=stream
+    )
+    return y0, y1
+
+
+@reduce_sum_max_op.register_fake
+def _(
+    x: torch.Tensor,
+    deterministic: bool = False,
+    transform: str = "identity",
+    shift: float = 0.0,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    torch._check(x.dtype == torch.float32, lambda: f"Expected `float32` input, got `{x.dtype}`")
+    return x.new_empty(1), x.new_empty(1)
+
+
+@reduce_sum_max_op.register_kernel("cpu")
+def _(
+    x: torch.Tensor,
+    deterministic: bool = False,
+    transform: str = "identity",
+    shift: float = 0.0,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    assert x.dtype == torch.float32
+    if transform not in host_transform_map:
+        raise RuntimeError(f"Custom transforms only run on CUDA, got `{transform}` for a CPU tensor")
+    x = host_transform_map[transform](x, shift)
+    y0 = x.sum().reshape(1)
+    y1 = x.max().reshape(1) if x.numel() > 0 else torch.full((1,), -float("inf"), dtype=x.dtype)
+    return y0, y1
+
+
+@torch.library.custom_op("copyan::naive_scan", mutates_args=(), device_types="cuda")
+def naive_scan_op(x: torch.Tensor) -> torch.Tensor:
+    y = torch.empty_like(x)
+    naive_scan(x, y, stream=torch.cuda.current_stream(x.device))
+    return y
+
+
+@naive_scan_op.register_fake
+def _(x: torch.Tensor) -> torch.Tensor:
+    torch._check(x.dtype == torch.float32, lambda: f"Expected `float32` input, got `{x.dtype}`")
+    torch._check(x.dim() >= 1, lambda: "Scans need at least one dim")
+    return torch.empty_like(x)
+
+
+@naive_scan_op.register_kernel("cpu")
+def _(x: torch.Tensor) -> torch.Tensor:
+    assert x.dtype == torch.float32 and x.dim() >= 1
+    # Same strides as the device kernel output
+    return torch.cumsum(x, -1, out=torch.empty_like(x))
+
@@ -0,0 +1,104 @@
+import functools
+import torch
+from typing import Any, Dict, List, Optional, Tuple
+
+# Limits of an SM 8.9 device, used when no GPU is present
+default_device_limits = {
+    "warp_size": 32,
+    "max_threads_per_sm": 1536,
+    "max_blocks_per_sm": 24,
+    "regs_per_sm": 65536,
+    "reg_alloc_unit": 256,
+    "smem_per_sm": 100 * 1024,
+    "smem_reserved_per_block": 1024,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_device_limits() -> Dict[str, int]:
+    limits = dict(default_device_limits)
+    if torch.cuda.is_available():
+        props = torch.cuda.get_device_properties(torch.cuda.current_device())
+        limits["warp_size"] = props.warp_size
+        limits["max_threads_per_sm"] = props.max_threads_per_multi_processor
+        limits["regs_per_sm"] = getattr(props, "regs_per_multiprocessor", limits["regs_per_sm"])
+        limits["smem_per_sm"] = getattr(
+            props, "shared_memory_per_multiprocessor", limits["smem_per_sm"]
+        )
+    return limits
+
+
+def estimate_occupancy(
+    resources: Dict[str, Any], block_size: int, limits: Dict[str, int] = None
+) -> float:
+    # Theoretical occupancy as the ratio of resident warps to the SM maximum
+    limits = default_device_limits if limits is None else limits
+    warp_size = limits["warp_size"]
+    max_warps = limits["max_threads_per_sm"] // warp_size
+    warps_per_block = (block_size + warp_size - 1) // warp_size
+
+    num_blocks = min(limits["max_blocks_per_sm"], max_warps // warps_per_block)
+    if resources["registers"] > 0:
+        unit = limits["reg_alloc_unit"]
+        regs_per_warp = (resources["registers"] * warp_size + unit - 1) // unit * unit
+        num_blocks = min(
+            num_blocks, limits["regs_per_sm"] // (regs_per_warp * warps_per_block)
+        )
+    if resources["smem"] > 0:
+        smem_per_block = resources["smem"] + limits["smem_reserved_per_block"]
+        num_blocks = min(num_blocks, limits["smem_per_sm"] // smem_per_block)
+    return num_blocks * warps_per_block / max_warps
+
+
+class ResourcePolicy:
+    # Judge candidates from their ptxas reports, before any benchmarking
+    def __init__(
+        self,
+        min_occupancy: float = 0.125,
+        max_spill_bytes: int = 128,
+        top_k: Optional[int] = None,
+        block_size_key: str = "BLOCK_SIZE",
+    ) -> None:
+        # With `top_k`, all candidates are compiled and only the best ranked ones are benchmarked
+        self.min_occupancy = min_occupancy
+        self.max_spill_bytes = max_spill_bytes
+        self.top_k = top_k
+        self.block_size_key = block_size_key
+
+    def assess(
+        self,
+        resources: Dict[str, Dict[str, Any]],
+        tuned_keys: Dict[str, Any],
+        limits: Dict[str, int] = None,
+    ) -> Tuple[bool, float]:
+        # Returns whether the candidate is hopeless, and a score (higher is better) from its worst kernel
+        block_size = tuned_keys.get(self.block_size_key)
+        hopeless, score = False, 1.0
+        for kernel in resources.values():
+            spill_bytes = kernel["spill_stores"] + kernel["spill_loads"]
+            occupancy = (
+                estimate_occupancy(kernel, block_size, limits)
+                if block_size is not None
+                else 1.0
+            )
+            hopeless |= spill_bytes > self.max_spill_bytes or occupancy < self.min_occupancy
+            # Spills cost a full occupancy step per 1 KiB of local memory traffic
+            score = min(score, occupancy - spill_bytes / 1024)
+        return hopeless, score
+
+    def rank(
+        self,
+        candidates: List[Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]],
+        limits: Dict[str, int] = None,
+        keys: Dict[str, Any] = None,
+    ) -> List[Dict[str, Any]]:
+        # Order `(tuned_keys, resources)` pairs by score, dropping hopeless ones and keeping `top_k`
+        # NOTES: `keys` are the fixed keys shared by all candidates
+        keys = {} if keys is None else keys
+        assessed = []
+        for index, (tuned_keys, resources) in enumerate(candidates):
+            hopeless, score = self.assess(resources, {**keys, **tuned_keys}, limits)
+            if not hopeless:
+                assessed.append((-score, index, tuned_keys))
+        ranked = [tuned_keys for _, _, tuned_keys in sorted(assessed)]
+        return ranked if self.top_k is None else ranked[: self.top_k]
@@ -0,0 +1,122 @@
+import torch
+from typing import Optional, Tuple, Union
+
+from .search import SearchStrategy
+from .space import as_space, Space, smem_limit
+from .tuner import jit_tuner
+
+includes = ('"scan/radix_sort.cuh"',)
+template = """
+// Templated args from Python JIT call
+__return_code = radix_sort_c<{T}, {DESCENDING}, {HAS_VALUES}, {BLOCK_SIZE}, {ITEMS_PER_THREAD}, {DIGIT_BITS}>(K, V, N, K_OUT, V_OUT, reinterpret_cast<uint32_t *>(W), W_SIZE);
+"""
+
+# The scatter pass keeps a counter per digit and thread in shared memory
+default_space = Space(
+    BLOCK_SIZE=(128, 256),
+    ITEMS_PER_THREAD=(4, 8, 16),
+    DIGIT_BITS=(4, 5, 6),
+).where(smem_limit("(1 << DIGIT_BITS) * (BLOCK_SIZE + 2) * 4"))
+
+typename_map = {torch.float: "float", torch.int: "int"}
+
+
+def get_workspace_size(N: int, space: Union[Space, tuple] = None) -> int:
+    # `int32` elements: alternate keys and values, then the per-tile digit counts, their offsets and the scan tile sums
+    # NOTES: constraints are ignored, the smallest tile and widest digit give an upper bound for any config of the space
+    axes = as_space(default_space if space is None else space).axes
+    min_tile = min(axes.get("BLOCK_SIZE", (256,))) * min(axes.get("ITEMS_PER_THREAD", (8,)))
+    n_counts = (1 << max(axes.get("DIGIT_BITS", (4,)))) * ((N + min_tile - 1) // min_tile)
+    return 2 * N + 2 * n_counts + (n_counts + min_tile - 1) // min_tile
+
+
+def radix_sort(
+    keys: torch.Tensor,
+    values: torch.Tensor = None,
+    descending: bool = False,
+    space: Union[Space, tuple] = None,
+    strategy: SearchStrategy = None,
+) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+    # Stable sort of 1-D `float32`/`int32` keys, with optional `int32` payloads (e.g. indices from `torch.arange`)
+    # Returns the sorted keys and payloads, the inputs are left untouched
+    # NOTES: NaNs are ordered by their bits, not all last like `torch.sort`
+    N = keys.numel()
+    assert keys.dtype in typename_map and keys.is_contiguous()
+    has_values = values is not None
+    if has_values:
+        assert values.dtype == torch.int and values.is_contiguous() and values.numel() == N
+    else:
+        values = torch.empty(0, dtype=torch.int, device=keys.device)
+
+    keys_out = torch.empty_like(keys)
+    values_out = torch.empty_like(values)
+    workspace = torch.empty(get_workspace_size(N, space), dtype=torch.int, device=keys.device)
+    args = (keys, values, N, keys_out, values_out, workspace, workspace.numel())
+    runtime = jit_tuner.compile_and_tune(
+        name="radix_sort",
+        keys={
+            "T": typename_map[keys.dtype],
+            "DESCENDING": "true" if descending else "false",
+            "HAS_VALUES": "true" if has_values else "false",
+            # Tune once per power-of-two bucket of sizes
+            "N_BUCKET": 1 << max(N - 1, 0).bit_length(),
+        },
+        space=default_space if space is None else space,
+        includes=includes,
+        arg_defs=(
+            ("K", keys.dtype),
+            ("V", torch.int),
+            ("N", int),
+            ("K_OUT", keys.dtype),
+            ("V_OUT", torch.int),
+            ("W", torch.int),
+            ("W_SIZE", int),
+        ),
+        template=template,
+        args=args,
+        strategy=strategy,
+    )
+    assert runtime(*args) == 0
+    return keys_out, values_out if has_values else None
+
+
+def get_radix_bits(keys: torch.Tensor, descending: bool = False) -> torch.Tensor:
+    # The order-preserving unsigned mapping of the kernels, as `int64`
+    bits = keys.cpu().contiguous().view(torch.int32).long() & 0xFFFFFFFF
+    if keys.dtype == torch.float:
+        bits = torch.where(bits >= (1 << 31), bits ^ 0xFFFFFFFF, bits ^ 0x80000000)
+    else:
+        bits = bits ^ 0x80000000
+    return bits ^ 0xFFFFFFFF if descending else bits
+
+
+def radix_sort_reference(
+    keys: torch.Tensor, values: torch.Tensor = None, descending: bool = False
+) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+    order = torch.argsort(get_radix_bits(keys, descending), stable=True)
+    keys = keys.cpu()[order]
+    return keys, values.cpu()[order] if values is not None else None
+
+
+def accuracy_test():
+    torch.manual_seed(45)
+    for N in (1, 1000, 1024 * 4096 + 5):
+        for keys in (
+            torch.randn(N, dtype=torch.float, device="cuda"),
+            torch.randint(-1000, 1000, (N,), dtype=torch.int, device="cuda"),
+        ):
+            values = torch.arange(N, dtype=torch.int, device="cuda")
+            for descending in (False, True):
+                sorted_keys, sorted_values = radix_sort(keys, values, descending)
+                ref_keys, ref_values = radix_sort_reference(keys, values, descending)
+                assert torch.equal(sorted_keys.cpu(), ref_keys)
+                assert torch.equal(sorted_values.cpu(), ref_values)
+
+            sorted_keys, _ = radix_sort(keys)
+            assert torch.equal(sorted_keys.cpu(), torch.sort(keys.cpu(), stable=True).values)
+
+    print("Test passed!")
+
+
+if __name__ == "__main__":
+    accuracy_test()
@@ -1,46 +1,227 @@
 import torch
+from typing import Callable, Union
+
+from ..jit import Layout, PreparedRuntime, Runtime
+from .search import SearchStrategy
+from .space import as_space, Space
 from .tuner import jit_tuner
 
 includes = ('"reduce/reduce.cuh"',)
 template = """
 // Templated args from Python JIT call
-//reduce_sum_c(X, y0, N);
-//reduce_max_c(X, y1, N);
-reduce_sum_c<float, {BLOCK_SIZE}, {ITEMS_PER_THREAD}>(X, y0, N);
-reduce_max_c<float, {BLOCK_SIZE}, {ITEMS_PER_THREAD}>(X, y1, N);
+// The workspace is split in halves for the sum and the max partials
+const int half_workspace_size = W_SIZE / 2;
+const auto transform = {TRANSFORM};
+__return_code = reduce_sum_c<float, {BLOCK_SIZE}, {ITEMS_PER_THREAD}, ReduceMode::{REDUCE_MODE}>(X, y0, N, W, half_workspace_size, STREAM, transform);
+if (__return_code == 0)
+    __return_code = reduce_max_c<float, {BLOCK_SIZE}, {ITEMS_PER_THREAD}, ReduceMode::{REDUCE_MODE}>(X, y1, N, W + half_workspace_size, half_workspace_size, STREAM, transform);
+"""
+
+# Any layout of up to `MAX_DIMS` dims, e.g. slices, column-major or broadcast views, read in place
+strided_template = """
+// Templated args from Python JIT call
+const int half_workspace_size = W_SIZE / 2;
+const auto transform = {TRANSFORM};
+__return_code = strided_reduce_sum_c<float, {BLOCK_SIZE}, {ITEMS_PER_THREAD}, ReduceMode::{REDUCE_MODE}>(X, X_LAYOUT, y0, W, half_workspace_size, STREAM, transform);
+if (__return_code == 0)
+    __return_code = strided_reduce_max_c<float, {BLOCK_SIZE}, {ITEMS_PER_THREAD}, ReduceMode::{REDUCE_MODE}>(X, X_LAYOUT, y1, W + half_workspace_size, half_workspace_size, STREAM, transform);
 """
 
+# Elementwise prologues fused into the loads, `SHIFT` is a runtime argument
+transform_map = {
+    "identity": "IdentityOp()",
+    "square": "SquareOp()",
+    "abs": "AbsOp()",
+    "exp": "ExpShiftOp{SHIFT}",
+}
+
+
+arg_defs = (
+    ("X", torch.float),
+    ("y0", torch.float),
+    ("y1", torch.float),
+    ("N", int),
+    ("W", torch.float),
+    ("W_SIZE", int),
+    ("SHIFT", float),
+    ("STREAM", torch.cuda.Stream),
+)
+
+strided_arg_defs = (
+    ("X", torch.float),
+    ("X_LAYOUT", Layout),
+    ("y0", torch.float),
+    ("y1", torch.float),
+    ("N", int),
+    ("W", torch.float),
+    ("W_SIZE", int),
+    ("SHIFT", float),
+    ("STREAM", torch.cuda.Stream),
+)
+
+default_space = (dict(BLOCK_SIZE=1024, ITEMS_PER_THREAD=16),)
+
+
+def get_min_tile(space: Union[Space, tuple] = None) -> int:
+    # Constraints are ignored, the smallest values of each axis give a lower bound
+    if space is None:
+        return default_min_tile
+    axes = as_space(space).axes
+    return min(axes.get("BLOCK_SIZE", (1024,))) * min(axes.get("ITEMS_PER_THREAD", (16,)))
+
+
+default_min_tile = get_min_tile(default_space)
+
+
+def get_workspace_size(
+    N: int, space: Union[Space, tuple] = None, min_tile: int = None
+) -> int:
+    # Elements of the `Tree` mode workspace, enough for any config of the space
+    # NOTES: `Atomic` mode does not touch the workspace
+    min_tile = get_min_tile(space) if min_tile is None else min_tile
+    n_vector_loads = (N + 3) // 4
+    return 2 * max(1, (n_vector_loads + min_tile - 1) // min_tile)
+
+
+def get_transform(transform: str = None) -> str:
+    # A builtin name, or a C++ expression of `float x` (and `SHIFT`), e.g. `"x * x + 1.0f"`
+    # NOTES: custom expressions become extended lambdas, and part of the cache signature
+    if transform is None:
+        return transform_map["identity"]
+    if transform in transform_map:
+        return transform_map[transform]
+    return f"[=] __device__ (float x) {{ return static_cast<float>({transform}); }}"
+
+
+def get_runtime(
+    args: tuple,
+    space: Union[Space, tuple] = None,
+    keys: dict = None,
+    strategy: SearchStrategy = None,
+    strided: bool = False,
+) -> Runtime:
+    # `Atomic` is the default mode, spaces may add `REDUCE_MODE="Tree"` candidates
+    keys = {
+        "REDUCE_MODE": "Atomic",
+        "TRANSFORM": transform_map["identity"],
+        **({} if keys is None else keys),
+    }
+    space = default_space if space is None else space
+    if keys["REDUCE_MODE"] == "Tree":
+        space = as_space(space).where(lambda names: names["REDUCE_MODE"] == "Tree")
+    return jit_tuner.compile_and_tune(
+        name="strided reduce sum & max" if strided else "reduce sum & max",
+        keys=keys,
+        space=space,
+        includes=includes,
+        arg_defs=strided_arg_defs if strided else arg_defs,
+        template=strided_template if strided else template,
+        args=args,
+        strategy=strategy,
+    )
+
 
 def reduce_sum_max(
-    x: torch.Tensor, y0: torch.Tensor, y1: torch.Tensor, space: tuple = None
+    x: torch.Tensor,
+    y0: torch.Tensor,
+    y1: torch.Tensor,
+    space: Union[Space, tuple] = None,
+    strategy: SearchStrategy = None,
+    deterministic: bool = False,
+    transform: str = None,
+    shift: float = 0.0,
+    stream: torch.cuda.Stream = None,
 ) -> None:
-    N = x.shape[0]
+    # With `deterministic`, only `Tree` mode is used: results are bitwise reproducible,
+    # and `y0`/`y1` need no initialisation. Otherwise they must hold 0 and -inf (or any lower bound)
+    # `transform` is applied to every element before both reductions, see `get_transform`
+    # Kernels are launched on `stream`, or the default stream
+    # `x` may have any shape and strides: views which vector loads cannot read are walked through their layout
+    N = x.numel()
     assert (
         x.dtype == torch.float32
         and y0.dtype == torch.float32
         and y1.dtype == torch.float32
     )
 
-    global includes, template
-    if space is None:
-        space = (dict(BLOCK_SIZE=1024, ITEMS_PER_THREAD=16),)
-    args = (x, y0, y1, N)
-    runtime = jit_tuner.compile_and_tune(
-        name="reduce sum & max",
-        keys={},
-        space=space,
-        includes=includes,
-        arg_defs=(
-            ("X", torch.float),
-            ("y0", torch.float),
-            ("y1", torch.float),
-            ("N", int),
-        ),
-        template=template,
-        args=args,
-    )
+    space = default_space if space is None else space
+    keys = {"TRANSFORM": get_transform(transform)}
+    if deterministic:
+        keys["REDUCE_MODE"] = "Tree"
+    tunable = len(as_space(space)) > 1
+    if tunable:
+        # Tune once per power-of-two bucket of sizes, the best mode moves with `N`
+        keys["N_BUCKET"] = 1 << max(N - 1, 0).bit_length()
+
+    # `Atomic` mode never reads the workspace, so it gets a null one
+    if deterministic or "Tree" in as_space(space).axes.get("REDUCE_MODE", ()):
+        workspace = torch.empty(get_workspace_size(N, space), dtype=x.dtype, device=x.device)
+    else:
+        workspace = torch.empty(0, dtype=x.dtype, device=x.device)
+
+    # NOTES: the order of a reduction is free, so dims of strided views are sorted by stride and merged
+    strided = not is_vector_loadable(x)
+    head = (x, Layout.of(x, coalesce=True)) if strided else (x,)
+    tail = (N, workspace, workspace.numel(), float(shift), stream)
+
+    # `Atomic` candidates accumulate into their outputs while benchmarking, so tuning runs on scratch ones
+    tuning_outputs = (y0.clone(), y1.clone()) if tunable else (y0, y1)
+    runtime = get_runtime((*head, *tuning_outputs, *tail), space, keys, strategy, strided=strided)
+    assert runtime(*head, y0, y1, *tail) == 0
+
 
-    runtime(*args)
+def is_vector_loadable(x: torch.Tensor) -> bool:
+    return x.is_contiguous() and x.numel() % 4 == 0 and x.data_ptr() % 16 == 0
+
+
+def prepare(
+    dtype: torch.dtype = torch.float,
+    N_bucket: int = None,
+    space: Union[Space, tuple] = None,
+    strategy: SearchStrategy = None,
+    deterministic: bool = False,
+    transform: str = None,
+) -> Callable[..., None]:
+    # Tune once for the size bucket, and return a launcher without any per-call lookups
+    # NOTES: the launcher does not validate its inputs, except that vector loads can read `x`
+    # (strided views go through `reduce_sum_max`)
+    assert dtype == torch.float32
+    args, keys = (), {"TRANSFORM": get_transform(transform)}
+    if deterministic:
+        keys["REDUCE_MODE"] = "Tree"
+    if N_bucket is not None:
+        x = torch.randn(N_bucket, dtype=dtype, device="cuda")
+        y0 = torch.zeros(1, dtype=dtype, device="cuda")
+        y1 = torch.full((1,), -float("inf"), dtype=dtype, device="cuda")
+        workspace = torch.empty(get_workspace_size(N_bucket, space), dtype=dtype, device="cuda")
+        args = (x, y0, y1, N_bucket, workspace, workspace.numel(), 0.0, None)
+        keys["N_BUCKET"] = N_bucket
+    else:
+        assert space is None or len(space) <= 1, "Tuning requires `N_bucket`"
+    launch = PreparedRuntime(get_runtime(args, space, keys, strategy))
+
+    # The workspace is reused across calls, and only grows
+    min_tile = get_min_tile(space)
+    workspace = [torch.empty(0, dtype=dtype)]
+
+    def prepared_reduce_sum_max(
+        x: torch.Tensor,
+        y0: torch.Tensor,
+        y1: torch.Tensor,
+        shift: float = 0.0,
+        stream: torch.cuda.Stream = None,
+    ) -> None:
+        assert is_vector_loadable(x), "Prepared reductions need contiguous, 16-byte aligned inputs of 4k elements"
+        N = x.numel()
+        workspace_size = get_workspace_size(N, min_tile=min_tile)
+        if workspace[0].numel() < workspace_size or workspace[0].device != x.device:
+            workspace[0] = torch.empty(workspace_size, dtype=dtype, device=x.device)
+        launch(x, y0, y1, N, workspace[0], workspace[0].numel(), shift, stream)
+
+    return prepared_reduce_sum_max
+
+
+reduce_sum_max.prepare = prepare
 
 
 def accuracy_test():
@@ -49,7 +230,7 @@ def accuracy_test():
         N = 4096 * 1024
         x = torch.randn(N, dtype=torch.float, device="cuda")
         y0 = torch.zeros(1, dtype=torch.float, device="cuda")
-        y1 = torch.zeros(1, dtype=torch.float, device="cuda")
+        y1 = torch.full((1,), -float("inf"), dtype=torch.float, device="cuda")
 
         reduce_sum_max(x, y0, y1)
 
@@ -58,6 +239,43 @@ def accuracy_test():
         print(f"{'my reduce max':<14} = {y1.item():.4f}")
         print(f"{'pytorch max':<14} = {torch.max(x).item():.4f}")
 
+        # `Tree` mode needs no initialisation, and is bitwise reproducible
+        x = -x.abs()
+        results = []
+        for _ in range(2):
+            y0 = torch.empty(1, dtype=torch.float, device="cuda")
+            y1 = torch.empty(1, dtype=torch.float, device="cuda")
+            reduce_sum_max(x, y0, y1, deterministic=True)
+            results.append((y0.item(), y1.item()))
+        assert results[0] == results[1], results
+        assert abs(results[0][0] - torch.sum(x).item()) < 1e-3 * abs(torch.sum(x).item())
+        assert results[0][1] == torch.max(x).item()
+
+        # Fused prologues need no intermediate tensor
+        x = torch.randn(N, dtype=torch.float, device="cuda")
+        for transform, shift, expected in (
+            ("square", 0.0, x * x),
+            ("abs", 0.0, x.abs()),
+            ("exp", x.max().item(), torch.exp(x - x.max())),
+            ("x * x + 1.0f", 0.0, x * x + 1),
+        ):
+            y0 = torch.empty(1, dtype=torch.float, device="cuda")
+            y1 = torch.empty(1, dtype=torch.float, device="cuda")
+            reduce_sum_max(x, y0, y1, deterministic=True, transform=transform, shift=shift)
+            assert abs(y0.item() - expected.sum().item()) < 1e-4 * abs(expected.sum().item()), transform
+            assert abs(y1.item() - expected.max().item()) < 1e-5 * abs(expected.max().item()), transform
+
+        # Strided views are reduced in place
+        buffer = torch.randn(2048, 4096, dtype=torch.float, device="cuda")
+        for view in (buffer[1:, 3:], buffer.t(), buffer[::2, ::3], buffer[5], buffer[:, 7], buffer[0, :1001]):
+            for deterministic in (False, True):
+                y0 = torch.zeros(1, dtype=torch.float, device="cuda")
+                y1 = torch.full((1,), -float("inf"), dtype=torch.float, device="cuda")
+                reduce_sum_max(view, y0, y1, deterministic=deterministic)
+                expected = view.double().sum().item()
+                assert abs(y0.item() - expected) < 1e-4 * view.abs().sum().item(), view.stride()
+                assert y1.item() == view.max().item(), view.stride()
+
         print("Test passed!")
 
 
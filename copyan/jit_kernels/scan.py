@@ -1,4 +1,7 @@
 import torch
+from typing import Callable
+
+from ..jit import Layout, PreparedRuntime, Runtime
 from .tuner import jit_tuner
 
 includes = ('"scan/naive_scan.cuh"',)
@@ -6,29 +9,96 @@ template = """
 // Templated args from Python JIT call
 constexpr auto BLOCK_SIZE = {BLOCK_SIZE};
 
-naive_scan_c<BLOCK_SIZE>(X, Y, N);
+naive_scan_c<BLOCK_SIZE>(X, Y, N, STREAM);
+__return_code = static_cast<int>(cudaGetLastError());
 """
 
+# The single-pass 1-D kernel only handles multiples of 4M elements, other lengths take the strided kernel
+scan_granularity = 1024 * 4 * 1024
 
-def naive_scan(x: torch.Tensor, y: torch.Tensor) -> None:
-    N = x.shape[0]
-    assert N == y.shape[0]
-    assert x.dtype == torch.float32 and y.dtype == torch.float32
+strided_includes = ('"scan/strided_scan.cuh"',)
+strided_template = """
+// Templated args from Python JIT call
+__return_code = strided_scan_c<{BLOCK_SIZE}, {ITEMS_PER_THREAD}>(X, X_LAYOUT, Y, Y_LAYOUT, STREAM);
+"""
+
+
+arg_defs = (
+    ("X", torch.float),
+    ("Y", torch.float),
+    ("N", int),
+    ("STREAM", torch.cuda.Stream),
+)
 
-    global includes, template
+strided_arg_defs = (
+    ("X", torch.float),
+    ("X_LAYOUT", Layout),
+    ("Y", torch.float),
+    ("Y_LAYOUT", Layout),
+    ("N", int),
+    ("STREAM", torch.cuda.Stream),
+)
 
-    args = (x, y, N)
-    runtime = jit_tuner.compile_and_tune(
+
+def get_runtime(args: tuple) -> Runtime:
+    return jit_tuner.compile_and_tune(
         name="naive_scan",
         keys={"BLOCK_SIZE": 1024},
         space=(),
         includes=includes,
-        arg_defs=(("X", torch.float), ("Y", torch.float), ("N", int)),
+        arg_defs=arg_defs,
         template=template,
         args=args,
     )
 
-    runtime(*args)
+
+def get_strided_runtime(args: tuple) -> Runtime:
+    return jit_tuner.compile_and_tune(
+        name="strided_scan",
+        keys={"BLOCK_SIZE": 256, "ITEMS_PER_THREAD": 4},
+        space=(),
+        includes=strided_includes,
+        arg_defs=strided_arg_defs,
+        template=strided_template,
+        args=args,
+    )
+
+
+def naive_scan(
+    x: torch.Tensor, y: torch.Tensor, stream: torch.cuda.Stream = None
+) -> None:
+    # Kernels are launched on `stream`, or the default stream
+    # Strided or N-D views are scanned in place along their last dim, e.g. `x.movedim(dim, -1)` for another dim
+    assert x.shape == y.shape
+    assert x.dtype == torch.float32 and y.dtype == torch.float32
+
+    if x.numel() == 0:
+        return
+    if x.dim() == 1 and x.is_contiguous() and y.is_contiguous() and x.shape[0] % scan_granularity == 0:
+        args = (x, y, x.shape[0], stream)
+        assert get_runtime(args)(*args) == 0
+    else:
+        # NOTES: one block per row, long single rows are bound by a single SM
+        args = (x, Layout.of(x), y, Layout.of(y, writable=True), x.numel(), stream)
+        assert get_strided_runtime(args)(*args) == 0
+
+
+def prepare(
+    dtype: torch.dtype = torch.float,
+) -> Callable[..., None]:
+    # NOTES: the launcher does not validate its inputs, which must be 1-D multiples of `scan_granularity`
+    assert dtype == torch.float32
+    launch = PreparedRuntime(get_runtime(args=()))
+
+    def prepared_naive_scan(
+        x: torch.Tensor, y: torch.Tensor, stream: torch.cuda.Stream = None
+    ) -> None:
+        launch(x, y, x.shape[0], stream)
+
+    return prepared_naive_scan
+
+
+naive_scan.prepare = prepare
 
 
 def accuracy_test():
@@ -40,6 +110,15 @@ def accuracy_test():
 
         naive_scan(x, y)
 
+        # Rows, columns and slices of a row-major buffer, written into strided outputs
+        buffer = torch.randn(512, 3000, dtype=torch.float, device="cuda")
+        for view in (buffer[:, 1:], buffer.t(), buffer[3, ::2], buffer[:, 11]):
+            out = torch.empty(view.shape[::-1], dtype=torch.float, device="cuda").t() if view.dim() == 2 else None
+            out = torch.empty(2 * view.numel(), dtype=torch.float, device="cuda")[::2] if out is None else out
+            naive_scan(view, out)
+            expected = torch.cumsum(view.double(), -1)
+            assert torch.allclose(out.double(), expected, atol=1e-3 * view.shape[-1] ** 0.5)
+
         print("Test passed!")
 
 
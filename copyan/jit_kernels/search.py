@@ -0,0 +1,106 @@
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Returns the cost of a config, or `None` for illegal ones
+CostFunction = Callable[[Dict[str, Any]], Optional[float]]
+
+
+def config_key(config: Dict[str, Any]) -> tuple:
+    return tuple(sorted(config.items()))
+
+
+class SearchStrategy:
+    # NOTES: `points` are the valid configs in a stable order, strategies only pick which ones to evaluate
+    def search(
+        self, points: List[Dict[str, Any]], cost_fn: CostFunction
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+        raise NotImplementedError
+
+
+class Evaluator:
+    # Memoize costs and track the best config seen so far
+    def __init__(self, cost_fn: CostFunction, budget: Optional[int] = None) -> None:
+        self.cost_fn = cost_fn
+        self.budget = budget
+        self.costs = {}
+        self.best_config, self.best_cost = None, None
+
+    def exhausted(self) -> bool:
+        return self.budget is not None and len(self.costs) >= self.budget
+
+    def __call__(self, config: Dict[str, Any]) -> Optional[float]:
+        key = config_key(config)
+        if key in self.costs:
+            return self.costs[key]
+        if self.exhausted():
+            return None
+
+        cost = self.cost_fn(config)
+        self.costs[key] = cost
+        if cost is not None and (self.best_cost is None or cost < self.best_cost):
+            self.best_config, self.best_cost = config, cost
+        return cost
+
+
+class Exhaustive(SearchStrategy):
+    def search(self, points, cost_fn):
+        evaluate = Evaluator(cost_fn)
+        for config in points:
+            evaluate(config)
+        return evaluate.best_config, evaluate.best_cost
+
+
+class RandomSearch(SearchStrategy):
+    def __init__(self, budget: int, seed: int = 0) -> None:
+        assert budget > 0
+        self.budget = budget
+        self.seed = seed
+
+    def search(self, points, cost_fn):
+        evaluate = Evaluator(cost_fn, self.budget)
+        sampled = random.Random(self.seed).sample(points, min(self.budget, len(points)))
+        for config in sampled:
+            evaluate(config)
+        return evaluate.best_config, evaluate.best_cost
+
+
+class CoordinateDescent(SearchStrategy):
+    # Greedily sweep one key at a time, keeping the others fixed, until no sweep improves
+    def __init__(self, budget: Optional[int] = None, start: Dict[str, Any] = None) -> None:
+        self.budget = budget
+        self.start = start
+
+    def search(self, points, cost_fn):
+        evaluate = Evaluator(cost_fn, self.budget)
+        valid = {config_key(config): config for config in points}
+        keys = []
+        for config in points:
+            keys += [key for key in config.keys() if key not in keys]
+
+        # Start from the first legal config
+        current, current_cost = None, None
+        candidates = points if self.start is None else [self.start, *points]
+        for config in candidates:
+            if config_key(config) not in valid or evaluate.exhausted():
+                continue
+            current_cost = evaluate(config)
+            if current_cost is not None:
+                current = config
+                break
+
+        improved = current is not None
+        while improved and not evaluate.exhausted():
+            improved = False
+            for key in keys:
+                for config in points:
+                    # Neighbours only differ in `key`
+                    if config.get(key) == current.get(key) or any(
+                        config.get(other) != current.get(other)
+                        for other in keys
+                        if other != key
+                    ):
+                        continue
+                    cost = evaluate(config)
+                    if cost is not None and cost < current_cost:
+                        current, current_cost, improved = config, cost, True
+        return evaluate.best_config, evaluate.best_cost
@@ -0,0 +1,87 @@
+import itertools
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Union
+
+# A constraint is either a Python expression over the keys (and context), or a predicate on a dict of them
+Constraint = Union[str, Callable[[Dict[str, Any]], bool]]
+
+
+def compile_constraint(constraint: Constraint) -> Callable[[Dict[str, Any]], bool]:
+    if callable(constraint):
+        return constraint
+    assert isinstance(constraint, str)
+    code = compile(constraint, f"<constraint {constraint}>", "eval")
+    return lambda names: bool(eval(code, {"__builtins__": {}}, names))
+
+
+def warp_multiple(key: str = "BLOCK_SIZE", warp_size: int = 32) -> Constraint:
+    return lambda names: names[key] % warp_size == 0
+
+
+def smem_limit(smem_bytes: Constraint, limit: int = 48 * 1024) -> Constraint:
+    # `smem_bytes` is an expression or a function giving the shared memory usage of a config
+    if isinstance(smem_bytes, str):
+        code = compile(smem_bytes, f"<smem {smem_bytes}>", "eval")
+        smem_bytes = lambda names: eval(code, {"__builtins__": {}}, names)
+    return lambda names: smem_bytes(names) <= limit
+
+
+class Space:
+    def __init__(self, **axes: Iterable[Any]) -> None:
+        self.axes = {key: tuple(values) for key, values in axes.items()}
+        self.configs = None
+        self.constraints = ()
+
+    @staticmethod
+    def from_configs(configs: Iterable[Dict[str, Any]]) -> "Space":
+        # An explicit list of configs, e.g. the legacy tuple-of-dicts spaces
+        configs = tuple(configs)
+        assert all(isinstance(config, dict) for config in configs)
+        axes = {}
+        for config in configs:
+            for key, value in config.items():
+                axes.setdefault(key, [])
+                if value not in axes[key]:
+                    axes[key].append(value)
+        space = Space(**axes)
+        space.configs = configs
+        return space
+
+    def where(self, *constraints: Constraint) -> "Space":
+        space = Space(**self.axes)
+        space.configs = self.configs
+        space.constraints = self.constraints + tuple(
+            compile_constraint(constraint) for constraint in constraints
+        )
+        return space
+
+    def is_valid(self, config: Dict[str, Any], **context) -> bool:
+        names = {**context, **config}
+        return all(constraint(names) for constraint in self.constraints)
+
+    def points(self, **context) -> List[Dict[str, Any]]:
+        if self.configs is not None:
+            candidates = self.configs
+        else:
+            keys = tuple(self.axes.keys())
+            candidates = (
+                dict(zip(keys, values))
+                for values in itertools.product(*self.axes.values())
+            )
+        return [config for config in candidates if self.is_valid(config, **context)]
+
+    def __len__(self) -> int:
+        if self.configs is not None:
+            return len(self.configs)
+        size = 1
+        for values in self.axes.values():
+            size *= len(values)
+        return size
+
+    def __repr__(self) -> str:
+        return f"Space({self.axes}, constraints={len(self.constraints)})"
+
+
+def as_space(space: Union[Space, Tuple[Dict[str, Any], ...]]) -> Space:
+    if isinstance(space, Space):
+        return space
+    return Space.from_configs(space if len(space) > 0 else (dict(),))
@@ -0,0 +1,275 @@
+import contextlib
+import torch
+from typing import Any, Iterable, Iterator, Optional, Tuple, Union
+
+from .reduce import reduce_sum_max
+from .scan import naive_scan, scan_granularity
+
+# Partial chunks are zero-padded on the device, so that every chunk takes the 1-D `naive_scan` kernel
+default_chunk_size = 4 * scan_granularity
+
+# A 1-D CPU tensor, a 1-D NumPy array (e.g. a `np.memmap` column), or an iterable of those
+Source = Union[torch.Tensor, Any, Iterable[Any]]
+
+
+def is_array(source: Any) -> bool:
+    return isinstance(source, torch.Tensor) or hasattr(source, "__array_interface__")
+
+
+def iter_chunks(source: Source, chunk_size: int) -> Iterator[Any]:
+    # Slices of at most `chunk_size` elements, nothing is read before staging
+    for part in (source,) if is_array(source) else source:
+        assert part.ndim == 1, "Streaming inputs must be 1-D"
+        for start in range(0, part.shape[0], chunk_size):
+            yield part[start : start + chunk_size]
+
+
+def copy_into(buffer: torch.Tensor, chunk: Any) -> int:
+    n = chunk.shape[0]
+    if isinstance(chunk, torch.Tensor):
+        buffer[:n].copy_(chunk)
+    else:
+        # NumPy casts and gathers strided columns straight into the staging buffer
+        buffer[:n].numpy()[:] = chunk
+    return n
+
+
+def copy_from(out: Any, start: int, chunk: torch.Tensor) -> None:
+    n = chunk.shape[0]
+    if isinstance(out, torch.Tensor):
+        out[start : start + n].copy_(chunk)
+    else:
+        out[start : start + n] = chunk.numpy()
+
+
+class HostBackend:
+    # The same pipeline, run synchronously with PyTorch CPU ops
+    def __init__(self, chunk_size: int, with_outputs: bool) -> None:
+        self.device = torch.device("cpu")
+        self.chunk_size = chunk_size
+        self.inputs = [torch.empty(chunk_size, dtype=torch.float) for _ in range(2)]
+        self.host_inputs = self.inputs
+        if with_outputs:
+            self.outputs = [torch.empty(chunk_size, dtype=torch.float) for _ in range(2)]
+
+    def stage(self, slot: int, chunk: Any) -> int:
+        return copy_into(self.inputs[slot], chunk)
+
+    @contextlib.contextmanager
+    def compute(self, slot: int) -> Iterator[None]:
+        yield None
+
+    def reduce_sum_max(
+        self, slot: int, n: int, y0: torch.Tensor, y1: torch.Tensor, stream: None
+    ) -> None:
+        x = self.inputs[slot][:n]
+        y0 += x.sum()
+        torch.maximum(y1, x.max(), out=y1)
+
+    def scan(self, slot: int, n: int, stream: None) -> torch.Tensor:
+        return torch.cumsum(self.inputs[slot][:n], 0, out=self.outputs[slot][:n])
+
+    def wait_current(self) -> None:
+        pass
+
+    def fetch(self, slot: int, n: int) -> None:
+        pass
+
+    def result(self, slot: int, n: int) -> torch.Tensor:
+        return self.outputs[slot][:n]
+
+    def synchronize(self) -> None:
+        pass
+
+
+class CUDABackend:
+    # Double-buffered: the host stages a chunk into pinned memory while the previous ones are copied and computed,
+    # with host-to-device copies, kernels and device-to-host copies on separate streams
+    def __init__(self, chunk_size: int, with_outputs: bool, device: torch.device) -> None:
+        assert chunk_size % scan_granularity == 0, (
+            f"Chunks must be multiples of {scan_granularity} elements"
+        )
+        self.device = device
+        self.chunk_size = chunk_size
+        self.copy_stream = torch.cuda.Stream(device)
+        self.compute_stream = torch.cuda.Stream(device)
+        self.fetch_stream = torch.cuda.Stream(device)
+
+        def buffers(**kwargs) -> list:
+            return [torch.empty(chunk_size, dtype=torch.float, **kwargs) for _ in range(2)]
+
+        self.host_inputs = buffers(pin_memory=True)
+        self.inputs = buffers(device=device)
+        if with_outputs:
+            self.outputs = buffers(device=device)
+            self.host_outputs = buffers(pin_memory=True)
+
+        # NOTES: waiting on an event which was never recorded returns immediately
+        self.copied = [torch.cuda.Event() for _ in range(2)]
+        self.computed = [torch.cuda.Event() for _ in range(2)]
+        self.fetched = [torch.cuda.Event() for _ in range(2)]
+
+    def stage(self, slot: int, chunk: Any) -> int:
+        # The pinned buffer is free once its previous copy is done, the device one once its previous kernels are
+        self.copied[slot].synchronize()
+        n = copy_into(self.host_inputs[slot], chunk)
+        self.copy_stream.wait_event(self.computed[slot])
+        with torch.cuda.stream(self.copy_stream):
+            self.inputs[slot][:n].copy_(self.host_inputs[slot][:n], non_blocking=True)
+            if n < self.chunk_size:
+                self.inputs[slot][n:].zero_()
+        self.copied[slot].record(self.copy_stream)
+        return n
+
+    @contextlib.contextmanager
+    def compute(self, slot: int) -> Iterator[torch.cuda.Stream]:
+        self.compute_stream.wait_event(self.copied[slot])
+        self.compute_stream.wait_event(self.fetched[slot])
+        with torch.cuda.stream(self.compute_stream):
+            yield self.compute_stream
+        self.computed[slot].record(self.compute_stream)
+
+    def reduce_sum_max(
+        self,
+        slot: int,
+        n: int,
+        y0: torch.Tensor,
+        y1: torch.Tensor,
+        stream: torch.cuda.Stream,
+    ) -> None:
+        reduce_sum_max(self.inputs[slot][:n], y0, y1, stream=stream)
+
+    def scan(self, slot: int, n: int, stream: torch.cuda.Stream) -> torch.Tensor:
+        naive_scan(self.inputs[slot], self.outputs[slot], stream=stream)
+        return self.outputs[slot][:n]
+
+    def wait_current(self) -> None:
+        # Order work of the current stream (e.g. initialising carried partials) before the compute stream
+        # NOTES: `torch.cuda.Stream`s are non-blocking, and do not sync with the legacy default stream
+        self.compute_stream.wait_stream(torch.cuda.current_stream(self.device))
+
+    def fetch(self, slot: int, n: int) -> None:
+        self.fetch_stream.wait_event(self.computed[slot])
+        with torch.cuda.stream(self.fetch_stream):
+            self.host_outputs[slot][:n].copy_(self.outputs[slot][:n], non_blocking=True)
+        self.fetched[slot].record(self.fetch_stream)
+
+    def result(self, slot: int, n: int) -> torch.Tensor:
+        self.fetched[slot].synchronize()
+        return self.host_outputs[slot][:n]
+
+    def synchronize(self) -> None:
+        self.compute_stream.synchronize()
+
+
+def get_backend(
+    chunk_size: Optional[int], with_outputs: bool, device: Union[str, torch.device, None]
+) -> Union[HostBackend, CUDABackend]:
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    device = torch.device(device)
+    chunk_size = default_chunk_size if chunk_size is None else chunk_size
+    if device.type == "cpu":
+        return HostBackend(chunk_size, with_outputs)
+    return CUDABackend(chunk_size, with_outputs, device)
+
+
+def stream_reduce_sum_max(
+    source: Source,
+    chunk_size: int = None,
+    device: Union[str, torch.device] = None,
+) -> Tuple[float, float]:
+    # Sum and max of a source which does not need to fit in device memory
+    # Partials are carried across chunks on the device, `device="cpu"` runs the same pipeline on the host
+    backend = get_backend(chunk_size, False, device)
+    y0 = torch.zeros(1, dtype=torch.float, device=backend.device)
+    y1 = torch.full((1,), -float("inf"), dtype=torch.float, device=backend.device)
+    backend.wait_current()
+    tail_sum, tail_max = 0.0, -float("inf")
+
+    for i, chunk in enumerate(iter_chunks(source, backend.chunk_size)):
+        slot = i % 2
+        n = backend.stage(slot, chunk)
+
+        # Vector loads need multiples of 4 elements, the remainder is folded on the host
+        n_aligned = n - n % 4
+        if n_aligned < n:
+            tail = backend.host_inputs[slot][n_aligned:n]
+            tail_sum += tail.sum().item()
+            tail_max = max(tail_max, tail.max().item())
+        if n_aligned > 0:
+            with backend.compute(slot) as stream:
+                backend.reduce_sum_max(slot, n_aligned, y0, y1, stream)
+
+    backend.synchronize()
+    return y0.item() + tail_sum, max(y1.item(), tail_max)
+
+
+def iter_scan(
+    source: Source,
+    chunk_size: int = None,
+    device: Union[str, torch.device] = None,
+) -> Iterator[torch.Tensor]:
+    # Inclusive prefix sums of a source, yielded chunk by chunk as CPU tensors
+    # NOTES: yielded chunks are staging buffers, which are overwritten two chunks later
+    backend = get_backend(chunk_size, True, device)
+    carry = torch.zeros(1, dtype=torch.float, device=backend.device)
+    backend.wait_current()
+
+    pending = None
+    for i, chunk in enumerate(iter_chunks(source, backend.chunk_size)):
+        slot = i % 2
+        n = backend.stage(slot, chunk)
+        with backend.compute(slot) as stream:
+            y = backend.scan(slot, n, stream)
+            y.add_(carry)
+            carry.copy_(y[-1:])
+        backend.fetch(slot, n)
+
+        # Hand out the previous chunk, while this one is still in flight
+        if pending is not None:
+            yield backend.result(*pending)
+        pending = (slot, n)
+
+    if pending is not None:
+        yield backend.result(*pending)
+
+
+def stream_scan(
+    source: Source,
+    out: Any = None,
+    chunk_size: int = None,
+    device: Union[str, torch.device] = None,
+) -> Any:
+    # Writes into `out`, a CPU tensor or a writable NumPy array (e.g. a `np.memmap`)
+    # Without `out`, a CPU tensor is returned
+    if out is None and not is_array(source):
+        chunks = [chunk.clone() for chunk in iter_scan(source, chunk_size, device)]
+        return torch.cat(chunks) if len(chunks) > 0 else torch.empty(0, dtype=torch.float)
+
+    out = torch.empty(source.shape[0], dtype=torch.float) if out is None else out
+    start = 0
+    for chunk in iter_scan(source, chunk_size, device):
+        copy_from(out, start, chunk)
+        start += chunk.shape[0]
+    return out
+
+
+def accuracy_test():
+    torch.manual_seed(46)
+    N = 3 * default_chunk_size + 4096 + 3
+    x = torch.randn(N, dtype=torch.float)
+
+    y0, y1 = stream_reduce_sum_max(x)
+    assert abs(y0 - x.double().sum().item()) < 1e-3 * x.abs().sum().item()
+    assert y1 == x.max().item()
+
+    y = stream_scan(x)
+    expected = torch.cumsum(x.double(), 0)
+    assert torch.allclose(y.double(), expected, atol=1e-2 * N**0.5)
+
+    print("Test passed!")
+
+
+if __name__ == "__main__":
+    accuracy_test()
@@ -1,102 +1,225 @@
 import copy
-import os
 import torch
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Union
 
-from ..jit import build, cpp_format, generate, Runtime
+from ..jit import build, config, cpp_format, generate, read_bundle, write_bundle, Runtime
+from ..jit.tracing import get_trace_name
+from ..jit.compiler import get_target_arch, runtime_cache
+from .cost_model import CostModel, get_dtype, log_measurement
+from .pruning import get_device_limits, ResourcePolicy
+from .search import config_key, Exhaustive, SearchStrategy
+from .space import as_space, Space
 
 
 class JITTuner:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        policy: ResourcePolicy = None,
+        cost_model: CostModel = None,
+        top_k: Optional[int] = None,
+        predict_only: bool = False,
+    ) -> None:
+        # With a cost model, kernels it knows only compile and benchmark their `top_k` predicted candidates,
+        # or with `predict_only`, the predicted best without any benchmark
         self.tuned = {}
+        self.tuned_keys = {}
+        self.policy = ResourcePolicy() if policy is None else policy
+        self.cost_model = cost_model
+        self.top_k = top_k
+        self.predict_only = predict_only
+
+    def select_points(
+        self,
+        name: str,
+        keys: Dict[str, Any],
+        points: List[Dict[str, Any]],
+        context: Dict[str, Any],
+        dtype: Optional[str],
+    ) -> List[Dict[str, Any]]:
+        if len(points) <= 1 or self.cost_model is None or name not in self.cost_model:
+            return points
+        if not self.predict_only and self.top_k is None:
+            return points
+        ranked = self.cost_model.rank(name, keys, points, context.get("N"), dtype)
+        return ranked[:1] if self.predict_only else ranked[: self.top_k]
 
     def compile_and_tune(
         self,
         name: str,
         keys: Dict[str, Any],
-        space: tuple,
+        space: Union[Space, tuple],
         includes: tuple,
         arg_defs: tuple,
         template: str,
         args: tuple,
+        strategy: SearchStrategy = None,
     ) -> Runtime:
         # NOTES: we always assume the space and template will not change
         # We also assume the GPU device will not be changed
         # NOTES: the function must have no accumulated side effects
-        keys = {k: keys[k] for k in sorted(keys.keys())}
-        signature = (name, f"{keys}")
-        if signature in self.tuned:
-            if os.getenv("COPYAN_JIT_DEBUG", None):
+        signature = (name, tuple(sorted(keys.items())))
+        runtime = self.tuned.get(signature)
+        if runtime is not None:
+            if config.JIT_DEBUG:
                 print(f"Using cached JIT kernel {name} with keys {keys}")
-            return self.tuned[signature]
+            return runtime
 
-        if os.getenv("COPYAN_JIT_DEBUG", None):
+        if config.JIT_DEBUG:
             print(f"Auto-tuning JIT kernel {name} with keys {keys}")
 
+        keys = {k: keys[k] for k in sorted(keys.keys())}
         assert signature not in self.tuned
         assert args is not None
-        space = (dict(),) if len(space) == 0 else space
-
-        kernels = []
-        for tuned_keys in space:
-            assert isinstance(tuned_keys, dict)
-            full_keys = copy.deepcopy(keys)
-            full_keys.update(tuned_keys)
-            code = generate(includes, arg_defs, cpp_format(template, full_keys))
-
-            # Illegal build must raise errors
-            kernels.append((build(name, arg_defs, code), tuned_keys))
-
-        best_runtime, best_time, best_keys = None, None, None
-        for runtime, tuned_keys in kernels:
-            if len(space) > 1:
-                # Check kernel validity
-                return_code = runtime(*args)
-                if return_code != 0:
-                    # Pass illegal kernels, e.g. insufficient shared memory capacity
-                    if os.getenv("COPYAN_JIT_DEBUG", None):
+
+        # Constraints may refer to the fixed keys and the scalar arguments, e.g. `N`
+        context = {
+            arg_name: arg
+            for arg, (arg_name, _) in zip(args, arg_defs)
+            if isinstance(arg, (bool, int, float))
+        }
+        points = as_space(space).points(**{**context, **keys})
+        assert len(points) > 0, f"Empty tuning space for JIT kernel {name} with keys {keys}"
+        strategy = Exhaustive() if strategy is None else strategy
+        dtype = get_dtype(args)
+        points = self.select_points(name, keys, points, context, dtype)
+
+        runtimes = {}
+
+        def compile_candidate(tuned_keys: Dict[str, Any]) -> Runtime:
+            key = config_key(tuned_keys)
+            if key not in runtimes:
+                full_keys = copy.deepcopy(keys)
+                full_keys.update(tuned_keys)
+                code = generate(includes, arg_defs, cpp_format(template, full_keys))
+
+                # Illegal build must raise errors
+                # Sweeps yield to latency-critical builds in the compile daemon
+                priority = "tuning" if len(points) > 1 else "interactive"
+                runtimes[key] = build(name, arg_defs, code, priority=priority)
+            return runtimes[key]
+
+        # Rank all candidates by their ptxas reports, and only benchmark the best ones
+        if len(points) > 1 and self.policy is not None and self.policy.top_k is not None:
+            ranked = self.policy.rank(
+                [(tuned_keys, compile_candidate(tuned_keys).get_resources()) for tuned_keys in points],
+                get_device_limits(),
+                keys,
+            )
+            points = ranked if len(ranked) > 0 else points
+
+        rejected = []
+
+        def cost_fn(tuned_keys: Dict[str, Any], prune: bool = True) -> Optional[float]:
+            runtime = compile_candidate(tuned_keys)
+            if len(points) == 1:
+                return 0
+
+            # Reject hopeless candidates before any timing
+            if prune and self.policy is not None:
+                hopeless, score = self.policy.assess(
+                    runtime.get_resources(), {**keys, **tuned_keys}, get_device_limits()
+                )
+                if hopeless:
+                    if config.JIT_DEBUG:
                         print(
-                            f"Illegal JIT kernel {name} with keys {keys} and tuned keys {tuned_keys}: error code {return_code}"
+                            f"Pruned JIT kernel {name} with keys {keys} and tuned keys {tuned_keys}: score {score}"
                         )
-                    continue
-
-                # Measure performance with L2 flush and a large GEMM kernel before to reduce overhead between kernels
-                start_event = torch.cuda.Event(enable_timing=True)
-                end_event = torch.cuda.Event(enable_timing=True)
-                
-                torch.empty(int(128e6 // 4), dtype=torch.int, device="cuda").zero_()
-                torch.randn(
-                    (4096, 4096), dtype=torch.float, device="cuda"
-                ) @ torch.randn((4096, 4096), dtype=torch.float, device="cuda")
-                start_event.record()
-                for i in range(20):
-                    assert runtime(*args) == 0
-                end_event.record()
-                end_event.synchronize()
-                elapsed_time = start_event.elapsed_time(end_event)
-            else:
-                elapsed_time = 0
-
-            # Compare if better
-            if best_time is None or elapsed_time < best_time:
-                best_runtime, best_time, best_keys = runtime, elapsed_time, tuned_keys
-            if os.getenv("COPYAN_JIT_DEBUG", None):
-                print(
-                    f"Tuned JIT kernel {name} with keys {keys} and tuned keys {tuned_keys} has time {elapsed_time}"
-                )
-        assert best_runtime is not None, (
+                    rejected.append(tuned_keys)
+                    return None
+
+            elapsed_time = self.benchmark(runtime, args)
+            if elapsed_time is not None:
+                log_measurement(name, keys, tuned_keys, context.get("N"), dtype, elapsed_time)
+            if config.JIT_DEBUG:
+                if elapsed_time is None:
+                    print(
+                        f"Illegal JIT kernel {name} with keys {keys} and tuned keys {tuned_keys}"
+                    )
+                else:
+                    print(
+                        f"Tuned JIT kernel {name} with keys {keys} and tuned keys {tuned_keys} has time {elapsed_time}"
+                    )
+            return elapsed_time
+
+        best_keys, best_time = strategy.search(points, cost_fn)
+        if best_keys is None and len(rejected) > 0:
+            # Everything was pruned, fallback to benchmarking the pruned ones
+            best_keys, best_time = strategy.search(
+                rejected, lambda tuned_keys: cost_fn(tuned_keys, prune=False)
+            )
+        assert best_keys is not None, (
             f"Failed to tune JIT kernel {name} with keys {keys}"
         )
+        best_runtime = runtimes[config_key(best_keys)]
 
         # Cache the best runtime and return
-        if os.getenv("COPYAN_JIT_DEBUG", None) or os.getenv(
-            "COPYAN_PRINT_AUTOTUNE", None
-        ):
+        if config.JIT_DEBUG or config.PRINT_AUTOTUNE:
             print(
                 f"Best JIT kernel {name} with keys {keys} has tuned keys {best_keys} and time {best_time}"
             )
+        best_runtime.trace_name = get_trace_name(name, keys, best_keys)
+        # NOTES: winners are not pinned, evicted ones are loaded again by their next call
         self.tuned[signature] = best_runtime
+
+        # Losers are unloaded, their libraries stay in the disk cache
+        for runtime in runtimes.values():
+            if runtime is not best_runtime:
+                runtime_cache.release(runtime)
+        self.tuned_keys[signature] = best_keys
         return best_runtime
 
+    @staticmethod
+    def benchmark(runtime: Runtime, args: tuple) -> Optional[float]:
+        # Check kernel validity
+        return_code = runtime(*args)
+        if return_code != 0:
+            # Pass illegal kernels, e.g. insufficient shared memory capacity
+            if config.JIT_DEBUG:
+                print(f"Illegal JIT kernel {runtime.kernel_name}: error code {return_code}")
+            return None
+
+        # Measure performance with L2 flush and a large GEMM kernel before to reduce overhead between kernels
+        start_event = torch.cuda.Event(enable_timing=True)
+        end_event = torch.cuda.Event(enable_timing=True)
+
+        torch.empty(int(128e6 // 4), dtype=torch.int, device="cuda").zero_()
+        torch.randn(
+            (4096, 4096), dtype=torch.float, device="cuda"
+        ) @ torch.randn((4096, 4096), dtype=torch.float, device="cuda")
+        start_event.record()
+        for i in range(20):
+            assert runtime(*args) == 0
+        end_event.record()
+        end_event.synchronize()
+        return start_event.elapsed_time(end_event)
+
+    def export_bundle(self, path: str, arch: str = None) -> None:
+        # Pack every tuned kernel into a single file, which can be served without NVCC
+        kernels, tuned = {}, []
+        for signature, runtime in self.tuned.items():
+            name, keys = signature
+            kernels[runtime.kernel_name] = runtime
+            tuned.append(
+                {
+                    "name": name,
+                    "keys": [list(item) for item in keys],
+                    "tuned_keys": self.tuned_keys[signature],
+                    "kernel": runtime.kernel_name,
+                }
+            )
+        write_bundle(path, kernels, tuned, get_target_arch() if arch is None else arch)
+
+    def import_bundle(self, path: str) -> None:
+        # Only the tuned signatures are served, `build` still resolves `nvcc` and hashes the toolchain first
+        manifest, runtimes = read_bundle(path)
+        for record in manifest["tuned"]:
+            signature = (record["name"], tuple(tuple(item) for item in record["keys"]))
+            runtime = runtimes[record["kernel"]]
+            runtime.trace_name = get_trace_name(
+                record["name"], dict(signature[1]), record["tuned_keys"]
+            )
+            self.tuned[signature] = runtime
+            self.tuned_keys[signature] = record["tuned_keys"]
+
 
 jit_tuner = JITTuner()
@@ -1,7 +1,6 @@
 import os
 import sys
 import torch
-import torch.distributed as dist
 
 
 class empty_suppress:
@@ -84,6 +83,8 @@ def bench_kineto(
             for i in range(2):
                 # NOTES: use a large kernel and a barrier to eliminate the unbalanced CPU launch overhead
                 if barrier_comm_profiling:
+                    import torch.distributed as dist
+
                     lhs = torch.randn((4096, 4096), dtype=torch.float, device="cuda")
                     rhs = torch.randn((4096, 4096), dtype=torch.float, device="cuda")
                     lhs @ rhs
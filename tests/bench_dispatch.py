@@ -0,0 +1,48 @@
+import time
+import torch
+
+import copyan
+from copyan.jit_kernels import reduce, scan
+from copyan.jit_kernels.tuner import jit_tuner
+
+from host_kernel import build_host_runtime
+
+
+def bench_python_overhead(fn, num_tests: int = 100000) -> float:
+    for _ in range(1000):
+        fn()
+    start = time.perf_counter()
+    for _ in range(num_tests):
+        fn()
+    return (time.perf_counter() - start) / num_tests
+
+
+def bench_dispatch():
+    print("Testing Python dispatch overhead (host stubs, no GPU):")
+
+    # Seed the tuner with host-compiled stubs, so only the Python side is measured
+    jit_tuner.tuned[
+        ("reduce sum & max", (("REDUCE_MODE", "Atomic"), ("TRANSFORM", "IdentityOp()")))
+    ] = build_host_runtime(reduce.arg_defs, "__return_code = 0;")
+    jit_tuner.tuned[("naive_scan", (("BLOCK_SIZE", 1024),))] = build_host_runtime(
+        scan.arg_defs, "__return_code = 0;"
+    )
+
+    x = torch.empty(1024, dtype=torch.float)
+    y0 = torch.empty(1, dtype=torch.float)
+    y1 = torch.empty(1, dtype=torch.float)
+    prepared_reduce = copyan.jit_kernels.reduce_sum_max.prepare(dtype=torch.float)
+    prepared_scan = copyan.jit_kernels.naive_scan.prepare(dtype=torch.float)
+
+    cases = (
+        ("reduce_sum_max", lambda: copyan.jit_kernels.reduce_sum_max(x, y0, y1)),
+        ("reduce_sum_max.prepare", lambda: prepared_reduce(x, y0, y1)),
+        ("naive_scan", lambda: copyan.jit_kernels.naive_scan(x, x)),
+        ("naive_scan.prepare", lambda: prepared_scan(x, x)),
+    )
+    for name, fn in cases:
+        print(f" > {name:<24}: {bench_python_overhead(fn) * 1e6:6.2f} us/call")
+
+
+if __name__ == "__main__":
+    bench_dispatch()
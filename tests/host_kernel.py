@@ -0,0 +1,45 @@
+import os
+import subprocess
+import tempfile
+
+import copyan
+from copyan.jit import Runtime
+from copyan.jit.template import genc_map, typename_map
+
+include_dir = os.path.join(os.path.dirname(copyan.__file__), "include")
+
+
+def build_host_runtime(
+    arg_defs: tuple, body: str, path: str = None, includes: tuple = ()
+) -> Runtime:
+    # Build a host-only `launch` with the system C++ compiler, in the same layout as JIT cache entries
+    # `includes` are resolved against `copyan/include`, and must not need CUDA
+    path = tempfile.mkdtemp(prefix="copyan.host.") if path is None else path
+    os.makedirs(path, exist_ok=True)
+
+    code = "".join(f"#include {include}\n" for include in includes)
+    code += 'extern "C" void launch('
+    code += ", ".join(
+        [f"{genc_map[t][0]} {n}" for n, t in arg_defs] + ["int& __return_code"]
+    )
+    code += ") {\n" + body + "\n}\n"
+
+    with open(os.path.join(path, "kernel.args"), "w") as f:
+        f.write(", ".join([f"('{n}', {typename_map[t]})" for n, t in arg_defs]))
+    with open(os.path.join(path, "kernel.cu"), "w") as f:
+        f.write(code)
+    subprocess.check_call(
+        [
+            os.getenv("CXX", "c++"),
+            "-x",
+            "c++",
+            "-shared",
+            "-fPIC",
+            "-O2",
+            f"-I{include_dir}",
+            os.path.join(path, "kernel.cu"),
+            "-o",
+            os.path.join(path, "kernel.so"),
+        ]
+    )
+    return Runtime(path)
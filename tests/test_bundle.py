@@ -0,0 +1,47 @@
+import os
+import tempfile
+import torch
+
+from copyan.jit_kernels.tuner import JITTuner
+
+from host_kernel import build_host_runtime
+
+
+def test_bundle_roundtrip():
+    with tempfile.TemporaryDirectory() as path:
+        arg_defs = (("X", torch.float), ("Y", torch.float), ("N", int))
+        body = "for (int i = 0; i < N; ++ i) ((float*) Y)[i] = ((float*) X)[i] * {SCALE};"
+        exporter = JITTuner()
+        for scale in (2, 3):
+            signature = ("scale", (("SCALE", scale),))
+            exporter.tuned[signature] = build_host_runtime(
+                arg_defs,
+                body.replace("{SCALE}", f"{scale}"),
+                os.path.join(path, f"kernel.scale.{scale}"),
+            )
+            exporter.tuned_keys[signature] = {"SCALE": scale}
+        bundle_path = os.path.join(path, "kernels.copyan")
+        exporter.export_bundle(bundle_path, arch="89")
+
+        # Import into a fresh tuner, without the original cache entries
+        for scale in (2, 3):
+            for file_name in ("kernel.so", "kernel.cu", "kernel.args"):
+                os.unlink(os.path.join(path, f"kernel.scale.{scale}", file_name))
+        importer = JITTuner()
+        importer.import_bundle(bundle_path)
+        assert importer.tuned_keys == exporter.tuned_keys
+
+        x = torch.arange(8, dtype=torch.float)
+        y = torch.empty(8, dtype=torch.float)
+        for scale in (2, 3):
+            runtime = importer.compile_and_tune(
+                "scale", {"SCALE": scale}, (), (), arg_defs, body, ()
+            )
+            assert runtime(x, y, 8) == 0
+            assert torch.equal(y, x * scale)
+            assert runtime.lib._name.startswith("/proc/self/fd/")
+
+
+if __name__ == "__main__":
+    test_bundle_roundtrip()
+    print("Bundle test passed!")
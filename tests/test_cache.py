@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+
+from copyan.jit import config, get_shared_cache, Runtime, SharedCache
+from copyan.jit.runtime import LIB_NAME
+
+kernel_name = "kernel.test.0123456789ab"
+
+
+def make_entry(path: str) -> str:
+    # A local cache entry, with a fake library as only its bytes matter here
+    entry = os.path.join(path, kernel_name)
+    os.makedirs(entry)
+    files = {
+        "kernel.cu": "// source",
+        "kernel.args": "('N', int)",
+        "kernel.meta.json": json.dumps({"arch": "89", "resources": {}}),
+        LIB_NAME: "\x7fELF library",
+    }
+    for file_name, data in files.items():
+        with open(os.path.join(entry, file_name), "w") as f:
+            f.write(data)
+    return entry
+
+
+def test_shared_cache_read_through():
+    with tempfile.TemporaryDirectory() as node_a, tempfile.TemporaryDirectory() as node_b:
+        with tempfile.TemporaryDirectory() as shared_dir:
+            shared = SharedCache(shared_dir, "read-write")
+            entry = make_entry(node_a)
+            assert shared.publish(kernel_name, entry)
+            assert not shared.publish(kernel_name, entry)
+            assert sorted(os.listdir(shared_dir)) == [kernel_name]
+
+            # Another node reads through into its own local cache
+            local = os.path.join(node_b, kernel_name)
+            assert shared.fetch(kernel_name, local)
+            assert Runtime.is_path_valid(local)
+            for file_name in os.listdir(entry):
+                with open(os.path.join(entry, file_name), "rb") as f:
+                    expected = f.read()
+                with open(os.path.join(local, file_name), "rb") as f:
+                    assert f.read() == expected
+            assert sorted(os.listdir(local)) == sorted(os.listdir(entry))
+            assert not shared.fetch("kernel.test.missing", os.path.join(node_b, "missing"))
+
+
+def test_shared_cache_integrity():
+    with tempfile.TemporaryDirectory() as node_a, tempfile.TemporaryDirectory() as node_b:
+        with tempfile.TemporaryDirectory() as shared_dir:
+            shared = SharedCache(shared_dir)
+            assert shared.publish(kernel_name, make_entry(node_a))
+            with open(os.path.join(shared_dir, kernel_name, LIB_NAME), "a") as f:
+                f.write("corrupted")
+
+            # Corrupted entries are misses, and leave nothing behind locally
+            local = os.path.join(node_b, kernel_name)
+            assert not shared.fetch(kernel_name, local)
+            assert not Runtime.is_path_valid(local)
+            assert os.listdir(local) == []
+
+
+def test_shared_cache_policies():
+    with tempfile.TemporaryDirectory() as node_a, tempfile.TemporaryDirectory() as node_b:
+        with tempfile.TemporaryDirectory() as shared_dir:
+            entry = make_entry(node_a)
+            local = os.path.join(node_b, kernel_name)
+            assert not SharedCache(shared_dir, "read-only").publish(kernel_name, entry)
+            assert SharedCache(shared_dir, "publish-only").publish(kernel_name, entry)
+            assert not SharedCache(shared_dir, "publish-only").fetch(kernel_name, local)
+            assert SharedCache(shared_dir, "read-only").fetch(kernel_name, local)
+
+            old_dir, old_policy = config.SHARED_CACHE_DIR, config.SHARED_CACHE_POLICY
+            try:
+                config.configure(shared_cache_dir="")
+                assert get_shared_cache() is None
+                config.configure(shared_cache_dir=shared_dir, shared_cache_policy="read-only")
+                assert get_shared_cache().root == shared_dir
+                assert not get_shared_cache().can_write()
+            finally:
+                config.configure(shared_cache_dir=old_dir, shared_cache_policy=old_policy)
+
+
+if __name__ == "__main__":
+    test_shared_cache_read_through()
+    test_shared_cache_integrity()
+    test_shared_cache_policies()
+    print("Test passed!")
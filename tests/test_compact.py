@@ -0,0 +1,43 @@
+import torch
+
+import copyan
+from copyan import bench_kineto
+
+
+def test_compact_reference():
+    torch.manual_seed(0)
+    x = torch.randn(1000, dtype=torch.float)
+    mask = x > 0
+
+    out, count = copyan.jit_kernels.partition_reference(x, mask)
+    assert count == int(mask.sum())
+    assert torch.equal(out[:count], copyan.jit_kernels.compact_reference(x, mask))
+    assert torch.equal(out[count:], x[~mask])
+
+    indices = copyan.jit_kernels.nonzero_reference(mask)
+    assert indices.dtype == torch.int
+    assert torch.equal(x[indices.long()], out[:count])
+
+
+def test_compact():
+    print("Testing compact:")
+
+    def test_func():
+        N = 1024 * 4096 * 16
+        x = torch.randn(N, dtype=torch.float, device="cuda")
+        copyan.jit_kernels.compact(x, x > 0)
+
+    t = bench_kineto(
+        test_func,
+        ("scan_tiles", "scan_tile_sums", "add_tile_offsets", "compact_scatter"),
+        suppress_kineto_output=True,
+    )
+    for i, time in enumerate(t):
+        print(f" > Performance {i}: {time * 1e6:4.0f} us")
+    print(f" > Total Performance: {sum(t) * 1e6:4.0f} us")
+
+
+if __name__ == "__main__":
+    test_compact_reference()
+    copyan.jit_kernels.compact_accuracy_test()
+    test_compact()
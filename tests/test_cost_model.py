@@ -0,0 +1,127 @@
+import json
+import math
+import os
+import random
+import tempfile
+
+from copyan.jit import config
+from copyan.jit_kernels.cost_model import CostModel, evaluate, log_measurement, main, read_logs, split_sessions
+from copyan.jit_kernels.tuner import JITTuner
+
+device = {"device": "Synthetic GPU", "cc": 89, "num_sms": 128}
+space = [
+    {"BLOCK_SIZE": block_size, "ITEMS_PER_THREAD": items}
+    for block_size in (128, 256, 512, 1024)
+    for items in (1, 4, 16)
+]
+
+
+def synthetic_time(tuned_keys: dict, N: int, mode: str) -> float:
+    # Small problems want small tiles, large ones want large tiles, `Tree` mode pays a second pass
+    tile = tuned_keys["BLOCK_SIZE"] * tuned_keys["ITEMS_PER_THREAD"]
+    best_tile = 2 ** min(14, max(7, math.log2(N) - 10))
+    time = N / 1e6 * (1 + 0.3 * (math.log2(tile) - math.log2(best_tile)) ** 2)
+    return time * (1.2 if mode == "Tree" else 1.0)
+
+
+def write_synthetic_log(path: str, sizes: tuple, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for N in sizes:
+            for mode in ("Atomic", "Tree"):
+                for tuned_keys in space:
+                    record = {
+                        "name": "reduce sum & max",
+                        "keys": {"REDUCE_MODE": mode},
+                        "tuned_keys": tuned_keys,
+                        "N": N,
+                        "dtype": "float32",
+                        "device": device,
+                        "time": synthetic_time(tuned_keys, N, mode) * rng.uniform(0.97, 1.03),
+                    }
+                    f.write(json.dumps(record) + "\n")
+        # Interrupted writers may leave a partial line
+        f.write('{"name": "reduce')
+
+
+def test_fit_and_rank():
+    path = os.path.join(tempfile.mkdtemp(), "tuning.jsonl")
+    write_synthetic_log(path, tuple(2**i for i in range(16, 29, 2)))
+    records = read_logs([path])
+    assert len(records) == 7 * 2 * len(space)
+    model = CostModel.fit(records, alpha=0.1)
+
+    # Unseen sizes: the predicted best tiles are close to the true best ones
+    for N in (2**17 + 5, 2**21, 2**25 + 3):
+        for mode in ("Atomic", "Tree"):
+            ranked = model.rank("reduce sum & max", {"REDUCE_MODE": mode}, space, N, "float32", device)
+            times = sorted(synthetic_time(tuned_keys, N, mode) for tuned_keys in space)
+            assert synthetic_time(ranked[0], N, mode) <= times[2] * 1.01, (N, ranked[0])
+
+    results = evaluate(model, records)["reduce sum & max"]
+    assert results["sessions"] == 14 and results["slowdown"] < 1.1
+
+    # Held-out sessions are whole, and never seen by the fit
+    train, held_out = split_sessions(records, 3)
+    assert len(held_out) == 4 * len(space) and len(train) + len(held_out) == len(records)
+    assert not {json.dumps(r, sort_keys=True) for r in train} & {json.dumps(r, sort_keys=True) for r in held_out}
+    results = evaluate(CostModel.fit(train, alpha=0.1), held_out)["reduce sum & max"]
+    assert results["sessions"] == 4 and results["slowdown"] < 1.1
+
+    # Round trip
+    model_path = os.path.join(tempfile.mkdtemp(), "model.json")
+    model.save(model_path)
+    loaded = CostModel.load(model_path)
+    predicted = model.predict("reduce sum & max", {"REDUCE_MODE": "Atomic"}, space, 2**20, "float32", device)
+    assert loaded.predict("reduce sum & max", {"REDUCE_MODE": "Atomic"}, space, 2**20, "float32", device).allclose(predicted)
+
+
+def test_select_points():
+    path = os.path.join(tempfile.mkdtemp(), "tuning.jsonl")
+    write_synthetic_log(path, tuple(2**i for i in range(16, 29, 2)))
+    model = CostModel.fit(read_logs([path]))
+    context, keys = {"N": 2**24}, {"REDUCE_MODE": "Atomic"}
+
+    assert len(JITTuner(cost_model=model).select_points("reduce sum & max", keys, space, context, "float32")) == len(space)
+    top = JITTuner(cost_model=model, top_k=3).select_points("reduce sum & max", keys, space, context, "float32")
+    assert len(top) == 3
+    best = JITTuner(cost_model=model, predict_only=True).select_points("reduce sum & max", keys, space, context, "float32")
+    assert best == top[:1]
+
+    # Kernels the model does not know are tuned as usual
+    assert JITTuner(cost_model=model, top_k=3).select_points("naive_scan", {}, space, context, "float32") == space
+
+
+def test_log_and_cli():
+    log_dir = tempfile.mkdtemp()
+    path = os.path.join(log_dir, "tuning.jsonl")
+    log_measurement("stub", {"MODE": "A"}, {"BLOCK_SIZE": 256}, 1024, "float32", 1.0)
+    assert not os.path.exists(path)
+
+    previous = config.TUNING_LOG
+    try:
+        config.configure(tuning_log=path)
+        for block_size in (128, 256, 512):
+            for N in (1024, 4096):
+                log_measurement("stub", {"MODE": "A"}, {"BLOCK_SIZE": block_size}, N, "float32", N / block_size)
+    finally:
+        config.configure(tuning_log=previous)
+    records = read_logs([path])
+    assert len(records) == 6 and records[0]["device"]["device"] is not None
+
+    model_path = os.path.join(log_dir, "model.json")
+    assert main([path, "-o", model_path]) == 0
+    ranked = CostModel.load(model_path).rank(
+        "stub", {"MODE": "A"}, [{"BLOCK_SIZE": 128}, {"BLOCK_SIZE": 512}], 2048, "float32", records[0]["device"]
+    )
+    assert ranked[0] == {"BLOCK_SIZE": 512}
+
+    empty_path = os.path.join(log_dir, "empty.jsonl")
+    open(empty_path, "w").close()
+    assert main([empty_path, "-o", model_path]) == 1
+
+
+if __name__ == "__main__":
+    test_fit_and_rank()
+    test_select_points()
+    test_log_and_cli()
@@ -0,0 +1,284 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from copyan.jit import config
+from copyan.jit.compiler import get_compile_daemon_socket
+from copyan.jit.daemon import CompileDaemon, request_compile
+from copyan.jit.runtime import LIB_NAME
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_fake_nvcc(path: str) -> str:
+    # A stand-in `nvcc` which logs the compiled entries, `SLOW` sources take a while and `FAIL` ones fail
+    nvcc = os.path.join(path, "nvcc")
+    with open(nvcc, "w") as f:
+        f.write(f"#!{sys.executable}\n")
+        f.write(
+            "import os, sys, time\n"
+            "if '--version' in sys.argv:\n"
+            "    print('Cuda compilation tools, release 12.8, V12.8.93')\n"
+            "    sys.exit(0)\n"
+            "src, out = sys.argv[1], sys.argv[sys.argv.index('-o') + 1]\n"
+            "code = open(src).read()\n"
+            f"open({os.path.join(path, 'calls')!r}, 'a').write(os.path.basename(os.path.dirname(src)) + '\\n')\n"
+            "if 'SLOW' in code:\n"
+            "    time.sleep(0.5)\n"
+            "if 'FAIL' in code:\n"
+            "    print('kernel.cu(1): error: expected a declaration')\n"
+            "    sys.exit(1)\n"
+            "open(out, 'w').write(code)\n"
+            "print(\"ptxas info    : Function properties for 'kernel'\")\n"
+            "print('ptxas info    : Used 32 registers, used 0 barriers')\n"
+        )
+    os.chmod(nvcc, 0o755)
+    return nvcc
+
+
+def make_request(path: str, nvcc: str, name: str, code: str = "", priority: str = "interactive") -> dict:
+    entry = os.path.join(path, "cache", name)
+    os.makedirs(entry, exist_ok=True)
+    with open(os.path.join(entry, "kernel.cu"), "w") as f:
+        f.write(code)
+    return {
+        "op": "compile",
+        "kernel_name": name,
+        "path": entry,
+        "nvcc": nvcc,
+        "flags": [],
+        "include_dirs": [],
+        "arch": "sm_90a",
+        "priority": priority,
+    }
+
+
+def read_calls(path: str) -> list:
+    calls_path = os.path.join(path, "calls")
+    if not os.path.exists(calls_path):
+        return []
+    with open(calls_path) as f:
+        return f.read().split()
+
+
+def wait_for(socket_path: str, key: str, value: int) -> None:
+    for _ in range(500):
+        if request_compile(socket_path, {"op": "status"})[key] == value:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"Compile daemon never reached `{key} == {value}`")
+
+
+def run_concurrently(socket_path: str, requests: list) -> list:
+    replies = [None] * len(requests)
+
+    def client(i: int) -> None:
+        replies[i] = request_compile(socket_path, requests[i])
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return replies
+
+
+def test_dedupe():
+    with tempfile.TemporaryDirectory() as path:
+        nvcc = make_fake_nvcc(path)
+        socket_path = os.path.join(path, "compile.sock")
+        daemon = CompileDaemon(socket_path, workers=2)
+        daemon.start()
+        try:
+            request = make_request(path, nvcc, "kernel.dedupe", "// SLOW")
+            replies = run_concurrently(socket_path, [request] * 8)
+            assert all(reply["returncode"] == 0 for reply in replies), replies
+            assert read_calls(path) == ["kernel.dedupe"]
+            assert os.path.exists(os.path.join(request["path"], LIB_NAME))
+            assert os.path.exists(os.path.join(request["path"], "kernel.meta.json"))
+            assert "Used 32 registers" in replies[0]["output"]
+
+            # Completed kernels are installed into other cache directories without compiling again
+            other = dict(request, path=os.path.join(path, "other", "kernel.dedupe"))
+            assert request_compile(socket_path, other)["returncode"] == 0
+            assert os.path.exists(os.path.join(other["path"], LIB_NAME))
+            assert read_calls(path) == ["kernel.dedupe"]
+
+            status = request_compile(socket_path, {"op": "status"})
+            assert status["requests"] == 9 and status["compiles"] == 1 and status["deduped"] == 8
+        finally:
+            daemon.shutdown()
+        assert not os.path.exists(socket_path)
+
+
+def test_priority():
+    with tempfile.TemporaryDirectory() as path:
+        nvcc = make_fake_nvcc(path)
+        socket_path = os.path.join(path, "compile.sock")
+        daemon = CompileDaemon(socket_path, workers=1)
+        daemon.start()
+        try:
+            # Occupy the only worker, then queue a precompile job before an interactive one
+            blocker = threading.Thread(
+                target=request_compile, args=(socket_path, make_request(path, nvcc, "kernel.blocker", "// SLOW"))
+            )
+            blocker.start()
+            wait_for(socket_path, "running", 1)
+
+            precompile = threading.Thread(
+                target=request_compile,
+                args=(socket_path, make_request(path, nvcc, "kernel.precompile", priority="precompile")),
+            )
+            precompile.start()
+            wait_for(socket_path, "queued", 1)
+            interactive = make_request(path, nvcc, "kernel.interactive", priority="interactive")
+            assert request_compile(socket_path, interactive)["returncode"] == 0
+
+            for thread in (blocker, precompile):
+                thread.join()
+            assert read_calls(path) == ["kernel.blocker", "kernel.interactive", "kernel.precompile"]
+        finally:
+            daemon.shutdown()
+
+
+def test_failure():
+    with tempfile.TemporaryDirectory() as path:
+        nvcc = make_fake_nvcc(path)
+        socket_path = os.path.join(path, "compile.sock")
+        daemon = CompileDaemon(socket_path, workers=1)
+        daemon.start()
+        try:
+            request = make_request(path, nvcc, "kernel.failure", "// FAIL")
+            reply = request_compile(socket_path, request)
+            assert reply["returncode"] == 1 and "error" in reply["output"]
+            assert not os.path.exists(os.path.join(request["path"], LIB_NAME))
+
+            # Failures are not remembered, the next request compiles again
+            request_compile(socket_path, request)
+            assert read_calls(path) == ["kernel.failure"] * 2
+            assert request_compile(socket_path, {"op": "status"})["failures"] == 2
+        finally:
+            daemon.shutdown()
+
+
+def test_install_failure():
+    with tempfile.TemporaryDirectory() as path:
+        nvcc = make_fake_nvcc(path)
+        socket_path = os.path.join(path, "compile.sock")
+        daemon = CompileDaemon(socket_path, workers=1)
+        daemon.start()
+        try:
+            # The second client's cache directory cannot be created, under a regular file
+            request = make_request(path, nvcc, "kernel.install", "// SLOW")
+            blocked = os.path.join(path, "file")
+            open(blocked, "w").close()
+            replies = run_concurrently(socket_path, [request, dict(request, path=os.path.join(blocked, "kernel.install"))])
+            assert replies[0]["returncode"] == 0
+            assert replies[1]["returncode"] != 0 and "failed to install" in replies[1]["output"]
+
+            # The worker survived
+            assert request_compile(socket_path, {"op": "status"})["workers"] == 1
+            assert request_compile(socket_path, make_request(path, nvcc, "kernel.next"))["returncode"] == 0
+        finally:
+            daemon.shutdown()
+
+
+def run_build(code: str, env: dict) -> subprocess.CompletedProcess:
+    # `build` in a fresh process, with the GPU arch detection replaced
+    script = (
+        "import copyan.jit.compiler as compiler; "
+        "compiler.get_target_arch = lambda: '90'; "
+        f"print(compiler.build('stub', (('N', int),), {code!r}).path)"
+    )
+    return subprocess.run(
+        [sys.executable, "-c", script],
+        env={**os.environ, "PYTHONPATH": repo_dir, **env},
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+
+
+def test_build():
+    with tempfile.TemporaryDirectory() as path:
+        nvcc = make_fake_nvcc(path)
+        env = {"COPYAN_NVCC_COMPILER": nvcc, "COPYAN_CACHE_DIR": path}
+
+        # A daemon on the default socket is found without any configuration
+        daemon = CompileDaemon(os.path.join(path, "compile.sock"), workers=1)
+        daemon.start()
+        try:
+            result = run_build("// kernel A", env)
+            assert result.returncode == 0, result.stdout
+            kernel_path = result.stdout.strip().splitlines()[-1]
+            assert os.path.exists(os.path.join(kernel_path, LIB_NAME))
+            assert read_calls(path) == [os.path.basename(kernel_path)]
+            assert daemon.get_status()["compiles"] == 1
+
+            # Cache hits never reach the daemon, failures are reported by `build`
+            assert run_build("// kernel A", env).returncode == 0
+            result = run_build("// kernel FAIL", env)
+            assert result.returncode != 0 and "Failed to compile" in result.stdout
+            status = daemon.get_status()
+            assert status["requests"] == 2 and status["failures"] == 1
+        finally:
+            daemon.shutdown()
+
+        # Unreachable or disabled daemons fall back to compiling in-process
+        stale_path = os.path.join(path, "stale.sock")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(stale_path)
+        for i, socket_path in enumerate((stale_path, "off")):
+            result = run_build(f"// kernel B{i}", {**env, "COPYAN_COMPILE_DAEMON_SOCKET": socket_path})
+            assert result.returncode == 0, result.stdout
+            kernel_path = result.stdout.strip().splitlines()[-1]
+            assert os.path.exists(os.path.join(kernel_path, LIB_NAME))
+            assert read_calls(path)[-1] == os.path.basename(kernel_path)
+
+
+def test_unreachable():
+    with tempfile.TemporaryDirectory() as path:
+        socket_path = os.path.join(path, "compile.sock")
+        assert request_compile(socket_path, {"op": "status"}) is None
+
+        # A stale socket file of a dead daemon is neither reachable nor blocks a new daemon
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(socket_path)
+        assert os.path.exists(socket_path)
+        assert request_compile(socket_path, {"op": "status"}) is None
+
+        daemon = CompileDaemon(socket_path, workers=1)
+        daemon.start()
+        try:
+            assert request_compile(socket_path, {"op": "status"})["workers"] == 1
+        finally:
+            daemon.shutdown()
+
+
+def test_socket_config():
+    old_socket = config.COMPILE_DAEMON_SOCKET
+    try:
+        with tempfile.TemporaryDirectory() as path:
+            socket_path = os.path.join(path, "compile.sock")
+            config.configure(compile_daemon_socket=socket_path)
+            assert get_compile_daemon_socket() is None
+            open(socket_path, "w").close()
+            assert get_compile_daemon_socket() == socket_path
+            config.configure(compile_daemon_socket="off")
+            assert get_compile_daemon_socket() is None
+    finally:
+        config.configure(compile_daemon_socket=old_socket)
+
+
+if __name__ == "__main__":
+    test_dedupe()
+    test_priority()
+    test_failure()
+    test_install_failure()
+    test_build()
+    test_unreachable()
+    test_socket_config()
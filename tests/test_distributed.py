@@ -0,0 +1,64 @@
+import os
+import tempfile
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+import copyan
+
+world_size = 3
+# Uneven shards, including an empty one
+shard_sizes = (1000, 0, 4099)
+
+
+def get_shards(seed: int = 47) -> list:
+    generator = torch.Generator().manual_seed(seed)
+    return [torch.randn(size, dtype=torch.float, generator=generator) for size in shard_sizes]
+
+
+def run_rank(rank: int, init_file: str, device: str) -> None:
+    dist.init_process_group("gloo", init_method=f"file://{init_file}", rank=rank, world_size=world_size)
+    try:
+        shards = get_shards()
+        x = shards[rank].to(device)
+        expected = torch.cumsum(torch.cat(shards).double(), 0).to(device)
+        start = sum(shard_sizes[:rank])
+
+        y = copyan.distributed.scan(x)
+        assert torch.allclose(y.double(), expected[start : start + x.numel()], atol=1e-3)
+
+        out = torch.empty_like(x)
+        assert copyan.distributed.scan(x, out) is out
+
+        y0, y1 = copyan.distributed.reduce(x)
+        everything = torch.cat(shards)
+        assert abs(y0.item() - everything.double().sum().item()) < 1e-3
+        assert y1.item() == everything.max().item()
+
+        y0, _ = copyan.distributed.reduce(x, transform="square")
+        assert abs(y0.item() - (everything.double() ** 2).sum().item()) < 1e-2
+
+        # Every rank gets the same bits
+        gathered = [torch.empty(2, device=device) for _ in range(world_size)]
+        dist.all_gather(gathered, torch.cat([y0, y1]))
+        assert all(torch.equal(g, gathered[0]) for g in gathered)
+    finally:
+        dist.destroy_process_group()
+
+
+def test_distributed_gloo():
+    with tempfile.TemporaryDirectory() as path:
+        mp.spawn(run_rank, args=(os.path.join(path, "init"), "cpu"), nprocs=world_size, join=True)
+
+
+def test_distributed_cuda():
+    # The same uneven shards through the device kernels, every rank shares the GPU
+    torch.cuda.init()
+    with tempfile.TemporaryDirectory() as path:
+        mp.spawn(run_rank, args=(os.path.join(path, "init"), "cuda"), nprocs=world_size, join=True)
+
+
+if __name__ == "__main__":
+    test_distributed_gloo()
+    test_distributed_cuda()
+    print("Test passed!")
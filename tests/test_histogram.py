@@ -0,0 +1,52 @@
+import torch
+
+import copyan
+from copyan import bench_kineto
+
+
+def test_histogram_reference():
+    torch.manual_seed(0)
+    x = torch.randn(10001, dtype=torch.float)
+    x[:4] = torch.tensor([-3.0, 3.0, float("nan"), 7.0])
+    ref = copyan.jit_kernels.histogram_reference(x, 50, (-3, 3))
+    assert torch.equal(ref.long(), torch.histc(x[~x.isnan()], 50, -3, 3).long())
+
+    edges = torch.tensor([-3.0, -1.0, 0.0, 0.5, 3.0])
+    ref = copyan.jit_kernels.histogram_reference(x, edges=edges)
+    valid = x[(x >= -3) & (x <= 3)]
+    expected = torch.tensor(
+        [
+            ((valid >= -3) & (valid < -1)).sum(),
+            ((valid >= -1) & (valid < 0)).sum(),
+            ((valid >= 0) & (valid < 0.5)).sum(),
+            ((valid >= 0.5) & (valid <= 3)).sum(),
+        ],
+        dtype=torch.int,
+    )
+    assert torch.equal(ref, expected)
+
+    w = torch.rand(10001, dtype=torch.float)
+    ref = copyan.jit_kernels.histogram_reference(x, 50, (-3, 3), weights=w)
+    assert abs(ref.sum().item() - w[(x >= -3) & (x <= 3)].sum().item()) < 1e-2
+
+    tokens = torch.randint(0, 100, (1000,), dtype=torch.int)
+    ref = copyan.jit_kernels.bincount_reference(tokens, minlength=128)
+    assert torch.equal(ref.long(), torch.bincount(tokens, minlength=128))
+
+
+def test_histogram():
+    print("Testing histogram:")
+
+    def test_func():
+        N = 1024 * 4096 * 16
+        x = torch.randn(N, dtype=torch.float, device="cuda")
+        copyan.jit_kernels.histogram(x, 4096, (-4, 4))
+
+    t = bench_kineto(test_func, "block_histogram", suppress_kineto_output=True)
+    print(f" > Performance: {t * 1e6:4.0f} us")
+
+
+if __name__ == "__main__":
+    test_histogram_reference()
+    copyan.jit_kernels.histogram_accuracy_test()
+    test_histogram()
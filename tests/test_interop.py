@@ -0,0 +1,138 @@
+import json
+import os
+
+import numpy as np
+import pytest
+import torch
+
+from copyan.jit import Layout, PreparedRuntime
+from copyan.jit.interop import get_array_info, get_dlpack_stream
+
+from host_kernel import build_host_runtime
+
+
+class DLPackOnly:
+    # Exposes nothing but `__dlpack__`, like JAX arrays
+    def __init__(self, array: np.ndarray) -> None:
+        self.array = array
+
+    def __dlpack__(self, stream=None):
+        return self.array.__dlpack__()
+
+
+class DLPackDevice(DLPackOnly):
+    # Records the stream requested by the consumer
+    def __init__(self, array: np.ndarray, device_type: int) -> None:
+        super().__init__(array)
+        self.device_type = device_type
+        self.streams = []
+
+    def __dlpack__(self, stream=None):
+        self.streams.append(stream)
+        return self.array.__dlpack__()
+
+    def __dlpack_device__(self):
+        return (self.device_type, 0)
+
+
+class CUDAArrayInterfaceOnly:
+    # Host memory behind a `__cuda_array_interface__`, like CuPy arrays, readable by host stubs
+    def __init__(self, array: np.ndarray) -> None:
+        self.array = array
+        self.__cuda_array_interface__ = {**array.__array_interface__, "version": 3}
+
+
+def build_scale_runtime(dtype: torch.dtype, ctype: str):
+    arg_defs = (("X", dtype), ("Y", dtype), ("N", int))
+    body = f"for (int i = 0; i < N; ++ i) (({ctype}*) Y)[i] = (({ctype}*) X)[i] * 2;"
+    return build_host_runtime(arg_defs, body)
+
+
+def test_array_info():
+    x = np.arange(24, dtype=np.float32).reshape(4, 6)
+    for wrap in (lambda a: a, DLPackOnly, CUDAArrayInterfaceOnly):
+        info = get_array_info(wrap(x))
+        assert info.ptr == x.ctypes.data and info.dtype == torch.float32 and info.shape == (4, 6)
+        assert info.is_contiguous()
+
+    info = get_array_info(DLPackOnly(x[:, 1:]))
+    assert info.ptr == x.ctypes.data + 4 and info.strides == (6, 1) and not info.is_contiguous()
+    assert get_array_info(x.T).strides == (1, 6)
+    assert get_array_info(np.zeros(3, dtype=np.int64)).dtype == torch.int64
+    assert get_array_info(DLPackOnly(np.zeros(3, dtype=np.bool_))).dtype == torch.bool
+    assert tuple(Layout.of(x.T).strides[:2]) == (1, 6)
+
+    with pytest.raises(TypeError):
+        get_array_info(object())
+
+    # Byte-swapped arrays would be read as garbage
+    assert get_array_info(np.zeros(3, dtype="=f4")).dtype == torch.float32
+    with pytest.raises(AssertionError):
+        get_array_info(np.zeros(3, dtype=">f4" if np.little_endian else "<f4"))
+
+
+def test_producer_streams():
+    # CUDA producers get the launch stream, 1 for the legacy default one, host ones get none
+    x = np.arange(8, dtype=np.float32)
+    assert get_dlpack_stream(DLPackDevice(x, 2), None) == 1
+    assert get_dlpack_stream(DLPackDevice(x, 1), None) is None
+    assert get_dlpack_stream(DLPackOnly(x), None) is None
+    wrapped = DLPackDevice(x, 1)
+    get_array_info(wrapped)
+    assert wrapped.streams == [None]
+
+    # `__cuda_array_interface__` producers tell their stream
+    wrapped = CUDAArrayInterfaceOnly(x)
+    assert get_array_info(wrapped).producer_stream is None
+    wrapped.__cuda_array_interface__["stream"] = 7
+    assert get_array_info(wrapped).producer_stream == 7
+
+
+def test_zero_copy_launch():
+    runtime = build_scale_runtime(torch.float, "float")
+    prepared = PreparedRuntime(runtime)
+    for wrap in (lambda a: a, DLPackOnly, CUDAArrayInterfaceOnly):
+        x = np.arange(8, dtype=np.float32)
+        y = np.zeros(8, dtype=np.float32)
+        # Outputs are written in place, so no copy was involved
+        assert runtime(wrap(x), wrap(y), 8) == 0
+        assert np.array_equal(y, x * 2)
+        y[:] = 0
+        assert prepared(wrap(x), wrap(y), 8) == 0
+        assert np.array_equal(y, x * 2)
+
+    # Mixed with tensors, and with the extended dtypes
+    x = torch.arange(8, dtype=torch.float)
+    y = np.zeros(8, dtype=np.float32)
+    assert runtime(x, y, 8) == 0 and np.array_equal(y, x.numpy() * 2)
+    runtime = build_scale_runtime(torch.float64, "double")
+    x, y = np.arange(8, dtype=np.float64), np.zeros(8, dtype=np.float64)
+    assert runtime(DLPackOnly(x), y, 8) == 0 and np.array_equal(y, x * 2)
+
+
+def test_reject_arrays():
+    runtime = build_scale_runtime(torch.float, "float")
+    y = np.zeros(8, dtype=np.float32)
+    # Host arrays next to device ones, which the kernel cannot both read
+    with pytest.raises(AssertionError):
+        runtime(torch.arange(8, dtype=torch.float), CUDAArrayInterfaceOnly(y), 8)
+    with pytest.raises(AssertionError):
+        runtime(np.arange(8, dtype=np.float64), y, 8)
+    with pytest.raises(AssertionError):
+        runtime(np.arange(16, dtype=np.float32)[::2], y, 8)
+    with pytest.raises(AssertionError):
+        runtime(DLPackOnly(np.arange(16, dtype=np.float32)[::2]), y, 8)
+
+    # NVCC builds only take device arrays
+    with open(os.path.join(runtime.path, "kernel.meta.json"), "w") as f:
+        json.dump({"arch": "sm_90a", "resources": {}}, f)
+    runtime.meta = None
+    with pytest.raises(AssertionError):
+        runtime(np.arange(8, dtype=np.float32), y, 8)
+
+
+if __name__ == "__main__":
+    test_array_info()
+    test_producer_streams()
+    test_zero_copy_launch()
+    test_reject_arrays()
@@ -0,0 +1,81 @@
+import pytest
+import torch
+
+import copyan
+from copyan.jit import Layout, PreparedRuntime
+
+from host_kernel import build_host_runtime
+
+
+def test_layout_of():
+    x = torch.empty(6, 8)
+    layout = Layout.of(x.t())
+    assert (layout.ndim, tuple(layout.shape[:2]), tuple(layout.strides[:2])) == (2, (8, 6), (1, 8))
+
+    # Coalescing sorts dims by stride and merges the contiguous ones
+    for view, shape, strides in (
+        (x.t(), (48,), (1,)),
+        (x[:, 2:], (6, 6), (8, 1)),
+        (x[::2, ::2], (3, 4), (16, 2)),
+        (x[:, 3], (6,), (8,)),
+        (x.expand(3, 6, 8), (3, 48), (0, 1)),
+        (torch.empty(0, 5), (0,), (1,)),
+        (torch.tensor(1.0), (1,), (1,)),
+    ):
+        layout = Layout.of(view, coalesce=True)
+        assert tuple(layout.shape[: layout.ndim]) == shape, view.stride()
+        assert tuple(layout.strides[: layout.ndim]) == strides, view.stride()
+
+    # Unsupported layouts are rejected before any launch
+    with pytest.raises(AssertionError):
+        Layout.of(torch.empty(2, 2, 2, 2, 2))
+    assert Layout.of(torch.empty(2, 2, 2, 2, 2), coalesce=True).ndim == 1
+    with pytest.raises(AssertionError):
+        Layout.of(x.expand(3, 6, 8), writable=True)
+    Layout.of(x[::2, ::3].t(), writable=True)
+
+
+def test_layout_marshaling():
+    # The host stub reads the layout passed by value, and the element it points at
+    arg_defs = (("X", torch.float), ("X_LAYOUT", Layout), ("I", int))
+    body = "__return_code = static_cast<int>(static_cast<const float *>(X)[X_LAYOUT.offset(I)]) + 1000 * X_LAYOUT.ndim;"
+    runtime = build_host_runtime(arg_defs, body, includes=('"layout/layout.cuh"',))
+
+    buffer = torch.arange(48, dtype=torch.float).view(6, 8)
+    view = buffer.t()
+    for i in (0, 1, 7, 47):
+        expected = int(view.reshape(-1)[i].item())
+        assert runtime(buffer, Layout.of(view), i) == 2000 + expected
+        assert PreparedRuntime(runtime)(buffer, Layout.of(view), i) == 2000 + expected
+
+
+def test_reject_non_contiguous():
+    # Plain pointer arguments carry no strides, so strided views must go through a `Layout`
+    runtime = build_host_runtime((("X", torch.float), ("N", int)), "__return_code = N;")
+    x = torch.empty(6, 8)
+    assert runtime(x[2:], 1) == 1
+    with pytest.raises(AssertionError):
+        runtime(x.t(), 1)
+    with pytest.raises(AssertionError):
+        runtime(x[:, 1], 1)
+
+
+def test_strided_reduce_scan():
+    buffer = torch.randn(1024, 4096, dtype=torch.float, device="cuda")
+    view = buffer[:, 17]
+    y0 = torch.zeros(1, dtype=torch.float, device="cuda")
+    y1 = torch.full((1,), -float("inf"), dtype=torch.float, device="cuda")
+    copyan.jit_kernels.reduce_sum_max(view, y0, y1)
+    assert abs(y0.item() - view.double().sum().item()) < 1e-3 * view.abs().sum().item()
+    assert y1.item() == view.max().item()
+
+    out = torch.empty(4096, 1024, dtype=torch.float, device="cuda").t()
+    copyan.jit_kernels.naive_scan(buffer, out)
+    assert torch.allclose(out.double(), torch.cumsum(buffer.double(), -1), atol=1e-1)
+
+
+if __name__ == "__main__":
+    test_layout_of()
+    test_layout_marshaling()
+    test_reject_non_contiguous()
+    test_strided_reduce_scan()
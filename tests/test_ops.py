@@ -0,0 +1,64 @@
+import torch
+from torch._subclasses.fake_tensor import FakeTensorMode
+
+import copyan.jit_kernels
+
+
+def test_opcheck():
+    # Schemas, fake kernels and AOT dispatch, against the CPU fallbacks
+    x = torch.randn(64, 48)
+    for args in ((x,), (x.t(), True, "square"), (x[:, 5], False, "exp", 1.5)):
+        torch.library.opcheck(torch.ops.copyan.reduce_sum_max.default, args)
+    for view in (x, x.t(), x[:, 3:]):
+        torch.library.opcheck(torch.ops.copyan.naive_scan.default, (view,))
+
+
+def test_fake_tensors():
+    with FakeTensorMode():
+        x = torch.empty(1000, 7, device="cuda")
+        y0, y1 = torch.ops.copyan.reduce_sum_max(x)
+        y = torch.ops.copyan.naive_scan(x.t())
+    assert y0.shape == y1.shape == (1,) and y0.device.type == "cuda"
+    assert y.shape == (7, 1000) and y.stride() == (1, 7)
+
+
+def test_compile():
+    # No graph breaks around the ops
+    @torch.compile(fullgraph=True, backend="aot_eager")
+    def normalized_cumsum(x: torch.Tensor) -> torch.Tensor:
+        y0, y1 = torch.ops.copyan.reduce_sum_max(x, transform="abs")
+        return torch.ops.copyan.naive_scan(x - y1) / y0
+
+    x = torch.randn(3, 100)
+    expected = torch.cumsum(x - x.abs().max(), -1) / x.abs().sum()
+    assert torch.allclose(normalized_cumsum(x), expected, atol=1e-5)
+
+
+def test_ops_cuda():
+    x = torch.randn(1024 * 4096, dtype=torch.float, device="cuda")
+    y0, y1 = torch.ops.copyan.reduce_sum_max(x, deterministic=True)
+    assert abs(y0.item() - x.double().sum().item()) < 1e-3 * x.abs().sum().item()
+    assert y1.item() == x.max().item()
+
+    # 1-D lengths which the single-pass kernel cannot take, and an empty input
+    for n in (1000, 4099, 1024 * 4096 + 4, 0):
+        x = torch.randn(n, dtype=torch.float, device="cuda")
+        y = torch.ops.copyan.naive_scan(x)
+        assert torch.allclose(y.double(), torch.cumsum(x.double(), 0), atol=1e-3 * max(n, 1) ** 0.5), n
+
+    # Captured graphs replay the kernels on the capturing stream
+    graph = torch.cuda.CUDAGraph()
+    x = torch.randn(256, 1000, dtype=torch.float, device="cuda")
+    torch.ops.copyan.naive_scan(x)
+    with torch.cuda.graph(graph):
+        y = torch.ops.copyan.naive_scan(x)
+    x.copy_(torch.randn_like(x))
+    graph.replay()
+    assert torch.allclose(y, torch.cumsum(x, -1), atol=1e-3)
+
+
+if __name__ == "__main__":
+    test_opcheck()
+    test_fake_tensors()
+    test_compile()
+    test_ops_cuda()
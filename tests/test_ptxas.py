@@ -0,0 +1,80 @@
+from copyan.jit.ptxas import filter_ptxas_info, parse_ptxas_log
+from copyan.jit_kernels.pruning import estimate_occupancy, ResourcePolicy
+
+# Captured from `nvcc --ptxas-options=--verbose` on the reduce kernels, with a spilling variant appended
+ptxas_log = """\
+ptxas info    : 0 bytes gmem
+ptxas info    : Compiling entry function '_Z12block_reduceIffN5SumOpIfEELi16EEvjT1_PKT_PT0_j' for 'sm_89'
+ptxas info    : Function properties for _Z12block_reduceIffN5SumOpIfEELi16EEvjT1_PKT_PT0_j
+    0 bytes stack frame, 0 bytes spill stores, 0 bytes spill loads
+ptxas info    : Used 30 registers, used 1 barriers, 128 bytes smem, 380 bytes cmem[0]
+ptxas info    : Compile time = 4.211 ms
+ptxas info    : Compiling entry function '_Z12block_reduceIffN5MaxOpIfEELi16EEvjT1_PKT_PT0_j' for 'sm_89'
+ptxas info    : Function properties for _Z12block_reduceIffN5MaxOpIfEELi16EEvjT1_PKT_PT0_j
+    0 bytes stack frame, 0 bytes spill stores, 0 bytes spill loads
+ptxas info    : Used 32 registers, used 1 barriers, 128 bytes smem, 380 bytes cmem[0]
+ptxas info    : Compile time = 3.902 ms
+ptxas info    : Function properties for _Z7helperv
+    16 bytes stack frame, 0 bytes spill stores, 0 bytes spill loads
+ptxas info    : Compiling entry function '_Z8spillingPf' for 'sm_89'
+ptxas info    : Used 255 registers, 49152 bytes smem, 360 bytes cmem[0]
+ptxas info    : Function properties for _Z8spillingPf
+    512 bytes stack frame, 640 bytes spill stores, 512 bytes spill loads
+/tmp/kernel.cu(12): warning #177-D: variable "x" was declared but never referenced
+"""
+
+sum_kernel = "_Z12block_reduceIffN5SumOpIfEELi16EEvjT1_PKT_PT0_j"
+max_kernel = "_Z12block_reduceIffN5MaxOpIfEELi16EEvjT1_PKT_PT0_j"
+
+
+def test_parse_ptxas_log():
+    kernels = parse_ptxas_log(ptxas_log)
+    assert sorted(kernels.keys()) == sorted([sum_kernel, max_kernel, "_Z8spillingPf"])
+    assert kernels[sum_kernel] == {
+        "arch": "sm_89",
+        "registers": 30,
+        "barriers": 1,
+        "smem": 128,
+        "cmem": 380,
+        "stack": 0,
+        "spill_stores": 0,
+        "spill_loads": 0,
+    }
+    assert kernels[max_kernel]["registers"] == 32
+    assert kernels["_Z8spillingPf"]["smem"] == 49152
+    assert kernels["_Z8spillingPf"]["spill_stores"] == 640
+    assert kernels["_Z8spillingPf"]["stack"] == 512
+
+    assert filter_ptxas_info(ptxas_log).strip().startswith("/tmp/kernel.cu(12): warning")
+
+
+def test_resource_policy():
+    kernels = parse_ptxas_log(ptxas_log)
+    reduce_resources = {name: kernels[name] for name in (sum_kernel, max_kernel)}
+    spilling_resources = {"_Z8spillingPf": kernels["_Z8spillingPf"]}
+
+    # 32 registers at 1024 threads: 32 of the 48 warps fit
+    assert abs(estimate_occupancy(kernels[max_kernel], 1024) - 32 / 48) < 1e-6
+    assert abs(estimate_occupancy(kernels[max_kernel], 256) - 1.0) < 1e-6
+    # 255 registers at 512 threads do not fit at all
+    assert estimate_occupancy(kernels["_Z8spillingPf"], 512) == 0
+
+    policy = ResourcePolicy()
+    assert not policy.assess(reduce_resources, {"BLOCK_SIZE": 1024})[0]
+    assert policy.assess(spilling_resources, {"BLOCK_SIZE": 128})[0]
+    assert not policy.assess({}, {"BLOCK_SIZE": 1024})[0]
+
+    candidates = [
+        ({"BLOCK_SIZE": 1024}, reduce_resources),
+        ({"BLOCK_SIZE": 128}, spilling_resources),
+        ({"BLOCK_SIZE": 256}, reduce_resources),
+    ]
+    assert policy.rank(candidates) == [{"BLOCK_SIZE": 256}, {"BLOCK_SIZE": 1024}]
+    assert ResourcePolicy(top_k=1).rank(candidates) == [{"BLOCK_SIZE": 256}]
+    assert policy.rank([({}, reduce_resources)], keys={"BLOCK_SIZE": 2048}) == []
+
+
+if __name__ == "__main__":
+    test_parse_ptxas_log()
+    test_resource_policy()
+    print("ptxas test passed!")
@@ -0,0 +1,43 @@
+import torch
+
+import copyan
+from copyan import bench_kineto
+
+
+def test_radix_sort_reference():
+    torch.manual_seed(0)
+    for keys in (
+        torch.randn(1000, dtype=torch.float),
+        torch.randint(-50, 50, (1000,), dtype=torch.int),
+    ):
+        values = torch.arange(1000, dtype=torch.int)
+        for descending in (False, True):
+            ref_keys, ref_values = copyan.jit_kernels.radix_sort_reference(
+                keys, values, descending
+            )
+            expected = torch.sort(keys, descending=descending, stable=True)
+            assert torch.equal(ref_keys, expected.values)
+            assert torch.equal(ref_values.long(), expected.indices)
+
+
+def test_radix_sort():
+    print("Testing radix sort:")
+
+    def test_func():
+        N = 1024 * 4096
+        keys = torch.randn(N, dtype=torch.float, device="cuda")
+        values = torch.arange(N, dtype=torch.int, device="cuda")
+        copyan.jit_kernels.radix_sort(keys, values, descending=True)
+
+    t = bench_kineto(
+        test_func, ("radix_histogram", "radix_scatter"), suppress_kineto_output=True
+    )
+    for i, time in enumerate(t):
+        print(f" > Performance {i}: {time * 1e6:4.0f} us")
+    print(f" > Total Performance: {sum(t) * 1e6:4.0f} us")
+
+
+if __name__ == "__main__":
+    test_radix_sort_reference()
+    copyan.jit_kernels.radix_sort_accuracy_test()
+    test_radix_sort()
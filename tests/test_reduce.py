@@ -10,12 +10,11 @@ def test_sum_reduce():
         N = 1024 * 4096 * 128
         x = torch.randn(N, dtype=torch.float, device="cuda")
         y0 = torch.zeros(1, dtype=torch.float, device="cuda")
-        y1 = torch.zeros(1, dtype=torch.float, device="cuda")
-        space = (
-            dict(BLOCK_SIZE=512, ITEMS_PER_THREAD=8),
-            dict(BLOCK_SIZE=512, ITEMS_PER_THREAD=16),
-            dict(BLOCK_SIZE=1024, ITEMS_PER_THREAD=8),
-            dict(BLOCK_SIZE=1024, ITEMS_PER_THREAD=16),
+        y1 = torch.full((1,), -float("inf"), dtype=torch.float, device="cuda")
+        space = copyan.jit_kernels.Space(
+            BLOCK_SIZE=(512, 1024),
+            ITEMS_PER_THREAD=(8, 16),
+            REDUCE_MODE=("Atomic", "Tree"),
         )
         copyan.jit_kernels.reduce_sum_max(x, y0, y1, space)
 
@@ -28,6 +27,34 @@ def test_sum_reduce():
     print(f" > Total Performance: {total_time * 1e6:4.0f} us")
 
 
+def test_sum_of_squares():
+    print("Testing fused sum of squares:")
+
+    def test_func():
+        N = 1024 * 4096 * 128
+        x = torch.randn(N, dtype=torch.float, device="cuda")
+        y0 = torch.zeros(1, dtype=torch.float, device="cuda")
+        y1 = torch.zeros(1, dtype=torch.float, device="cuda")
+        copyan.jit_kernels.reduce_sum_max(x, y0, y1, transform="square")
+
+    t = bench_kineto(
+        test_func, ("SumOp<float>", "MaxOp<float>"), suppress_kineto_output=True
+    )
+    print(f" > Total Performance: {sum(t) * 1e6:4.0f} us")
+
+
+def test_empty_reduce():
+    # `Tree` mode writes the identities, `Atomic` mode leaves the initial values
+    x = torch.empty(0, dtype=torch.float, device="cuda")
+    for deterministic in (True, False):
+        y0 = torch.full((1,), 7.0, dtype=torch.float, device="cuda") if deterministic else torch.zeros(1, device="cuda")
+        y1 = torch.full((1,), 7.0, dtype=torch.float, device="cuda") if deterministic else torch.full((1,), -float("inf"), device="cuda")
+        copyan.jit_kernels.reduce_sum_max(x, y0, y1, deterministic=deterministic)
+        assert y0.item() == 0.0 and y1.item() == -float("inf"), (deterministic, y0.item(), y1.item())
+
+
 if __name__ == "__main__":
     copyan.jit_kernels.reduce_sum_max_accuracy_test()
     test_sum_reduce()
+    test_sum_of_squares()
+    test_empty_reduce()
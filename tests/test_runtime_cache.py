@@ -0,0 +1,177 @@
+import os
+import tempfile
+import torch
+
+import copyan.jit_kernels.tuner as tuner_module
+from copyan.jit import config, PreparedRuntime, runtime_cache
+from copyan.jit.bundle import BundleRuntime
+from copyan.jit.runtime import LIB_NAME, RuntimeCache
+from copyan.jit_kernels.tuner import JITTuner
+
+from host_kernel import build_host_runtime
+
+arg_defs = (("N", int), ("X", torch.float))
+
+
+x = torch.empty(1)
+
+
+def is_mapped(path: str) -> bool:
+    with open("/proc/self/maps", "r") as f:
+        return os.path.realpath(path) in f.read()
+
+
+def build_stubs(root: str, count: int) -> list:
+    return [
+        build_host_runtime(arg_defs, f"__return_code = N + {i};", os.path.join(root, f"kernel.stub.{i}"))
+        for i in range(count)
+    ]
+
+
+def test_unload_and_pin():
+    with tempfile.TemporaryDirectory() as root:
+        runtime = build_stubs(root, 1)[0]
+        lib_path = os.path.join(runtime.path, LIB_NAME)
+        assert runtime(1, x) == 1 and is_mapped(lib_path)
+
+        # Unloaded libraries are unmapped, and loaded again on the next call
+        assert runtime.unload() and not runtime.is_loaded() and not is_mapped(lib_path)
+        assert runtime(2, x) == 2 and is_mapped(lib_path)
+
+        # Prepared launchers hold raw function pointers, and pin their runtime
+        prepared = PreparedRuntime(runtime)
+        assert not runtime.unload() and prepared(3, x) == 3
+        del prepared
+        assert runtime.pins == 0 and runtime.unload()
+
+
+def test_lru_eviction():
+    previous = config.RUNTIME_CACHE_SIZE
+    with tempfile.TemporaryDirectory() as root:
+        try:
+            config.configure(runtime_cache_size=2)
+            cache = RuntimeCache()
+            stubs = build_stubs(root, 4)
+            for i, stub in enumerate(stubs[:3]):
+                runtime = cache[stub.path]
+                assert runtime(0, x) == i
+            # The first entry was the least recently used
+            assert stubs[0].path not in cache and len(cache) == 2
+            stats = cache.get_stats()
+            assert stats["loaded"] == 2 and stats["evictions"] == 1
+            assert stats["loaded_bytes"] == 2 * os.path.getsize(os.path.join(stubs[1].path, LIB_NAME))
+
+            # Touching an entry protects it, pinned entries are skipped
+            cache[stubs[1].path].pin()
+            cache[stubs[3].path](0, x)
+            assert stubs[1].path in cache and stubs[2].path not in cache
+            assert cache.get_stats()["pinned"] == 1
+
+            # No bound
+            config.configure(runtime_cache_size=0)
+            for stub in stubs:
+                cache[stub.path]
+            assert len(cache) == 4
+        finally:
+            config.configure(runtime_cache_size=previous)
+
+
+def test_release_losers():
+    cache = RuntimeCache()
+    with tempfile.TemporaryDirectory() as root:
+        winner, loser = [cache[stub.path] for stub in build_stubs(root, 2)]
+        winner(0, x), loser(0, x)
+        winner.pin()
+        assert not cache.release(winner) and winner.is_loaded()
+        assert cache.release(loser) and not loser.is_loaded() and loser.path not in cache
+        assert cache.get_stats()["releases"] == 1
+
+
+def test_bundle_unload():
+    with tempfile.TemporaryDirectory() as root:
+        exporter = JITTuner()
+        signature = ("stub", (("I", 0),))
+        exporter.tuned[signature] = build_stubs(root, 1)[0]
+        exporter.tuned_keys[signature] = {}
+        bundle_path = os.path.join(root, "kernels.copyan")
+        exporter.export_bundle(bundle_path, arch="89")
+
+        runtime = BundleRuntime(bundle_path, exporter.tuned[signature].kernel_name)
+        assert runtime(5, x) == 5 and runtime.get_lib_size() > 0
+        fd = runtime.fd
+        assert runtime.unload() and runtime.fd is None
+        if fd is not None:
+            assert not os.path.exists(f"/proc/self/fd/{fd}")
+        assert runtime(6, x) == 6
+
+        # Imported kernels are not pinned either, they are loaded again after an eviction
+        importer = JITTuner()
+        importer.import_bundle(bundle_path)
+        importer.import_bundle(bundle_path)
+        imported = importer.tuned[signature]
+        assert imported.pins == 0 and imported(7, x) == 7
+        assert imported.unload() and imported(8, x) == 8
+
+
+def test_tuned_winners_unloaded():
+    # Winners beyond the cache size are unloaded, e.g. with problem sizes drifting across buckets
+    previous_size, previous_build = config.RUNTIME_CACHE_SIZE, tuner_module.build
+    with tempfile.TemporaryDirectory() as root:
+        paths = iter(stub.path for stub in build_stubs(root, 4))
+        try:
+            config.configure(runtime_cache_size=2)
+            tuner_module.build = lambda name, arg_defs, code, priority="interactive": runtime_cache[next(paths)]
+            tuner = JITTuner()
+            for i in range(4):
+                runtime = tuner.compile_and_tune(
+                    name="stub", keys={"I": i}, space=(), includes=(), arg_defs=arg_defs, template="", args=(0, x)
+                )
+                assert runtime(0, x) == i
+
+            winners = [tuner.tuned[("stub", (("I", i),))] for i in range(4)]
+            assert all(winner.pins == 0 for winner in winners)
+            assert [winner.is_loaded() for winner in winners] == [False, False, True, True]
+
+            # Evicted winners are loaded again by their next call
+            assert winners[0](1, x) == 1
+        finally:
+            tuner_module.build = previous_build
+            config.configure(runtime_cache_size=previous_size)
+
+
+def test_captured_runtimes_pinned():
+    # Graphs captured earlier keep launching their kernels, which eviction must not unload
+    from copyan.jit_kernels import naive_scan
+    from copyan.jit_kernels.tuner import jit_tuner
+
+    previous = config.RUNTIME_CACHE_SIZE
+    with tempfile.TemporaryDirectory() as root:
+        try:
+            x = torch.randn(256, 1000, dtype=torch.float, device="cuda")
+            y = torch.empty_like(x)
+            naive_scan(x, y)
+            graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(graph):
+                naive_scan(x, y)
+            runtime = next(runtime for (name, _), runtime in jit_tuner.tuned.items() if name == "strided_scan")
+            assert runtime.captured and runtime.pins > 0
+
+            # Evict everything else, then replay
+            config.configure(runtime_cache_size=1)
+            for stub in build_stubs(root, 3):
+                runtime_cache[stub.path](0, x.cpu())
+            assert runtime.is_loaded()
+            x.copy_(torch.randn_like(x))
+            graph.replay()
+            assert torch.allclose(y, torch.cumsum(x, -1), atol=1e-3)
+        finally:
+            config.configure(runtime_cache_size=previous)
+
+
+if __name__ == "__main__":
+    test_unload_and_pin()
+    test_lru_eviction()
+    test_release_losers()
+    test_bundle_unload()
+    test_tuned_winners_unloaded()
+    test_captured_runtimes_pinned()
@@ -0,0 +1,98 @@
+from copyan.jit_kernels import (
+    CoordinateDescent,
+    Exhaustive,
+    RandomSearch,
+    Space,
+    smem_limit,
+    warp_multiple,
+)
+
+
+def make_space() -> Space:
+    return Space(
+        BLOCK_SIZE=(100, 128, 256, 512, 1024),
+        ITEMS_PER_THREAD=(1, 2, 4, 8, 16, 32),
+    ).where(
+        "BLOCK_SIZE * ITEMS_PER_THREAD * 4 <= N",
+        warp_multiple("BLOCK_SIZE"),
+        smem_limit("BLOCK_SIZE * ITEMS_PER_THREAD * 4", 64 * 1024),
+    )
+
+
+def synthetic_cost(config: dict) -> float:
+    # A bowl with its minimum at (512, 8), and an illegal corner
+    if config["BLOCK_SIZE"] == 1024 and config["ITEMS_PER_THREAD"] >= 16:
+        return None
+    return (
+        abs(config["BLOCK_SIZE"].bit_length() - 10)
+        + abs(config["ITEMS_PER_THREAD"].bit_length() - 4) * 1.5
+    )
+
+
+class CountedCost:
+    def __init__(self) -> None:
+        self.calls = []
+
+    def __call__(self, config: dict) -> float:
+        self.calls.append(config)
+        return synthetic_cost(config)
+
+
+def test_space_constraints():
+    space = make_space()
+    assert len(space) == 30
+    points = space.points(N=1 << 20)
+    assert all(point["BLOCK_SIZE"] != 100 for point in points)
+    assert all(point["BLOCK_SIZE"] * point["ITEMS_PER_THREAD"] <= 16384 for point in points)
+    assert len(points) == 23
+    assert len(space.points(N=1024)) == 3
+
+    # Legacy tuple spaces keep their order and may still be constrained
+    legacy = Space.from_configs(
+        (
+            dict(BLOCK_SIZE=512, ITEMS_PER_THREAD=8),
+            dict(BLOCK_SIZE=1024, ITEMS_PER_THREAD=16),
+        )
+    )
+    assert legacy.points() == list(legacy.configs)
+    assert legacy.where("ITEMS_PER_THREAD < 16").points() == [legacy.configs[0]]
+
+
+def test_search_strategies():
+    points = make_space().points(N=1 << 20)
+    best = dict(BLOCK_SIZE=512, ITEMS_PER_THREAD=8)
+
+    cost = CountedCost()
+    assert Exhaustive().search(points, cost) == (best, 0)
+    assert len(cost.calls) == len(points)
+
+    cost = CountedCost()
+    config, value = RandomSearch(budget=5, seed=1).search(points, cost)
+    assert len(cost.calls) == 5 and config in cost.calls
+    assert value == min(c for c in map(synthetic_cost, cost.calls) if c is not None)
+
+    cost = CountedCost()
+    assert CoordinateDescent().search(points, cost) == (best, 0)
+    assert len(cost.calls) < len(points)
+    assert len({tuple(sorted(c.items())) for c in cost.calls}) == len(cost.calls)
+
+    cost = CountedCost()
+    CoordinateDescent(budget=3).search(points, cost)
+    assert len(cost.calls) == 3
+
+
+def test_search_illegal_start():
+    points = [
+        dict(BLOCK_SIZE=1024, ITEMS_PER_THREAD=16),
+        dict(BLOCK_SIZE=1024, ITEMS_PER_THREAD=8),
+        dict(BLOCK_SIZE=512, ITEMS_PER_THREAD=8),
+    ]
+    assert CoordinateDescent().search(points, synthetic_cost) == (points[2], 0)
+    assert Exhaustive().search(points[:1], synthetic_cost) == (None, None)
+
+
+if __name__ == "__main__":
+    test_space_constraints()
+    test_search_strategies()
+    test_search_illegal_start()
+    print("Space test passed!")
@@ -0,0 +1,87 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code: str, env: dict = None) -> str:
+    return subprocess.check_output(
+        [sys.executable, "-c", code],
+        env={**os.environ, "PYTHONPATH": repo_dir, **(env or {})},
+        universal_newlines=True,
+    )
+
+
+def make_fake_nvcc(path: str) -> str:
+    # A stand-in `nvcc` which counts its invocations
+    nvcc = os.path.join(path, "nvcc")
+    with open(nvcc, "w") as f:
+        f.write(f"#!{sys.executable}\n")
+        f.write(f"open({os.path.join(path, 'calls')!r}, 'a').write('x')\n")
+        f.write("print('Cuda compilation tools, release 12.8, V12.8.93')\n")
+    os.chmod(nvcc, 0o755)
+    return nvcc
+
+
+def test_lazy_import():
+    output = run_python(
+        "import sys, copyan; "
+        "print(sorted(m for m in ('torch', 'torch.distributed', 'copyan.jit', 'copyan.jit_kernels') if m in sys.modules))"
+    )
+    assert output.strip() == "[]", output
+
+
+def test_toolchain_probe_cache():
+    with tempfile.TemporaryDirectory() as path:
+        nvcc = make_fake_nvcc(path)
+        env = {"COPYAN_NVCC_COMPILER": nvcc, "COPYAN_CACHE_DIR": path}
+        for _ in range(3):
+            output = run_python(
+                "from copyan.jit import get_nvcc_compiler; print(get_nvcc_compiler()[1])",
+                env,
+            )
+            assert output.strip() == "12.8"
+        with open(os.path.join(path, "calls")) as f:
+            assert f.read() == "x"
+
+        # A touched compiler is probed again
+        os.utime(nvcc, ns=(0, 0))
+        run_python("from copyan.jit import get_nvcc_compiler; get_nvcc_compiler()", env)
+        with open(os.path.join(path, "calls")) as f:
+            assert f.read() == "xx"
+
+
+def bench_startup():
+    print("Testing startup latency:")
+
+    def timed(code: str, env: dict = None) -> float:
+        start = time.perf_counter()
+        run_python(code, env)
+        return time.perf_counter() - start
+
+    baseline = timed("pass")
+    for name, code in (
+        ("import copyan", "import copyan"),
+        ("import copyan.jit", "import copyan.jit"),
+        ("import copyan.jit_kernels", "import copyan.jit_kernels"),
+    ):
+        print(f" > {name:<32}: {(timed(code) - baseline) * 1e3:6.0f} ms")
+
+    with tempfile.TemporaryDirectory() as path:
+        env = {"COPYAN_NVCC_COMPILER": make_fake_nvcc(path), "COPYAN_CACHE_DIR": path}
+        code = (
+            "import time; from copyan.jit import get_nvcc_compiler; "
+            "start = time.perf_counter(); get_nvcc_compiler(); "
+            "print(time.perf_counter() - start)"
+        )
+        for name in ("get_nvcc_compiler (cold)", "get_nvcc_compiler (warm)"):
+            print(f" > {name:<32}: {float(run_python(code, env)) * 1e3:6.0f} ms")
+
+
+if __name__ == "__main__":
+    test_lazy_import()
+    test_toolchain_probe_cache()
+    bench_startup()
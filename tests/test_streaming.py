@@ -0,0 +1,81 @@
+import numpy as np
+import os
+import tempfile
+import time
+import torch
+
+import copyan
+
+
+def test_streaming_host():
+    torch.manual_seed(0)
+    N = 10007
+    x = torch.randn(N, dtype=torch.float)
+    expected_sum, expected_max = x.double().sum().item(), x.max().item()
+    expected_scan = torch.cumsum(x.double(), 0)
+
+    # Odd chunk sizes exercise the host-side tails and the carries
+    for chunk_size in (1, 7, 1000, 4096, N + 1):
+        y0, y1 = copyan.jit_kernels.stream_reduce_sum_max(x, chunk_size, device="cpu")
+        assert abs(y0 - expected_sum) < 1e-3 and y1 == expected_max
+        y = copyan.jit_kernels.stream_scan(x, chunk_size=chunk_size, device="cpu")
+        assert torch.allclose(y.double(), expected_scan, atol=1e-3)
+
+    # Iterators of uneven chunks, of tensors and of arrays
+    parts = [x[:5], x[5:3000].numpy(), x[3000:3001], x[3001:]]
+    y0, y1 = copyan.jit_kernels.stream_reduce_sum_max(iter(parts), 1024, device="cpu")
+    assert abs(y0 - expected_sum) < 1e-3 and y1 == expected_max
+    y = copyan.jit_kernels.stream_scan(iter(parts), chunk_size=1024, device="cpu")
+    assert torch.allclose(y.double(), expected_scan, atol=1e-3)
+
+    # Empty sources
+    empty = copyan.jit_kernels.stream_reduce_sum_max(iter(()), device="cpu")
+    assert empty == (0.0, -float("inf"))
+    assert copyan.jit_kernels.stream_scan(iter(()), device="cpu").numel() == 0
+
+
+def test_streaming_memmap():
+    torch.manual_seed(1)
+    table = torch.randn(5000, 3, dtype=torch.float)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "features.bin")
+        table.numpy().tofile(path)
+        features = np.memmap(path, dtype=np.float32, mode="r", shape=(5000, 3))
+        out = np.memmap(
+            os.path.join(tmp_dir, "prefix.bin"), dtype=np.float32, mode="w+", shape=(5000,)
+        )
+
+        # Strided columns are gathered straight into the staging buffers
+        column = features[:, 1]
+        y0, y1 = copyan.jit_kernels.stream_reduce_sum_max(column, 999, device="cpu")
+        assert abs(y0 - table[:, 1].double().sum().item()) < 1e-3
+        assert y1 == table[:, 1].max().item()
+
+        copyan.jit_kernels.stream_scan(column, out, chunk_size=999, device="cpu")
+        expected = torch.cumsum(table[:, 1].double(), 0)
+        assert torch.allclose(torch.from_numpy(np.array(out)).double(), expected, atol=1e-3)
+        del features, out
+
+
+def test_streaming():
+    print("Testing streaming reduce & scan:")
+    N = 16 * copyan.jit_kernels.streaming.default_chunk_size
+    x = torch.randn(N, dtype=torch.float).pin_memory()
+
+    kernels = copyan.jit_kernels
+    for name, fn in (
+        ("stream_reduce_sum_max", lambda: kernels.stream_reduce_sum_max(x, device="cuda")),
+        ("stream_scan", lambda: kernels.stream_scan(x, device="cuda")),
+    ):
+        fn()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        print(f" > {name:<22}: {N * 4 / elapsed / 1e9:6.2f} GB/s")
+
+
+if __name__ == "__main__":
+    test_streaming_host()
+    test_streaming_memmap()
+    copyan.jit_kernels.streaming_accuracy_test()
+    test_streaming()
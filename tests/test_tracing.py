@@ -0,0 +1,72 @@
+import time
+import torch
+
+from copyan.jit import PreparedRuntime, tracing
+from copyan.jit.tracing import get_trace_name
+
+from host_kernel import build_host_runtime
+
+arg_defs = (("N", int), ("X", torch.float))
+
+
+def test_tracing_counters():
+    runtime = build_host_runtime(arg_defs, "__return_code = N;")
+    runtime.trace_name = get_trace_name("stub", {"MODE": "A"}, {"BLOCK_SIZE": 256})
+    assert runtime.trace_name == "stub[MODE=A, BLOCK_SIZE=256]"
+    prepared = PreparedRuntime(runtime)
+    x = torch.empty(4)
+
+    tracing.reset()
+    try:
+        tracing.enable(counters=True, record_function=True)
+        for i in range(10):
+            assert runtime(i, x) == i
+        assert prepared(7, x) == 7
+
+        stats = tracing.get_stats()[runtime.trace_name]
+        assert stats.count == 11
+        assert sum(count for _, count in stats.histogram()) == 11
+        assert 0 < stats.mean_us() <= stats.percentile_us(100)
+
+        # Profiler ranges carry the trace name
+        with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU]) as prof:
+            runtime(1, x)
+        assert runtime.trace_name in [event.key for event in prof.key_averages()]
+    finally:
+        tracing.disable()
+
+    # Disabled launches are not counted
+    runtime(1, x)
+    assert tracing.get_stats()[runtime.trace_name].count == 12
+    tracing.reset()
+    assert tracing.get_stats() == {}
+
+
+def bench_tracing():
+    print("Testing tracing overhead (host stub, no GPU):")
+    runtime = build_host_runtime(arg_defs, "__return_code = 0;")
+    prepared = PreparedRuntime(runtime)
+    x = torch.empty(4)
+
+    def timed(fn, num_tests: int = 100000) -> float:
+        for _ in range(1000):
+            fn()
+        start = time.perf_counter()
+        for _ in range(num_tests):
+            fn()
+        return (time.perf_counter() - start) / num_tests
+
+    for mode, options in (
+        ("disabled", None),
+        ("counters", dict(counters=True, record_function=False)),
+        ("counters + profiler", dict(counters=True, record_function=True)),
+    ):
+        tracing.disable() if options is None else tracing.enable(**options)
+        print(f" > {mode:<20}: {timed(lambda: prepared(0, x)) * 1e6:6.2f} us/call")
+    tracing.disable()
+    tracing.reset()
+
+
+if __name__ == "__main__":
+    test_tracing_counters()
+    bench_tracing()